@@ -1,12 +1,28 @@
 import os
 from urllib.parse import urlparse
-from flask import Flask, request, session, send_from_directory
+from flask import Flask, request, session
 from flask_migrate import Migrate
 from flask_babel import Babel
 from dotenv import load_dotenv
+from app import (
+    catalog_cache,
+    cover_images,
+    facet_index,
+    fragment_cache,
+    image_queue,
+    image_store,
+    inventory_summary,
+    page_cache,
+    query_plans,
+    search,
+    shirt_names,
+    shuffle,
+    sitemap,
+    translation_queue,
+    uploads,
+)
 from app.models import db
 from app.utils import (
-    build_shirt_slug,
     color_label,
     competition_label_localized,
     feature_label,
@@ -72,9 +88,27 @@ def create_app():
     
     if not os.path.exists(app.config['UPLOAD_FOLDER']):
         os.makedirs(app.config['UPLOAD_FOLDER'])
+    app.config['CACHE_FOLDER'] = os.path.join(basedir, os.getenv('CACHE_FOLDER', 'cache'))
+    app.config['UPLOADS_DELIVERY'] = os.getenv('UPLOADS_DELIVERY', 'flask')
+    app.config['UPLOADS_ACCEL_PREFIX'] = os.getenv('UPLOADS_ACCEL_PREFIX', '/protected-uploads/')
 
     db.init_app(app)
     Migrate(app, db)
+    catalog_cache.init_app(app)
+    cover_images.init_app(app)
+    facet_index.init_app(app)
+    page_cache.init_app(app)
+    fragment_cache.init_app(app)
+    image_queue.init_app(app)
+    image_store.init_app(app)
+    inventory_summary.init_app(app)
+    query_plans.init_app(app)
+    search.init_app(app)
+    shirt_names.init_app(app)
+    shuffle.init_app(app)
+    sitemap.init_app(app)
+    translation_queue.init_app(app)
+    uploads.init_app(app)
 
     from app.blueprints.public import public_bp
     from app.blueprints.admin import admin_bp
@@ -84,11 +118,6 @@ def create_app():
     admin_prefix = os.getenv('ADMIN_URL_PREFIX', 'admin')
     app.register_blueprint(admin_bp, url_prefix=f'/{admin_prefix}')
 
-    from flask import send_from_directory
-    @app.route('/uploads/<path:filename>')
-    def uploaded_file(filename):
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
-
     @app.context_processor
     def inject_globals():
         return {
@@ -125,38 +154,7 @@ def create_app():
     @app.template_filter('display_name_localized')
     def display_name_localized_filter(shirt):
         locale = str(get_locale() or 'en')
-        parts = []
-        team_name = team_name_localized(shirt, locale)
-
-        if locale == 'it':
-            parts.append(type_label_or_shirt(getattr(shirt, 'type', None), locale))
-            tipologia = getattr(shirt, 'tipologia', None)
-            if tipologia:
-                parts.append(feature_label(tipologia, locale))
-            if getattr(shirt, 'player_name', None):
-                parts.append(shirt.player_name)
-            # Sleeve type stays a filter-only attribute; omit from Italian display titles.
-            if getattr(shirt, 'brand', None):
-                parts.append(shirt.brand)
-            if team_name:
-                parts.append(team_name)
-        else:
-            if getattr(shirt, 'player_name', None):
-                parts.append(shirt.player_name)
-            if team_name:
-                parts.append(team_name)
-            if getattr(shirt, 'brand', None):
-                parts.append(shirt.brand)
-            tipologia = getattr(shirt, 'tipologia', None)
-            if tipologia:
-                parts.append(feature_label(tipologia, locale))
-            parts.append(type_label_or_shirt(getattr(shirt, 'type', None), locale))
-
-        if getattr(shirt, 'stagione', None):
-            stagione = shirt.stagione
-            parts.append(stagione)
-
-        return ' '.join([p for p in parts if p])
+        return shirt_names.shirt_display_name(shirt, locale)
 
     @app.template_filter('team_name_localized')
     def team_name_localized_filter(shirt):
@@ -171,6 +169,6 @@ def create_app():
     @app.template_filter('shirt_slug_localized')
     def shirt_slug_localized_filter(shirt):
         locale = str(get_locale() or 'en')
-        return build_shirt_slug(shirt, locale)
+        return shirt_names.shirt_slug(shirt, locale)
 
     return app
@@ -1,45 +1,33 @@
 import os
 import uuid
-import shutil
 import re
 from decimal import Decimal, InvalidOperation
-from datetime import datetime
 from urllib.parse import urlparse
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app, jsonify
-from sqlalchemy import func, or_, text, cast, String
+from sqlalchemy import func, or_, select, text, cast, String
+from sqlalchemy.orm import selectinload
 from app.models import db, Shirt, ShirtImage, NATIONAL_TEAMS
-from app.image_utils import normalize_product_image
-from app.openrouter import get_or_translate_description
+from app.image_store import release_image_file, save_upload
 from app.auth import login_required
+from app.bulk_operations import apply_bulk_operations, parse_bulk_request
+from app.catalog_cache import cache_stats, get_form_facets
+from app.dashboard_facets import dashboard_facet_counts, dashboard_facet_stats
+from app.fragment_cache import fragment_cache_stats
+from app.inventory_summary import get_inventory_summary
+from app.page_cache import page_cache_stats
+from app.search import search_match_scores
+from app.uploads import image_url
 from app.utils import season_sort_key, size_sort_key, is_accessory_type
-from werkzeug.utils import secure_filename
 
 admin_bp = Blueprint('admin', __name__)
 
+DASHBOARD_PAGE_SIZE = 50
+DASHBOARD_DEFAULT_SORT = 'chronological'
 EXCLUDED_LEAGUES = {"mls", "saudi pro league", "champions league", "europa league"}
 VINTED_HOST_PATTERN = re.compile(r'(^|\.)vinted\.[a-z.]+$', re.IGNORECASE)
 
 from werkzeug.security import check_password_hash
 
-def get_shirt_dir(shirt):
-    return os.path.join(
-        secure_filename(shirt.campionato),
-        secure_filename(shirt.brand),
-        secure_filename(shirt.squadra),
-        f"{shirt.id}_{secure_filename(shirt.taglia)}"
-    )
-
-def get_next_image_index(folder_path):
-    if not os.path.exists(folder_path):
-        return 1
-    indices = []
-    for f in os.listdir(folder_path):
-        name = os.path.splitext(f)[0]
-        if name.isdigit():
-            indices.append(int(name))
-    return max(indices) + 1 if indices else 1
-
-
 def get_next_product_code():
     dialect = db.session.bind.dialect.name if db.session.bind is not None else ''
     if dialect != 'mysql':
@@ -69,20 +57,7 @@ def get_next_product_code():
 
 
 def get_form_catalog_values():
-    brands = sorted(
-        [b[0] for b in db.session.query(Shirt.brand).filter(Shirt.brand.isnot(None), Shirt.brand != '').distinct().all()]
-    )
-    leagues = sorted(
-        [
-            l[0]
-            for l in db.session.query(Shirt.campionato).filter(Shirt.campionato.isnot(None), Shirt.campionato != '').distinct().all()
-            if str(l[0]).strip().lower() not in EXCLUDED_LEAGUES
-        ]
-    )
-    colors = sorted(
-        [c[0] for c in db.session.query(Shirt.colore).filter(Shirt.colore.isnot(None), Shirt.colore != '').distinct().all()]
-    )
-    return brands, leagues, colors
+    return get_form_facets()
 
 def parse_optional_decimal(value):
     if value is None:
@@ -121,43 +96,70 @@ def to_decimal(value):
     except (InvalidOperation, ValueError):
         return Decimal('0')
 
-def compute_inventory_summary(shirts):
-    total_spent = Decimal('0')
-    total_margin = Decimal('0')
-    sold_total_spent = Decimal('0')
-    sold_total_gain = Decimal('0')
-    for shirt in shirts:
-        price_paid = to_decimal(shirt.prezzo_pagato) if shirt.prezzo_pagato is not None else Decimal('0')
-        selling_price = to_decimal(shirt.internal_price) if shirt.internal_price is not None else None
-        total_spent += price_paid
-        if selling_price is not None and shirt.prezzo_pagato is not None:
-            total_margin += (selling_price - price_paid)
-            if shirt.sold:
-                sold_total_spent += price_paid
-                sold_total_gain += (selling_price - price_paid)
-
-    margin_percentage = Decimal('0')
-    if total_spent > 0:
-        margin_percentage = (total_margin / total_spent) * Decimal('100')
-
-    sold_gain_percentage = Decimal('0')
-    if sold_total_spent > 0:
-        sold_gain_percentage = (sold_total_gain / sold_total_spent) * Decimal('100')
-
-    return {
-        'total_spent': total_spent.quantize(Decimal('0.01')),
-        'total_margin': total_margin.quantize(Decimal('0.01')),
-        'margin_percentage': margin_percentage.quantize(Decimal('0.01')),
-        'sold_total_gain': sold_total_gain.quantize(Decimal('0.01')),
-        'sold_gain_percentage': sold_gain_percentage.quantize(Decimal('0.01')),
-    }
-
-
 def apply_status_filter(query, status_filter):
     if status_filter in {'active', 'draft'}:
         return query.filter(Shirt.status == status_filter)
     return query
 
+def apply_sold_filter(query, sold_filter):
+    if sold_filter == 'yes':
+        return query.filter(Shirt.sold.is_(True))
+    if sold_filter == 'no':
+        return query.filter(Shirt.sold.is_(False))
+    return query
+
+def apply_dashboard_filters(query, args):
+    """Narrow ``query`` by the dashboard's search box and filter args."""
+    q = args.get('q')
+    product_code_query = (args.get('product_code') or '').strip()
+    brand = args.get('brand')
+    squadra = args.get('squadra')
+    campionato = args.get('campionato')
+    colore = args.get('colore')
+    stagione = args.get('stagione')
+    shirt_type = args.get('type')
+    taglia = args.get('taglia')
+
+    if product_code_query:
+        if product_code_query.isdigit():
+            query = query.filter(Shirt.product_code == int(product_code_query))
+        else:
+            query = query.filter(Shirt.id == -1)
+    elif q:
+        search_scores = search_match_scores(q)
+        if search_scores is not None:
+            conditions = [Shirt.id.in_(select(search_scores.c.shirt_id))]
+        else:
+            conditions = [
+                Shirt.player_name.ilike(f'%{q}%'),
+                Shirt.squadra.ilike(f'%{q}%'),
+                Shirt.brand.ilike(f'%{q}%'),
+                Shirt.campionato.ilike(f'%{q}%'),
+                Shirt.descrizione.ilike(f'%{q}%'),
+                Shirt.type.ilike(f'%{q}%'),
+                Shirt.tipologia.ilike(f'%{q}%'),
+                cast(Shirt.product_code, String).ilike(f'%{q}%'),
+            ]
+        if q.isdigit():
+            conditions.append(Shirt.product_code == int(q))
+        query = query.filter(or_(*conditions))
+    if brand:
+        query = query.filter(Shirt.brand == brand)
+    if squadra:
+        query = query.filter(Shirt.squadra.ilike(f'%{squadra}%'))
+    if campionato:
+        query = query.filter(Shirt.campionato == campionato)
+    if colore:
+        query = query.filter(Shirt.colore == colore)
+    if stagione:
+        query = query.filter(Shirt.stagione == stagione)
+    if shirt_type:
+        query = query.filter(Shirt.type == shirt_type)
+    if taglia:
+        query = query.filter(Shirt.taglia == taglia)
+    query = apply_status_filter(query, args.get('status_filter'))
+    return apply_sold_filter(query, args.get('sold_filter'))
+
 
 @admin_bp.before_request
 def force_owner_english():
@@ -181,142 +183,55 @@ def logout():
     session.pop('logged_in', None)
     return redirect(url_for('public.catalog'))
 
+def dashboard_order(sort):
+    """ORDER BY for the dashboard sorts; the timeline ones match utils.season_sort_key.
+
+    Every sort orders by the columns of one index only, so a page is read in index order.
+    """
+    if sort == 'newest':
+        return Shirt.created_at.desc(), Shirt.id.desc()
+    timeline = (Shirt.season_sort, Shirt.created_at, Shirt.id)
+    if sort == 'reverse_chronological':
+        return tuple(column.desc() for column in timeline)
+    return timeline
+
 @admin_bp.route('/')
 @admin_bp.route('/dashboard')
 @login_required
 def dashboard():
-    query = Shirt.query
+    # Covers for every listed row arrive in one extra SELECT instead of one per shirt.
+    query = Shirt.query.options(selectinload(Shirt.cover_image))
 
-    q = request.args.get('q')
     product_code_query = (request.args.get('product_code') or '').strip()
-    brand = request.args.get('brand')
-    squadra = request.args.get('squadra')
-    campionato = request.args.get('campionato')
-    colore = request.args.get('colore')
-    stagione = request.args.get('stagione')
-    shirt_type = request.args.get('type')
-    taglia = request.args.get('taglia')
     status_filter = request.args.get('status_filter')
     sold_filter = request.args.get('sold_filter')
-    sort = request.args.get('sort', 'chronological')
-
-    if product_code_query:
-        if product_code_query.isdigit():
-            query = query.filter(Shirt.product_code == int(product_code_query))
-        else:
-            query = query.filter(Shirt.id == -1)
-    elif q:
-        conditions = [
-            Shirt.player_name.ilike(f'%{q}%'),
-            Shirt.squadra.ilike(f'%{q}%'),
-            Shirt.brand.ilike(f'%{q}%'),
-            Shirt.campionato.ilike(f'%{q}%'),
-            Shirt.descrizione.ilike(f'%{q}%'),
-            Shirt.type.ilike(f'%{q}%'),
-            Shirt.tipologia.ilike(f'%{q}%'),
-            cast(Shirt.product_code, String).ilike(f'%{q}%'),
-        ]
-        if q.isdigit():
-            conditions.append(Shirt.product_code == int(q))
-        query = query.filter(or_(*conditions))
-    if brand:
-        query = query.filter(Shirt.brand == brand)
-    if squadra:
-        query = query.filter(Shirt.squadra.ilike(f'%{squadra}%'))
-    if campionato:
-        query = query.filter(Shirt.campionato == campionato)
-    if colore:
-        query = query.filter(Shirt.colore == colore)
-    if stagione:
-        query = query.filter(Shirt.stagione == stagione)
-    if shirt_type:
-        query = query.filter(Shirt.type == shirt_type)
-    if taglia:
-        query = query.filter(Shirt.taglia == taglia)
-    query = apply_status_filter(query, status_filter)
-    counts_query = apply_status_filter(Shirt.query, status_filter)
-    if sold_filter == 'yes':
-        query = query.filter(Shirt.sold.is_(True))
-        counts_query = counts_query.filter(Shirt.sold.is_(True))
-    elif sold_filter == 'no':
-        query = query.filter(Shirt.sold.is_(False))
-        counts_query = counts_query.filter(Shirt.sold.is_(False))
+    sort = request.args.get('sort', DASHBOARD_DEFAULT_SORT)
 
-    all_shirts = Shirt.query.all()
-    inventory_summary = compute_inventory_summary(all_shirts)
+    query = apply_dashboard_filters(query, request.args)
+    counts_query = apply_sold_filter(apply_status_filter(Shirt.query, status_filter), sold_filter)
 
-    if sort == 'newest':
-        shirts = query.order_by(Shirt.created_at.desc()).all()
-    elif sort in {'oldest', 'chronological'}:
-        shirts = sorted(
-            query.all(),
-            key=lambda shirt: (season_sort_key(shirt.stagione), shirt.created_at or datetime.min),
-        )
-    elif sort == 'reverse_chronological':
-        shirts = sorted(
-            query.all(),
-            key=lambda shirt: (season_sort_key(shirt.stagione), shirt.created_at or datetime.min),
-            reverse=True,
-        )
-    else:
-        shirts = sorted(
-            query.all(),
-            key=lambda shirt: (season_sort_key(shirt.stagione), shirt.created_at or datetime.min),
-        )
+    inventory_summary = get_inventory_summary()
 
-    brand_counts = dict(
-        counts_query.with_entities(Shirt.brand, func.count(Shirt.id))
-        .filter(Shirt.brand.isnot(None), Shirt.brand != '')
-        .group_by(Shirt.brand)
-        .all()
-    )
-    league_counts = dict(
-        counts_query.with_entities(Shirt.campionato, func.count(Shirt.id))
-        .filter(Shirt.campionato.isnot(None), Shirt.campionato != '')
-        .group_by(Shirt.campionato)
-        .all()
-    )
-    color_counts = dict(
-        counts_query.with_entities(Shirt.colore, func.count(Shirt.id))
-        .filter(Shirt.colore.isnot(None), Shirt.colore != '')
-        .group_by(Shirt.colore)
-        .all()
-    )
-    types = counts_query.with_entities(Shirt.type).filter(
-        Shirt.type.isnot(None),
-        Shirt.type != '',
-        func.lower(Shirt.type) != 'none',
-    ).distinct().all()
-
-    season_counts = dict(
-        counts_query.with_entities(Shirt.stagione, func.count(Shirt.id))
-        .filter(Shirt.stagione.isnot(None), Shirt.stagione != '')
-        .group_by(Shirt.stagione)
-        .all()
-    )
-    type_counts = dict(
-        counts_query.with_entities(Shirt.type, func.count(Shirt.id))
-        .filter(
-            Shirt.type.isnot(None),
-            Shirt.type != '',
-            func.lower(Shirt.type) != 'none',
-        )
-        .group_by(Shirt.type)
-        .all()
-    )
-    team_counts = dict(
-        counts_query.with_entities(Shirt.squadra, func.count(Shirt.id))
-        .filter(Shirt.squadra.isnot(None), Shirt.squadra != '')
-        .group_by(Shirt.squadra)
-        .all()
-    )
-    size_counts = dict(
-        counts_query.with_entities(Shirt.taglia, func.count(Shirt.id))
-        .filter(Shirt.taglia.isnot(None), Shirt.taglia != '')
-        .group_by(Shirt.taglia)
-        .all()
+    shirts = query.order_by(*dashboard_order(sort)).paginate(
+        page=max(request.args.get('page', 1, type=int), 1),
+        per_page=DASHBOARD_PAGE_SIZE,
+        error_out=False,
     )
 
+    def page_url(page):
+        args = request.args.to_dict()
+        args['page'] = page
+        return url_for('admin.dashboard', **args)
+
+    facet_counts = dashboard_facet_counts(counts_query, (status_filter, sold_filter))
+    brand_counts = facet_counts['brand']
+    league_counts = facet_counts['league']
+    color_counts = facet_counts['color']
+    season_counts = facet_counts['season']
+    type_counts = facet_counts['type']
+    team_counts = facet_counts['team']
+    size_counts = facet_counts['size']
+
     stagioni = sorted([s for s in season_counts.keys() if s], key=season_sort_key)
     squadre = sorted([sq for sq in team_counts.keys() if sq])
     brands = sorted([b for b in brand_counts.keys() if b])
@@ -337,6 +252,7 @@ def dashboard():
     return render_template(
         'admin/dashboard.html',
         shirts=shirts,
+        page_url=page_url,
         inventory_summary=inventory_summary,
         product_code_query=product_code_query,
         status_filter=status_filter,
@@ -344,7 +260,7 @@ def dashboard():
         brands=brands,
         campionati=campionati,
         colori=colori,
-        types=sorted([t[0] for t in types if t[0]]),
+        types=sorted(type_counts),
         stagioni=stagioni,
         squadre=squadre,
         brand_counts=brand_counts,
@@ -364,6 +280,16 @@ def dashboard():
         taglie=taglie,
     )
 
+@admin_bp.route('/cache_stats')
+@login_required
+def catalog_cache_stats():
+    return jsonify(dict(
+        cache_stats(),
+        pages=page_cache_stats(),
+        fragments=fragment_cache_stats(),
+        dashboard_facets=dashboard_facet_stats(),
+    ))
+
 @admin_bp.route('/new', methods=['GET', 'POST'])
 @login_required
 def new_shirt():
@@ -407,29 +333,16 @@ def new_shirt():
             db.session.add(shirt)
             db.session.commit()
 
-            if shirt.descrizione and not shirt.descrizione_ita:
-                get_or_translate_description(shirt)
-
             files = request.files.getlist('images')
             cover_index = int(request.form.get('cover_index', 0))
-            
-            relative_dir = get_shirt_dir(shirt)
-            absolute_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], relative_dir)
-            if not os.path.exists(absolute_dir):
-                os.makedirs(absolute_dir)
 
             for i, file in enumerate(files):
                 if file and file.filename != '':
-                    ext = os.path.splitext(file.filename)[1].lower()
-                    unique_filename = f"{i + 1}{ext}"
-                    absolute_path = os.path.join(absolute_dir, unique_filename)
-                    file.save(absolute_path)
-                    normalize_product_image(absolute_path)
-                    
-                    db_path = os.path.join(relative_dir, unique_filename)
+                    db_path = save_upload(file, current_app.config['UPLOAD_FOLDER'])
                     
                     is_cover = (i == cover_index)
-                    img = ShirtImage(shirt_id=shirt.id, file_path=db_path, is_cover=is_cover)
+                    # Resized by `flask image-worker`; the upload request only stores the file.
+                    img = ShirtImage(shirt_id=shirt.id, file_path=db_path, is_cover=is_cover, processing_status='pending')
                     db.session.add(img)
             
             db.session.commit()
@@ -451,7 +364,6 @@ def new_shirt():
 def edit_shirt(shirt_id):
     brands, leagues, colors = get_form_catalog_values()
     shirt = Shirt.query.get_or_404(shirt_id)
-    old_relative_dir = get_shirt_dir(shirt)
     old_descrizione = shirt.descrizione
     
     if request.method == 'POST':
@@ -485,48 +397,13 @@ def edit_shirt(shirt_id):
                 shirt.descrizione_ita = None
             
             db.session.commit()
-
-            if shirt.descrizione and not shirt.descrizione_ita:
-                get_or_translate_description(shirt)
-            
-            new_relative_dir = get_shirt_dir(shirt)
-            if old_relative_dir != new_relative_dir:
-                old_absolute = os.path.join(current_app.config['UPLOAD_FOLDER'], old_relative_dir)
-                new_absolute = os.path.join(current_app.config['UPLOAD_FOLDER'], new_relative_dir)
-                
-                if os.path.exists(old_absolute):
-                    os.makedirs(os.path.dirname(new_absolute), exist_ok=True)
-                    shutil.move(old_absolute, new_absolute)
-                    
-                    try:
-                        os.removedirs(os.path.dirname(old_absolute))
-                    except OSError:
-                        pass
-                    
-                    for img in shirt.images:
-                        filename = os.path.basename(img.file_path)
-                        img.file_path = os.path.join(new_relative_dir, filename)
-                    db.session.commit()
             
             files = request.files.getlist('images')
             if files and files[0].filename != '':
-                relative_dir = get_shirt_dir(shirt)
-                absolute_dir = os.path.join(current_app.config['UPLOAD_FOLDER'], relative_dir)
-                if not os.path.exists(absolute_dir):
-                    os.makedirs(absolute_dir)
-
-                next_num = get_next_image_index(absolute_dir)
-
-                for i, file in enumerate(files):
+                for file in files:
                     if file and file.filename != '':
-                        ext = os.path.splitext(file.filename)[1].lower()
-                        unique_filename = f"{next_num + i}{ext}"
-                        absolute_path = os.path.join(absolute_dir, unique_filename)
-                        file.save(absolute_path)
-                        normalize_product_image(absolute_path)
-                        
-                        db_path = os.path.join(relative_dir, unique_filename)
-                        img = ShirtImage(shirt_id=shirt.id, file_path=db_path, is_cover=False)
+                        db_path = save_upload(file, current_app.config['UPLOAD_FOLDER'])
+                        img = ShirtImage(shirt_id=shirt.id, file_path=db_path, is_cover=False, processing_status='pending')
                         db.session.add(img)
                 db.session.commit()
 
@@ -577,7 +454,7 @@ def update_pricing(shirt_id):
             if paid_decimal > 0:
                 margin_percentage = ((margin_value / paid_decimal) * Decimal('100')).quantize(Decimal('0.01'))
 
-        summary = compute_inventory_summary(Shirt.query.all())
+        summary = get_inventory_summary()
 
         return jsonify({
             "ok": True,
@@ -600,19 +477,12 @@ def update_pricing(shirt_id):
 def delete_shirt(shirt_id):
     shirt = Shirt.query.get_or_404(shirt_id)
     try:
-        if shirt.images:
-            # All images for a shirt are in the same folder
-            first_img_path = shirt.images[0].file_path
-            folder_path = os.path.join(current_app.config['UPLOAD_FOLDER'], os.path.dirname(first_img_path))
-            if os.path.exists(folder_path):
-                shutil.rmtree(folder_path)
-                try:
-                    os.removedirs(os.path.dirname(folder_path))
-                except OSError:
-                    pass
-        
+        file_paths = {img.file_path for img in shirt.images}
         db.session.delete(shirt)
         db.session.commit()
+        # Files can be shared with other shirts, so they go only once nothing refers to them.
+        for file_path in file_paths:
+            release_image_file(file_path)
         flash('Shirt deleted successfully', 'success')
     except Exception as e:
         db.session.rollback()
@@ -620,18 +490,43 @@ def delete_shirt(shirt_id):
     
     return redirect(url_for('admin.dashboard'))
 
+@admin_bp.route('/bulk', methods=['POST'])
+@login_required
+def bulk_update():
+    """Apply sold/status/pricing/delete operations to many shirts in one transaction."""
+    try:
+        shirt_ids, operations = parse_bulk_request(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"ok": False, "error": str(e)}), 400
+    try:
+        result = apply_bulk_operations(shirt_ids, operations)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"ok": False, "error": str(e)}), 500
+
+    summary = result['summary']
+    return jsonify({
+        "ok": True,
+        "changed": result['changed'],
+        "deleted": result['deleted'],
+        "missing": result['missing'],
+        "summary_total_spent": f"{summary['total_spent']}",
+        "summary_total_margin": f"{summary['total_margin']}",
+        "summary_margin_percentage": f"{summary['margin_percentage']}",
+        "summary_sold_total_gain": f"{summary['sold_total_gain']}",
+        "summary_sold_gain_percentage": f"{summary['sold_gain_percentage']}",
+    })
+
 @admin_bp.route('/delete_image/<int:image_id>', methods=['POST'])
 @login_required
 def delete_image(image_id):
     img = ShirtImage.query.get_or_404(image_id)
     shirt_id = img.shirt_id
     try:
-        file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], img.file_path)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        
+        file_path = img.file_path
         db.session.delete(img)
         db.session.commit()
+        release_image_file(file_path)
         flash('Image deleted', 'success')
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             return jsonify({"ok": True})
@@ -642,3 +537,15 @@ def delete_image(image_id):
             return jsonify({"ok": False, "error": str(e)}), 500
     
     return redirect(url_for('admin.edit_shirt', shirt_id=shirt_id))
+
+@admin_bp.route('/image_status/<int:shirt_id>')
+@login_required
+def image_status(shirt_id):
+    """Processing state of a shirt's uploads, polled by the edit form until the worker is done."""
+    shirt = Shirt.query.get_or_404(shirt_id)
+    return jsonify({
+        "images": [
+            {"id": img.id, "status": img.processing_status, "url": image_url(img, w=640)}
+            for img in shirt.images
+        ]
+    })
@@ -1,16 +1,24 @@
 import os
-import random
-from flask import Blueprint, render_template, request, redirect, url_for, Response
+from flask import Blueprint, abort, g, jsonify, make_response, render_template, request, redirect, url_for, Response
 from flask_babel import get_locale
 from sqlalchemy import or_
 from sqlalchemy.orm import selectinload
-from app.models import Shirt
-from app.openrouter import get_or_translate_description
-from app.utils import build_shirt_slug, size_sort_key, team_name_localized_value
+from app.catalog_cache import get_catalog_facets
+from app.facet_index import boolean_key, get_facet_index
+from app.models import Shirt, db
+from app.translation_queue import translated_description
+from app.uploads import image_url
+from app.page_cache import cached_page, normalized_args
+from app.pagination import cached_count, keyset_paginate
+from app.search import search_match_scores
+from app.shirt_names import shirt_display_name, shirt_slug
+from app.sitemap import serve_sitemap
+from app.shuffle import apply_shuffle_order, resolve_shuffle_seed
+from app.utils import team_name_localized_value
 
 public_bp = Blueprint('public', __name__)
+CATALOG_PAGE_SIZE = 24
 CANONICAL_BASE_URL = os.getenv('CANONICAL_BASE_URL', 'https://kitaly-official.com').rstrip('/')
-EXCLUDED_LEAGUES = {"mls", "saudi pro league", "champions league", "europa league"}
 
 
 def parse_boolean_filter(value):
@@ -24,26 +32,46 @@ def parse_boolean_filter(value):
     return None
 
 
-def normalize_sleeve_group(value):
-    if not value:
-        return None
-    key = str(value).strip().lower()
-    if key in {'l/s', 'ls', 'long sleeve', 'long sleeves', 'long-sleeve', 'long-sleeves', 'maniche lunghe'}:
-        return 'long'
-    if key in {'s/s', 'ss', 'short sleeve', 'short sleeves', 'short-sleeve', 'short-sleeves', 'maniche corte'}:
-        return 'short'
-    if 'lunghe' in key or 'long' in key:
-        return 'long'
-    if 'corte' in key or 'short' in key:
-        return 'short'
-    return None
+def catalog_shuffle_seed():
+    """The shuffle seed for this request, picked once so the page cache key and the listing agree."""
+    if 'catalog_shuffle_seed' not in g:
+        g.catalog_shuffle_seed = resolve_shuffle_seed(request.args.get('seed', type=int))
+    return g.catalog_shuffle_seed
 
-@public_bp.route('/')
-@public_bp.route('/catalogue')
-def catalog():
-    locale = str(get_locale() or 'en')
+
+# Query args the catalog and its API read; requests with others bypass the page cache.
+CATALOG_QUERY_ARGS = frozenset({
+    'q', 'brand', 'squadra', 'campionato', 'colore', 'stagione', 'tipologia', 'type', 'maniche',
+    'taglia', 'player_name', 'nazionale', 'player_issued', 'sort', 'seed', 'page', 'after',
+})
+
+
+def catalog_cache_args():
+    """Page cache key for the catalog: normalized filters plus the seed, only when the listing is shuffled."""
+    args = dict(normalized_args(request.args, ignore={'seed'}))
+    sort = args.get('sort', (None,))[-1]
+    searching = 'q' in args
+    if sort == 'random' and not searching:
+        # The default sort, spelled out by the sort form.
+        del args['sort']
+    if sort not in {'newest', 'oldest'} and not (searching and sort is None):
+        args['seed'] = (str(catalog_shuffle_seed()),)
+    return tuple(sorted(args.items()))
+
+
+def shirt_page_version(shirt_id, slug=None):
+    """Detail pages only change with their own shirt, so edits elsewhere in the catalog keep them cached."""
+    updated_at = db.session.query(Shirt.updated_at).filter(Shirt.id == shirt_id).scalar()
+    return f'{shirt_id}:{updated_at.isoformat() if updated_at else None}'
+
+
+def catalog_listing(per_page, keyset=False):
+    """Filter, count, sort and paginate active shirts from the request args.
+
+    Shared by the catalog page and the JSON API; ``keyset`` seeks with a cursor
+    even on the first page, and raises ValueError for an ``after`` it cannot use.
+    """
     query = Shirt.query.options(selectinload(Shirt.images)).filter_by(status='active')
-    active_scope = Shirt.query.filter_by(status='active')
 
     def get_multi_arg(name):
         values = [v.strip() for v in request.args.getlist(name) if v and v.strip()]
@@ -54,7 +82,6 @@ def catalog():
             return [fallback.strip()]
         return []
 
-    # Filter logic
     q = (request.args.get('q') or '').strip()
     brands = get_multi_arg('brand')
     squadre = get_multi_arg('squadra')
@@ -75,9 +102,11 @@ def catalog():
         sort = 'random'
     seed = request.args.get('seed', type=int)
     page = max(request.args.get('page', 1, type=int), 1)
-    per_page = 24
 
-    if q:
+    search_scores = search_match_scores(q) if q else None
+    if search_scores is not None:
+        query = query.join(search_scores, search_scores.c.shirt_id == Shirt.id)
+    elif q:
         conditions = [
             Shirt.squadra.ilike(f'%{q}%'),
             Shirt.brand.ilike(f'%{q}%'),
@@ -85,94 +114,129 @@ def catalog():
             Shirt.descrizione.ilike(f'%{q}%'),
         ]
         query = query.filter(or_(*conditions))
-    if brands:
-        query = query.filter(Shirt.brand.in_(brands))
-    if squadre:
-        query = query.filter(Shirt.squadra.in_(squadre))
-    if campionati:
-        query = query.filter(Shirt.campionato.in_(campionati))
-    if colori:
-        query = query.filter(Shirt.colore.in_(colori))
-    if stagioni:
-        query = query.filter(Shirt.stagione.in_(stagioni))
-    if tipologie:
-        query = query.filter(Shirt.tipologia.in_(tipologie))
-    if shirt_types:
-        query = query.filter(Shirt.type.in_(shirt_types))
-    if taglie:
-        query = query.filter(Shirt.taglia.in_(taglie))
-    if maniche_values:
-        sleeve_clauses = []
-        for maniche in maniche_values:
-            sleeve_group = normalize_sleeve_group(maniche)
-            if sleeve_group == 'long':
-                sleeve_clauses.append(or_(
-                    Shirt.maniche.ilike('%L/S%'),
-                    Shirt.maniche.ilike('%Long%'),
-                    Shirt.maniche.ilike('%lunghe%'),
-                ))
-            elif sleeve_group == 'short':
-                sleeve_clauses.append(or_(
-                    Shirt.maniche.ilike('%S/S%'),
-                    Shirt.maniche.ilike('%Short%'),
-                    Shirt.maniche.ilike('%corte%'),
-                ))
-            else:
-                sleeve_clauses.append(Shirt.maniche == maniche)
-        query = query.filter(or_(*sleeve_clauses))
-    if player_names:
-        query = query.filter(Shirt.player_name.in_(player_names))
+    facet_index = get_facet_index()
+    selection = {
+        'brand': brands,
+        'squadra': squadre,
+        'campionato': campionati,
+        'colore': colori,
+        'stagione': stagioni,
+        'tipologia': tipologie,
+        'type': shirt_types,
+        'taglia': taglie,
+        'maniche': maniche_values,
+        'player_name': player_names,
+    }
     if player_issued_filter is not None:
-        query = query.filter(Shirt.player_issued.is_(player_issued_filter))
+        selection['player_issued'] = [boolean_key(player_issued_filter)]
     if nazionale_filter is not None:
-        query = query.filter(Shirt.nazionale.is_(nazionale_filter))
+        selection['nazionale'] = [boolean_key(nazionale_filter)]
+    selection = {field: values for field, values in selection.items() if values}
+    selected_mask = facet_index.match(selection)
+    if selection:
+        query = query.filter(Shirt.id.in_(facet_index.shirt_ids(selected_mask)))
+
+    count_key = tuple(sorted(
+        (key, tuple(values)) for key, values in request.args.lists()
+        if key not in {'sort', 'seed', 'page', 'after', 'lang'}
+    ))
+    if q:
+        total = cached_count(query, count_key)
+    else:
+        total = facet_index.count(selected_mask)
 
-    if sort == 'newest':
-        query = query.order_by(Shirt.created_at.desc())
-    elif sort == 'oldest':
-        query = query.order_by(Shirt.created_at.asc())
+    if search_scores is not None and not request.args.get('sort'):
+        # Searches without an explicit sort list the best matches first.
+        sort = 'relevance'
+        query = query.order_by(search_scores.c.score.desc(), Shirt.created_at.desc())
     elif sort == 'random':
-        if seed is None:
-            seed = random.randint(1, 2_147_483_646)
-        random_rank = ((Shirt.id * 1103515245) + seed) % 2147483647
-        query = query.order_by(random_rank.asc(), Shirt.id.asc())
-    else:
-        query = query.order_by(Shirt.created_at.desc())
-
-    shirts = query.paginate(page=page, per_page=per_page, error_out=False)
-
-    # Get unique values for filters
-    filter_brands = active_scope.with_entities(Shirt.brand).filter(Shirt.brand.isnot(None)).distinct().all()
-    filter_campionati = active_scope.with_entities(Shirt.campionato).filter(Shirt.campionato.isnot(None)).distinct().all()
-    filter_colori = active_scope.with_entities(Shirt.colore).filter(Shirt.colore.isnot(None)).distinct().all()
-    filter_stagioni = active_scope.with_entities(Shirt.stagione).filter(Shirt.stagione.isnot(None)).distinct().all()
-    filter_squadre = active_scope.with_entities(Shirt.squadra).filter(Shirt.squadra.isnot(None)).distinct().all()
-    filter_tipologie = active_scope.with_entities(Shirt.tipologia).filter(Shirt.tipologia.isnot(None)).distinct().all()
-    filter_types = active_scope.with_entities(Shirt.type).filter(Shirt.type.isnot(None)).distinct().all()
-    filter_maniche = active_scope.with_entities(Shirt.maniche).filter(Shirt.maniche.isnot(None)).distinct().all()
-    filter_player_names = active_scope.with_entities(Shirt.player_name).filter(Shirt.player_name.isnot(None)).distinct().all()
-    filter_taglie = active_scope.with_entities(Shirt.taglia).filter(Shirt.taglia.isnot(None)).distinct().all()
+        seed = catalog_shuffle_seed()
 
+    if sort == 'relevance':
+        sort_expr = None
+    elif sort == 'random':
+        query, sort_expr = apply_shuffle_order(query, seed)
+    else:
+        sort_expr = Shirt.created_at
+
+    after = request.args.get('after')
+    if keyset and after and sort_expr is None:
+        raise ValueError('Relevance-ranked searches page by number, not by cursor.')
+    if (after or keyset) and sort_expr is not None:
+        shirts = keyset_paginate(
+            query, sort, seed if sort == 'random' else None, sort_expr,
+            descending=(sort == 'newest'), after=after, per_page=per_page, total=total,
+            offset=(page - 1) * per_page, strict=keyset,
+        )
+    else:
+        if sort_expr is not None:
+            direction = sort_expr.desc() if sort == 'newest' else sort_expr.asc()
+            tiebreak = Shirt.id.desc() if sort == 'newest' else Shirt.id.asc()
+            query = query.order_by(direction, tiebreak)
+        shirts = query.paginate(page=page, per_page=per_page, error_out=False, count=False)
+        shirts.total = total
+
+    return {
+        'shirts': shirts,
+        'sort': sort,
+        'seed': seed,
+        'facet_index': facet_index,
+        'selection': selection,
+        'squadre': squadre,
+        'nazionale_filter': nazionale_filter,
+    }
+
+
+def catalog_base_args(sort, seed):
+    """The request's catalog args for building page links, pinned to the shuffle seed in use."""
     base_args = request.args.to_dict(flat=False)
+    base_args.pop('after', None)
     if sort == 'random' and seed is not None:
         base_args['seed'] = [str(seed)]
     else:
         base_args.pop('seed', None)
+    return base_args
+
+
+def build_catalog_url(endpoint, base_args, **changes):
+    args = {key: list(values) for key, values in base_args.items()}
+    for key, value in changes.items():
+        if value is None:
+            args.pop(key, None)
+        elif isinstance(value, list):
+            args[key] = [str(v) for v in value if v is not None and str(v).strip()]
+        else:
+            args[key] = [str(value)]
+    return url_for(endpoint, **args)
+
+
+@public_bp.route('/')
+@public_bp.route('/catalogue')
+@cached_page(key_args=catalog_cache_args, query_args=CATALOG_QUERY_ARGS)
+def catalog():
+    locale = str(get_locale() or 'en')
+    listing = catalog_listing(per_page=CATALOG_PAGE_SIZE)
+    shirts, sort, seed = listing['shirts'], listing['sort'], listing['seed']
+    squadre, nazionale_filter = listing['squadre'], listing['nazionale_filter']
+    facet_counts = listing['facet_index'].facet_counts(listing['selection'])
+
+    facets = get_catalog_facets(locale)
+
+    base_args = catalog_base_args(sort, seed)
 
     def catalog_url_for(**changes):
-        args = {key: list(values) for key, values in base_args.items()}
-        for key, value in changes.items():
-            if value is None:
-                args.pop(key, None)
-            elif isinstance(value, list):
-                args[key] = [str(v) for v in value if v is not None and str(v).strip()]
-            else:
-                args[key] = [str(value)]
-        return url_for('public.catalog', **args)
+        return build_catalog_url('public.catalog', base_args, **changes)
+
+    # Where the page's "Load more" button fetches the next cards from.
+    load_more_url = None
+    if shirts.has_next:
+        next_cursor = getattr(shirts, 'next_cursor', None)
+        if next_cursor:
+            load_more_url = build_catalog_url('public.catalog_api', base_args, after=next_cursor, page=None)
+        else:
+            load_more_url = build_catalog_url('public.catalog_api', base_args, page=shirts.next_num)
 
     selected_team_label = team_name_localized_value(squadre[0], locale) if len(squadre) == 1 else None
-    raw_squadre = sorted([sq[0] for sq in filter_squadre if sq[0]])
-    team_options = [{'value': sq, 'label': team_name_localized_value(sq, locale)} for sq in raw_squadre]
 
     def hierarchy_url(campionato=None, squadra=None):
         args = {}
@@ -186,71 +250,76 @@ def catalog():
 
     return render_template('public/catalog.html', 
                            shirts=shirts,
-                           brands=sorted([b[0] for b in filter_brands if b[0]]),
-                           campionati=sorted([
-                               c[0] for c in filter_campionati
-                               if c[0] and str(c[0]).strip().lower() not in EXCLUDED_LEAGUES
-                           ]),
-                           colori=sorted([col[0] for col in filter_colori if col[0]]),
-                           stagioni=sorted([s[0] for s in filter_stagioni if s[0]]),
-                           squadre=team_options,
-                           tipologie=sorted([t[0] for t in filter_tipologie if t[0]]),
-                           types=sorted([t[0] for t in filter_types if t[0]]),
-                           maniche_values=sorted([m[0] for m in filter_maniche if m[0]]),
-                           player_names=sorted([p[0] for p in filter_player_names if p[0]]),
-                           taglie=sorted([t[0] for t in filter_taglie if t[0]], key=size_sort_key),
+                           brands=facets['brands'],
+                           campionati=facets['campionati'],
+                           colori=facets['colori'],
+                           stagioni=facets['stagioni'],
+                           squadre=facets['squadre'],
+                           tipologie=facets['tipologie'],
+                           types=facets['types'],
+                           maniche_values=facets['maniche_values'],
+                           player_names=facets['player_names'],
+                           taglie=facets['taglie'],
+                           facet_counts=facet_counts,
                            shuffle_seed=seed,
                            catalog_url_for=catalog_url_for,
+                           load_more_url=load_more_url,
                            hierarchy_url=hierarchy_url,
                            selected_team_label=selected_team_label,
                            nazionale_filter=nazionale_filter)
 
+@public_bp.route('/api/v1/catalog')
+@cached_page(key_args=catalog_cache_args, query_args=CATALOG_QUERY_ARGS)
+def catalog_api():
+    """Compact card data for the catalog, one cursor page at a time, with the catalog's filters and sorts."""
+    locale = str(get_locale() or 'en')
+    try:
+        listing = catalog_listing(per_page=CATALOG_PAGE_SIZE, keyset=True)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    shirts = listing['shirts']
+
+    items = []
+    for shirt in shirts.items:
+        slug = shirt_slug(shirt, locale)
+        # The images are already loaded, so this resolves from the identity map without a query.
+        cover = shirt.cover_image
+        items.append({
+            'id': shirt.id,
+            'name': shirt_display_name(shirt, locale),
+            'slug': slug,
+            'url': url_for('public.shirt_detail', shirt_id=shirt.id, slug=slug),
+            'cover_url': image_url(cover, w=640) if cover else None,
+            'sold': shirt.is_sold,
+        })
+
+    next_url = None
+    if shirts.has_next:
+        base_args = catalog_base_args(listing['sort'], listing['seed'])
+        next_cursor = getattr(shirts, 'next_cursor', None)
+        if next_cursor:
+            next_url = build_catalog_url('public.catalog_api', base_args, after=next_cursor, page=None)
+        else:
+            # Relevance-ranked searches have no seek key and page by number instead.
+            next_url = build_catalog_url('public.catalog_api', base_args, page=shirts.next_num)
+
+    return jsonify({'items': items, 'total': shirts.total, 'next': next_url})
+
 @public_bp.route('/catalog')
 def catalog_redirect():
     return redirect(url_for('public.catalog'))
 
 @public_bp.route('/sitemap.xml')
 def sitemap():
-    shirts = Shirt.query.order_by(Shirt.created_at.desc()).all()
-    url_root = CANONICAL_BASE_URL
-
-    urls = [
-        {
-            "loc": f"{url_root}{url_for('public.catalog')}?lang=en",
-            "lastmod": None,
-        }
-    ]
-    urls.append(
-        {
-            "loc": f"{url_root}{url_for('public.catalog')}?lang=it",
-            "lastmod": None,
-        }
-    )
+    # Pre-generated gzip files, rewritten only after the catalog version changes.
+    return serve_sitemap(CANONICAL_BASE_URL)
 
-    for shirt in shirts:
-        lastmod = shirt.created_at.date().isoformat() if shirt.created_at else None
-        for locale in ['en', 'it']:
-            slug = build_shirt_slug(shirt, locale)
-            urls.append(
-                {
-                    "loc": f"{url_root}{url_for('public.shirt_detail', shirt_id=shirt.id, slug=slug)}?lang={locale}",
-                    "lastmod": lastmod,
-                }
-            )
-
-    xml_lines = [
-        '<?xml version="1.0" encoding="UTF-8"?>',
-        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
-    ]
-    for entry in urls:
-        xml_lines.append("  <url>")
-        xml_lines.append(f"    <loc>{entry['loc']}</loc>")
-        if entry["lastmod"]:
-            xml_lines.append(f"    <lastmod>{entry['lastmod']}</lastmod>")
-        xml_lines.append("  </url>")
-    xml_lines.append("</urlset>")
-
-    return Response("\n".join(xml_lines), mimetype="application/xml")
+@public_bp.route('/sitemap-<int:shard>.xml')
+def sitemap_shard(shard):
+    response = serve_sitemap(CANONICAL_BASE_URL, shard)
+    if response is None:
+        abort(404)
+    return response
 
 @public_bp.route('/robots.txt')
 def robots():
@@ -264,15 +333,16 @@ Sitemap: {url_root}{url_for('public.sitemap')}
 
 @public_bp.route('/shirt/<int:shirt_id>')
 @public_bp.route('/shirt/<int:shirt_id>-<slug>')
+@cached_page(version=shirt_page_version, query_args=())
 def shirt_detail(shirt_id, slug=None):
     shirt = Shirt.query.get_or_404(shirt_id)
     locale = str(get_locale() or 'en')
-    canonical_slug = build_shirt_slug(shirt, locale)
+    canonical_slug = shirt_slug(shirt, locale)
     if slug != canonical_slug:
         return redirect(url_for('public.shirt_detail', shirt_id=shirt.id, slug=canonical_slug), code=301)
 
     if locale == 'it':
-        display_description = get_or_translate_description(shirt)
+        display_description = translated_description(shirt)
     else:
         display_description = shirt.descrizione
 
@@ -303,7 +373,7 @@ def shirt_detail(shirt_id, slug=None):
         "Customer message: [Write your message here]\n"
     )
 
-    return render_template(
+    response = make_response(render_template(
         'public/shirt.html',
         shirt=shirt,
         display_description=display_description,
@@ -311,7 +381,9 @@ def shirt_detail(shirt_id, slug=None):
         instagram_message=(instagram_it if locale == 'it' else instagram_en),
         email_subject=email_subject,
         email_body=(email_body_it if locale == 'it' else email_body_en),
-    )
+    ))
+    response.last_modified = shirt.updated_at
+    return response
 
 # Security Honeypots - Redirect common admin guesses to the catalog
 @public_bp.route('/admin')
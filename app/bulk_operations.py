@@ -0,0 +1,149 @@
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import delete, or_, select, update
+
+from app.catalog_cache import mark_catalog_changed
+from app.image_store import release_image_file
+from app.inventory_summary import apply_totals_change, get_inventory_summary, snapshot_totals
+from app.models import db, Shirt, ShirtImage, ShirtSearchDocument, ShirtShuffleRank, TranslationJob
+
+
+BULK_OPERATIONS = ('sold', 'status', 'pricing', 'delete')
+BULK_STATUSES = ('active', 'draft')
+BULK_MAX_SHIRTS = 1000
+
+
+def _parse_price(value, label):
+    if value is None or not str(value).strip():
+        return None
+    try:
+        price = Decimal(str(value).strip())
+    except (InvalidOperation, ValueError):
+        raise ValueError(f'{label} must be a number.')
+    if not price.is_finite():
+        raise ValueError(f'{label} must be a number.')
+    return price
+
+
+def parse_bulk_request(payload):
+    """Validate a bulk request body; returns (shirt_ids, operations) or raises ValueError.
+
+    The body looks like {"ids": [1, 2], "operations": [{"op": "sold", "value": true}, ...]}.
+    Operations run in the order given: ``sold`` and ``status`` take a ``value``, ``pricing``
+    sets whichever of ``price_paid`` / ``selling_price`` it names (null or '' clears one),
+    and ``delete`` takes nothing.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError('Expected a JSON object.')
+    raw_ids = payload.get('ids')
+    if not isinstance(raw_ids, list) or not raw_ids:
+        raise ValueError('ids must be a non-empty list of shirt ids.')
+    if any(isinstance(shirt_id, bool) or not isinstance(shirt_id, int) for shirt_id in raw_ids):
+        raise ValueError('ids must be a non-empty list of shirt ids.')
+    shirt_ids = set(raw_ids)
+    if len(shirt_ids) > BULK_MAX_SHIRTS:
+        raise ValueError(f'At most {BULK_MAX_SHIRTS} shirts can be changed at once.')
+
+    raw_operations = payload.get('operations')
+    if not isinstance(raw_operations, list) or not raw_operations:
+        raise ValueError('operations must be a non-empty list.')
+    operations = []
+    for operation in raw_operations:
+        name = operation.get('op') if isinstance(operation, dict) else None
+        if name not in BULK_OPERATIONS:
+            raise ValueError(f'Unknown operation {name!r}; expected one of {", ".join(BULK_OPERATIONS)}.')
+        if name == 'sold':
+            if not isinstance(operation.get('value'), bool):
+                raise ValueError('sold needs a true or false value.')
+            operations.append((name, {'sold': operation['value']}))
+        elif name == 'status':
+            if operation.get('value') not in BULK_STATUSES:
+                raise ValueError(f'status must be one of {", ".join(BULK_STATUSES)}.')
+            operations.append((name, {'status': operation['value']}))
+        elif name == 'pricing':
+            values = {}
+            if 'price_paid' in operation:
+                price_paid = _parse_price(operation['price_paid'], 'price_paid')
+                values['prezzo_pagato'] = float(price_paid) if price_paid is not None else None
+            if 'selling_price' in operation:
+                values['internal_price'] = _parse_price(operation['selling_price'], 'selling_price')
+            if not values:
+                raise ValueError('pricing needs price_paid and/or selling_price.')
+            operations.append((name, values))
+        else:
+            operations.append((name, {}))
+    return shirt_ids, operations
+
+
+def _update_shirts(connection, shirt_ids, values, now):
+    """UPDATE the shirts whose columns differ from ``values``; returns the ids that changed."""
+    differs = or_(*(getattr(Shirt, name).is_distinct_from(value) for name, value in values.items()))
+    changed = set(connection.execute(select(Shirt.id).where(Shirt.id.in_(shirt_ids), differs)).scalars())
+    if changed:
+        # Core statements skip the model's onupdate bookkeeping, so updated_at is set here.
+        connection.execute(update(Shirt).where(Shirt.id.in_(changed)).values(updated_at=now, **values))
+    return changed
+
+
+def _delete_shirts(connection, shirt_ids):
+    """DELETE the shirts and every row hanging off them; returns the image files they used."""
+    file_paths = set(connection.execute(
+        select(ShirtImage.file_path).where(ShirtImage.shirt_id.in_(shirt_ids)).distinct()
+    ).scalars())
+    # Children first, explicitly: SQLite does not enforce the ON DELETE CASCADE clauses.
+    for model in (TranslationJob, ShirtShuffleRank, ShirtSearchDocument, ShirtImage):
+        connection.execute(delete(model).where(model.shirt_id.in_(shirt_ids)))
+    connection.execute(delete(Shirt).where(Shirt.id.in_(shirt_ids)))
+    return file_paths
+
+
+def apply_bulk_operations(shirt_ids, operations):
+    """Apply parsed operations to many shirts with set-based statements, in one transaction.
+
+    The statements bypass the session hooks, so this does their work for the columns it writes:
+    inventory_summary gets one delta for the whole batch, and the catalog version is bumped on
+    commit, which also patches the facet index and prunes cached pages. Deletes remove the
+    search documents, shuffle ranks and translation jobs too, and release the image files only
+    after the commit. Sold, status and prices feed no slug, display name, search document or
+    other derived column, so those are left alone.
+
+    Returns a dict with the changed, deleted and missing ids and the refreshed summary.
+    """
+    connection = db.session.connection()
+    # Lock the rows up front so the before/after totals cannot interleave with another writer.
+    existing = set(connection.execute(
+        select(Shirt.id).where(Shirt.id.in_(shirt_ids)).with_for_update()
+    ).scalars())
+    before = snapshot_totals(connection, existing)
+    now = datetime.utcnow()
+
+    remaining = set(existing)
+    changed = set()
+    deleted = set()
+    file_paths = set()
+    for name, values in operations:
+        if not remaining:
+            break
+        if name == 'delete':
+            file_paths |= _delete_shirts(connection, remaining)
+            deleted |= remaining
+            remaining = set()
+        else:
+            changed |= _update_shirts(connection, remaining, values, now)
+
+    # Deleted rows are gone now, so they only appear on the "before" side.
+    apply_totals_change(connection, before, snapshot_totals(connection, remaining))
+    mark_catalog_changed(db.session, changed | deleted)
+    db.session.commit()
+
+    # Files can be shared with other shirts, so they go only once nothing refers to them.
+    for file_path in file_paths:
+        release_image_file(file_path)
+
+    return {
+        'changed': sorted(changed - deleted),
+        'deleted': sorted(deleted),
+        'missing': sorted(set(shirt_ids) - existing),
+        'summary': get_inventory_summary(),
+    }
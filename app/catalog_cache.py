@@ -0,0 +1,298 @@
+import hashlib
+import json
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: the development server is a single process.
+    fcntl = None
+
+from blinker import Namespace
+from flask import current_app
+from sqlalchemy import event
+
+from app.models import db, Shirt, ShirtImage
+from app.utils import size_sort_key, team_name_localized_value
+
+
+EXCLUDED_LEAGUES = {"mls", "saudi pro league", "champions league", "europa league"}
+FACET_LOCALES = ('en', 'it')
+VERSION_FILENAME = 'catalog.version'
+VERSION_LOCK_FILENAME = 'catalog.version.lock'
+FACETS_FILENAME = 'facets.json'
+
+# Columns offered as public catalog filters, keyed by the template variable name.
+CATALOG_FACET_COLUMNS = {
+    'brands': 'brand',
+    'campionati': 'campionato',
+    'colori': 'colore',
+    'stagioni': 'stagione',
+    'squadre': 'squadra',
+    'tipologie': 'tipologia',
+    'types': 'type',
+    'maniche_values': 'maniche',
+    'player_names': 'player_name',
+    'taglie': 'taglia',
+}
+
+# Sent after a commit that touched shirts or their images, with the affected shirt ids.
+catalog_changed = Namespace().signal('catalog-changed')
+
+_lock = threading.Lock()
+_version_lock = threading.Lock()
+_memory = {'version': None, 'facets': None}
+_stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _cache_dir():
+    return current_app.config['CACHE_FOLDER']
+
+
+def _write_atomic(path, content):
+    temp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as handle:
+        handle.write(content)
+    os.replace(temp_path, path)
+
+
+def deploy_stamp():
+    """Fingerprint of the code, templates and database in use, the same for every worker of a deploy."""
+    app = current_app._get_current_object()
+    stamp = app.extensions.get('catalog_deploy_stamp')
+    if stamp is None:
+        digest = hashlib.sha1(app.config['SQLALCHEMY_DATABASE_URI'].encode('utf-8'))
+        folders = (
+            app.root_path,
+            os.path.join(app.root_path, app.template_folder),
+            os.path.join(app.root_path, app.config['BABEL_TRANSLATION_DIRECTORIES']),
+        )
+        for folder in folders:
+            for dirpath, dirnames, filenames in os.walk(folder):
+                dirnames[:] = sorted(name for name in dirnames if name != '__pycache__')
+                for name in sorted(filenames):
+                    if name.endswith(('.py', '.html', '.mo')):
+                        info = os.stat(os.path.join(dirpath, name))
+                        digest.update(f'{name}:{info.st_size}:{info.st_mtime_ns};'.encode('utf-8'))
+        stamp = app.extensions['catalog_deploy_stamp'] = digest.hexdigest()[:12]
+    return stamp
+
+
+def _stored_version():
+    path = os.path.join(_cache_dir(), VERSION_FILENAME)
+    try:
+        with open(path, encoding='utf-8') as handle:
+            return handle.read().strip()
+    except FileNotFoundError:
+        return ''
+
+
+@contextmanager
+def _locked_version():
+    """Hold the version file still, across the threads and processes sharing CACHE_FOLDER."""
+    with _version_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(_cache_dir(), VERSION_LOCK_FILENAME), 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _write_new_version():
+    version = uuid.uuid4().hex
+    _write_atomic(os.path.join(_cache_dir(), VERSION_FILENAME), version)
+    _stats['invalidations'] += 1
+    return version
+
+
+def catalog_version():
+    """Return the shared catalog version token, bumped after every shirt write.
+
+    The token carries the deploy stamp, so a deploy (or a switch to another database) starts
+    every derived cache afresh while plain restarts keep them.
+    """
+    version = _stored_version()
+    if not version:
+        with _locked_version():
+            version = _stored_version() or _write_new_version()
+    return f'{deploy_stamp()}-{version}'
+
+
+def catalog_last_modified():
+    """When the current catalog version was written, for Last-Modified headers."""
+    catalog_version()
+    mtime = os.path.getmtime(os.path.join(_cache_dir(), VERSION_FILENAME))
+    return datetime.fromtimestamp(int(mtime), tz=timezone.utc)
+
+
+def swap_catalog_version():
+    """Replace the catalog version; returns (previous, new) as one compare-and-swap.
+
+    Concurrent commits get a chain of versions, each one's ``previous`` being the version the
+    other wrote, so no two of them patch derived caches from the same starting point.
+    ``previous`` is None if there was no version yet.
+    """
+    with _locked_version():
+        previous = _stored_version()
+        version = _write_new_version()
+    stamp = deploy_stamp()
+    return (f'{stamp}-{previous}' if previous else None), f'{stamp}-{version}'
+
+
+def bump_catalog_version():
+    return swap_catalog_version()[1]
+
+
+def _sorted_values(rows, column, skip_blank=False):
+    values = {row[column] for row in rows if row[column]}
+    if skip_blank:
+        values = {value for value in values if str(value).strip()}
+    return sorted(values)
+
+
+def _build_facets():
+    columns = ['status'] + sorted(set(CATALOG_FACET_COLUMNS.values()))
+    rows = [
+        dict(zip(columns, row))
+        for row in db.session.query(*[getattr(Shirt, name) for name in columns]).distinct().all()
+    ]
+    active_rows = [row for row in rows if row['status'] == 'active']
+
+    catalog = {name: _sorted_values(active_rows, column) for name, column in CATALOG_FACET_COLUMNS.items()}
+    catalog['campionati'] = [
+        league for league in catalog['campionati'] if str(league).strip().lower() not in EXCLUDED_LEAGUES
+    ]
+    catalog['taglie'] = sorted(catalog['taglie'], key=size_sort_key)
+    raw_squadre = catalog.pop('squadre')
+
+    locales = {}
+    for locale in FACET_LOCALES:
+        locales[locale] = {
+            'squadre': [{'value': sq, 'label': team_name_localized_value(sq, locale)} for sq in raw_squadre],
+        }
+
+    form = {
+        'brands': _sorted_values(rows, 'brand', skip_blank=True),
+        'leagues': [
+            league for league in _sorted_values(rows, 'campionato', skip_blank=True)
+            if str(league).strip().lower() not in EXCLUDED_LEAGUES
+        ],
+        'colors': _sorted_values(rows, 'colore', skip_blank=True),
+    }
+    return {'catalog': catalog, 'locales': locales, 'form': form}
+
+
+def _load_facets():
+    version = catalog_version()
+    with _lock:
+        if _memory['version'] == version and _memory['facets'] is not None:
+            _stats['hits'] += 1
+            return _memory['facets']
+
+    path = os.path.join(_cache_dir(), FACETS_FILENAME)
+    facets = None
+    try:
+        with open(path, encoding='utf-8') as handle:
+            stored = json.load(handle)
+        if stored.get('version') == version:
+            facets = stored['facets']
+            _stats['shared_hits'] += 1
+    except (FileNotFoundError, ValueError, KeyError):
+        pass
+
+    if facets is None:
+        _stats['misses'] += 1
+        facets = _build_facets()
+        _write_atomic(path, json.dumps({'version': version, 'facets': facets}))
+
+    with _lock:
+        _memory['version'] = version
+        _memory['facets'] = facets
+    return facets
+
+
+def get_catalog_facets(locale):
+    """Filter option lists for the public catalog, restricted to active shirts."""
+    facets = _load_facets()
+    values = dict(facets['catalog'])
+    values.update(facets['locales'].get(locale) or facets['locales']['en'])
+    return values
+
+
+def get_form_facets():
+    """Brand, league and colour suggestions for the admin shirt form (all statuses)."""
+    form = _load_facets()['form']
+    return form['brands'], form['leagues'], form['colors']
+
+
+def cache_stats():
+    return dict(_stats, pid=os.getpid(), version=catalog_version())
+
+
+def _changed_shirt_ids(session):
+    shirt_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Shirt):
+            shirt_ids.add(obj.id)
+        elif isinstance(obj, ShirtImage):
+            shirt_ids.add(obj.shirt_id)
+    shirt_ids.discard(None)
+    return shirt_ids
+
+
+def _touch_image_owners(session, flush_context, instances):
+    """Image writes change what a shirt's pages show, so they bump the shirt's updated_at too."""
+    now = datetime.utcnow()
+    with session.no_autoflush:
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if not isinstance(obj, ShirtImage) or obj.shirt_id is None:
+                continue
+            shirt = session.get(Shirt, obj.shirt_id)
+            if shirt is not None and shirt not in session.deleted:
+                shirt.updated_at = now
+
+
+def mark_catalog_changed(session, shirt_ids):
+    """Bump the catalog version when ``session`` commits; for writes that bypass the ORM flush."""
+    if shirt_ids:
+        session.info.setdefault('catalog_changed', set()).update(shirt_ids)
+
+
+def _after_flush(session, flush_context):
+    mark_catalog_changed(session, _changed_shirt_ids(session))
+
+
+def _after_commit(session):
+    shirt_ids = session.info.pop('catalog_changed', None)
+    if shirt_ids:
+        previous_version, version = swap_catalog_version()
+        catalog_changed.send(
+            current_app._get_current_object(),
+            previous_version=previous_version,
+            version=version,
+            shirt_ids=shirt_ids,
+        )
+
+
+def _after_rollback(session, previous_transaction):
+    session.info.pop('catalog_changed', None)
+
+
+def init_app(app):
+    cache_dir = app.config['CACHE_FOLDER']
+    if not os.path.exists(cache_dir):
+        os.makedirs(cache_dir)
+
+    if not event.contains(db.session, 'before_flush', _touch_image_owners):
+        event.listen(db.session, 'before_flush', _touch_image_owners)
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_soft_rollback', _after_rollback)
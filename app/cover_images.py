@@ -0,0 +1,50 @@
+from sqlalchemy import event, select, update
+
+from app.models import db, Shirt, ShirtImage
+
+
+def cover_image_subquery():
+    """The image a shirt shows as its cover: the one flagged is_cover, else the oldest upload."""
+    return (
+        select(ShirtImage.id)
+        .where(ShirtImage.shirt_id == Shirt.id)
+        .order_by(ShirtImage.is_cover.desc(), ShirtImage.id.asc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def refresh_cover_images(connection, shirt_ids=None):
+    """Recompute shirts.cover_image_id for the given shirts, or for all of them."""
+    # Keep updated_at as is: the image writes behind this already touched it (app.catalog_cache).
+    statement = update(Shirt).values(cover_image_id=cover_image_subquery(), updated_at=Shirt.updated_at)
+    if shirt_ids is not None:
+        statement = statement.where(Shirt.id.in_(list(shirt_ids)))
+    connection.execute(statement.execution_options(synchronize_session=False))
+
+
+def _after_flush(session, flush_context):
+    shirt_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, ShirtImage) and obj.shirt_id is not None:
+            shirt_ids.add(obj.shirt_id)
+    if not shirt_ids:
+        return
+
+    refresh_cover_images(session.connection(), shirt_ids)
+    session.info.setdefault('cover_image_shirt_ids', set()).update(shirt_ids)
+
+
+def _after_flush_postexec(session, flush_context):
+    # The UPDATE above bypassed the ORM; reload the pointer on shirts already in the session.
+    for shirt_id in session.info.pop('cover_image_shirt_ids', ()):
+        shirt = session.identity_map.get(session.identity_key(Shirt, shirt_id))
+        if shirt is not None:
+            session.expire(shirt, ['cover_image_id', 'cover_image'])
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+    if not event.contains(db.session, 'after_flush_postexec', _after_flush_postexec):
+        event.listen(db.session, 'after_flush_postexec', _after_flush_postexec)
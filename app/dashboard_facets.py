@@ -0,0 +1,101 @@
+import os
+import threading
+
+from sqlalchemy import func, literal, union_all
+
+from app.catalog_cache import catalog_version
+from app.models import db, Shirt
+
+
+# Dashboard counter name -> Shirt column.
+DASHBOARD_FACET_COLUMNS = {
+    'brand': 'brand',
+    'league': 'campionato',
+    'color': 'colore',
+    'season': 'stagione',
+    'type': 'type',
+    'team': 'squadra',
+    'size': 'taglia',
+}
+# Dialects that get every counter from one UNION ALL of per-column GROUP BYs, each of which can
+# walk its (column, status) index. Anything else folds one grouped narrow projection in Python.
+UNION_ALL_DIALECTS = {'mysql', 'sqlite'}
+FACET_CACHE_SIZE = 64
+
+_lock = threading.Lock()
+_cache = {'version': None, 'counts': {}}
+_stats = {'hits': 0, 'misses': 0}
+
+
+def _counted(name, value):
+    # Blank values are not offered as filters, and 'None' is how old imports spelled a missing type.
+    if value is None or value == '':
+        return False
+    return name != 'type' or str(value).lower() != 'none'
+
+
+def _union_all_counts(query):
+    selects = []
+    for name, field in DASHBOARD_FACET_COLUMNS.items():
+        column = getattr(Shirt, field)
+        conditions = [column.isnot(None), column != '']
+        if name == 'type':
+            conditions.append(func.lower(column) != 'none')
+        selects.append(
+            query.with_entities(literal(name).label('facet'), column.label('value'), func.count(Shirt.id))
+            .filter(*conditions)
+            .group_by(column)
+            .order_by(None)
+            .statement
+        )
+    counts = {name: {} for name in DASHBOARD_FACET_COLUMNS}
+    for name, value, total in db.session.execute(union_all(*selects)):
+        counts[name][value] = total
+    return counts
+
+
+def _grouped_counts(query):
+    columns = [getattr(Shirt, field) for field in DASHBOARD_FACET_COLUMNS.values()]
+    rows = query.with_entities(*columns, func.count(Shirt.id)).group_by(*columns).order_by(None)
+    counts = {name: {} for name in DASHBOARD_FACET_COLUMNS}
+    for row in rows:
+        total = row[-1]
+        for name, value in zip(DASHBOARD_FACET_COLUMNS, row):
+            if _counted(name, value):
+                counts[name][value] = counts[name].get(value, 0) + total
+    return counts
+
+
+def compute_facet_counts(query):
+    """{counter: {value: shirts}} for every dashboard counter over ``query``, in one statement."""
+    if db.session.get_bind().dialect.name in UNION_ALL_DIALECTS:
+        return _union_all_counts(query)
+    return _grouped_counts(query)
+
+
+def dashboard_facet_counts(query, key):
+    """compute_facet_counts(query), remembered under ``key`` until the next catalog write.
+
+    The returned dicts are shared between requests; callers must not modify them.
+    """
+    version = catalog_version()
+    with _lock:
+        if _cache['version'] != version:
+            _cache['version'] = version
+            _cache['counts'] = {}
+        if key in _cache['counts']:
+            _stats['hits'] += 1
+            return _cache['counts'][key]
+
+    _stats['misses'] += 1
+    counts = compute_facet_counts(query)
+    with _lock:
+        if _cache['version'] == version:
+            if len(_cache['counts']) >= FACET_CACHE_SIZE:
+                _cache['counts'].clear()
+            _cache['counts'][key] = counts
+    return counts
+
+
+def dashboard_facet_stats():
+    return dict(_stats, pid=os.getpid(), entries=len(_cache['counts']))
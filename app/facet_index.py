@@ -0,0 +1,292 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import uuid
+
+from flask import current_app
+from sqlalchemy import select
+
+from app.catalog_cache import catalog_changed, catalog_version
+from app.models import db, Shirt
+from app.utils import normalize_sleeve_group
+
+
+# Categorical columns of active shirts, each value mapped to a bitset of shirt positions.
+FACET_FIELDS = (
+    'brand',
+    'squadra',
+    'campionato',
+    'colore',
+    'stagione',
+    'tipologia',
+    'type',
+    'maniche',
+    'taglia',
+    'player_name',
+    'nazionale',
+    'player_issued',
+)
+BOOLEAN_FIELDS = {'nazionale', 'player_issued'}
+# A long/short selection matches any stored maniche containing one of these, case-insensitively,
+# as the catalog's ILIKE filter did; free-form spellings such as 'L/S player' stay covered.
+SLEEVE_GROUP_FRAGMENTS = {
+    'long': ('l/s', 'long', 'lunghe'),
+    'short': ('s/s', 'short', 'corte'),
+}
+SNAPSHOT_FILENAME = 'facet_index.bin'
+SNAPSHOT_MAGIC = b'KFX1'
+
+_lock = threading.Lock()
+_loaded = {'index': None}
+
+
+def _popcount(value):
+    return bin(value).count('1')
+
+
+def _bit_positions(value):
+    position = 0
+    while value:
+        if value & 1:
+            yield position
+        value >>= 1
+        position += 1
+
+
+def _value_key(field, value):
+    if field in BOOLEAN_FIELDS:
+        return '1' if value else '0'
+    return value or None
+
+
+def boolean_key(value):
+    return '1' if value else '0'
+
+
+class _MappedBitmaps(dict):
+    """Bitmaps for one field, decoded from the shared snapshot the first time each value is read."""
+
+    def __init__(self, buffer, offsets):
+        super().__init__()
+        self._buffer = buffer
+        self._offsets = offsets
+
+    def __missing__(self, value):
+        offset, length = self._offsets[value]
+        bits = int.from_bytes(self._buffer[offset:offset + length], 'little')
+        self[value] = bits
+        return bits
+
+    def get(self, value, default=None):
+        if value in self._offsets or dict.__contains__(self, value):
+            return self[value]
+        return default
+
+    def keys(self):
+        return set(self._offsets) | set(dict.keys(self))
+
+    def items(self):
+        return [(value, self[value]) for value in self.keys()]
+
+    def __contains__(self, value):
+        return value in self._offsets or dict.__contains__(self, value)
+
+
+class FacetIndex:
+    def __init__(self, version, shirt_ids, live, bitmaps):
+        self.version = version
+        self.shirt_ids_by_position = shirt_ids
+        self.positions = {shirt_id: position for position, shirt_id in enumerate(shirt_ids)}
+        self.live = live
+        self.bitmaps = bitmaps
+
+    @classmethod
+    def build(cls, version, rows):
+        index = cls(version, [], 0, {field: {} for field in FACET_FIELDS})
+        index.apply_rows(rows, ())
+        return index
+
+    def apply_rows(self, rows, removed_ids):
+        """Patch the bitmaps in place for changed shirts; rows are the active ones still present."""
+        changed_ids = set(removed_ids) | {row['id'] for row in rows}
+        clear_mask = 0
+        for shirt_id in changed_ids:
+            if shirt_id in self.positions:
+                clear_mask |= 1 << self.positions[shirt_id]
+        if clear_mask:
+            keep = ~clear_mask
+            self.live &= keep
+            for field in FACET_FIELDS:
+                bitmaps = self.bitmaps[field]
+                for value in list(bitmaps.keys()):
+                    bitmaps[value] = bitmaps[value] & keep
+
+        for row in rows:
+            position = self.positions.get(row['id'])
+            if position is None:
+                position = len(self.shirt_ids_by_position)
+                self.shirt_ids_by_position.append(row['id'])
+                self.positions[row['id']] = position
+            bit = 1 << position
+            self.live |= bit
+            for field in FACET_FIELDS:
+                value = _value_key(field, row[field])
+                if value is not None:
+                    bitmaps = self.bitmaps[field]
+                    bitmaps[value] = bitmaps.get(value, 0) | bit
+
+    def _value_bits(self, field, value):
+        if field == 'maniche':
+            group = normalize_sleeve_group(value)
+            if group:
+                fragments = SLEEVE_GROUP_FRAGMENTS[group]
+                bits = 0
+                for stored, stored_bits in self.bitmaps['maniche'].items():
+                    if any(fragment in stored.lower() for fragment in fragments):
+                        bits |= stored_bits
+                return bits
+        return self.bitmaps[field].get(value, 0)
+
+    def match(self, selection):
+        """Bitset of shirts matching every field in selection (values within a field are OR-ed)."""
+        mask = self.live
+        for field, values in selection.items():
+            union = 0
+            for value in values:
+                union |= self._value_bits(field, value)
+            mask &= union
+        return mask
+
+    def count(self, mask):
+        return _popcount(mask)
+
+    def shirt_ids(self, mask):
+        return [self.shirt_ids_by_position[position] for position in _bit_positions(mask)]
+
+    def facet_counts(self, selection):
+        """Per-value counts for each field, conditioned on the selection in every other field."""
+        counts = {}
+        for field in FACET_FIELDS:
+            mask = self.match({other: values for other, values in selection.items() if other != field})
+            field_counts = {}
+            for value, bits in self.bitmaps[field].items():
+                total = _popcount(bits & mask)
+                if total:
+                    field_counts[value] = total
+            counts[field] = field_counts
+        return counts
+
+    def dumps(self):
+        blobs = []
+        offset = 0
+
+        def add(bits):
+            nonlocal offset
+            data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+            blobs.append(data)
+            location = [offset, len(data)]
+            offset += len(data)
+            return location
+
+        header = {
+            'version': self.version,
+            'ids': self.shirt_ids_by_position,
+            'live': add(self.live),
+            'facets': {
+                field: {value: add(bits) for value, bits in self.bitmaps[field].items() if bits}
+                for field in FACET_FIELDS
+            },
+        }
+        header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        return SNAPSHOT_MAGIC + struct.pack('<I', len(header_bytes)) + header_bytes + b''.join(blobs)
+
+    @classmethod
+    def from_buffer(cls, buffer):
+        if buffer[:4] != SNAPSHOT_MAGIC:
+            raise ValueError('not a facet index snapshot')
+        (header_length,) = struct.unpack('<I', buffer[4:8])
+        header = json.loads(bytes(buffer[8:8 + header_length]).decode('utf-8'))
+        data = memoryview(buffer)[8 + header_length:]
+        live_offset, live_length = header['live']
+        live = int.from_bytes(data[live_offset:live_offset + live_length], 'little')
+        bitmaps = {field: _MappedBitmaps(data, header['facets'].get(field, {})) for field in FACET_FIELDS}
+        return cls(header['version'], header['ids'], live, bitmaps)
+
+
+def _snapshot_path():
+    return os.path.join(current_app.config['CACHE_FOLDER'], SNAPSHOT_FILENAME)
+
+
+def _write_snapshot(index):
+    path = _snapshot_path()
+    temp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, 'wb') as handle:
+        handle.write(index.dumps())
+    os.replace(temp_path, path)
+
+
+def _read_snapshot():
+    try:
+        with open(_snapshot_path(), 'rb') as handle:
+            buffer = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        return None
+    try:
+        return FacetIndex.from_buffer(buffer)
+    except (ValueError, KeyError, struct.error):
+        return None
+
+
+def _active_rows(connection, shirt_ids=None):
+    statement = select(Shirt.id, *[getattr(Shirt, field) for field in FACET_FIELDS]).where(Shirt.status == 'active')
+    if shirt_ids is not None:
+        statement = statement.where(Shirt.id.in_(shirt_ids))
+    return [dict(row) for row in connection.execute(statement.order_by(Shirt.id)).mappings()]
+
+
+def get_facet_index():
+    """The facet index for the current catalog version, shared between workers through CACHE_FOLDER."""
+    version = catalog_version()
+    with _lock:
+        index = _loaded['index']
+        if index is not None and index.version == version:
+            return index
+
+    index = _read_snapshot()
+    if index is None or index.version != version:
+        index = FacetIndex.build(version, _active_rows(db.session.connection()))
+        _write_snapshot(index)
+
+    with _lock:
+        _loaded['index'] = index
+    return index
+
+
+def _on_catalog_changed(app, previous_version, version, shirt_ids, **extra):
+    with _lock:
+        index = _loaded['index']
+    if index is None or index.version != previous_version:
+        index = _read_snapshot()
+    if index is None or index.version != previous_version:
+        # The snapshot is not the one this commit's version replaced: another commit has not
+        # patched it yet or has moved it on. The next reader rebuilds it from the database.
+        return
+
+    with db.engine.connect() as connection:
+        rows = _active_rows(connection, sorted(shirt_ids))
+    patched = FacetIndex(
+        version,
+        list(index.shirt_ids_by_position),
+        index.live,
+        {field: dict(index.bitmaps[field].items()) for field in FACET_FIELDS},
+    )
+    patched.apply_rows(rows, shirt_ids)
+    _write_snapshot(patched)
+    with _lock:
+        _loaded['index'] = patched
+
+
+def init_app(app):
+    catalog_changed.connect(_on_catalog_changed, weak=False)
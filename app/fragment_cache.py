@@ -0,0 +1,47 @@
+import os
+import threading
+from collections import OrderedDict
+
+from flask import get_template_attribute, session
+from flask_babel import get_locale
+
+
+CARD_TEMPLATE = 'components/shirt_card.html'
+FRAGMENT_CACHE_SIZE = int(os.getenv('FRAGMENT_CACHE_SIZE', '2048'))
+
+_lock = threading.Lock()
+_fragments = OrderedDict()
+_stats = {'hits': 0, 'misses': 0}
+
+
+def shirt_card_version(shirt):
+    """Stamp of everything the catalog card shows: updated_at moves with every write to the shirt or its images."""
+    return shirt.updated_at.isoformat() if shirt.updated_at else None
+
+
+def shirt_card(shirt):
+    """Catalog card markup for a shirt, rendered once per shirt version and locale."""
+    key = (shirt.id, shirt_card_version(shirt), str(get_locale() or 'en'), session.get('lang', 'en'))
+    with _lock:
+        markup = _fragments.get(key)
+        if markup is not None:
+            _fragments.move_to_end(key)
+            _stats['hits'] += 1
+            return markup
+
+    markup = get_template_attribute(CARD_TEMPLATE, 'shirt_card')(shirt)
+    with _lock:
+        _stats['misses'] += 1
+        _fragments[key] = markup
+        while len(_fragments) > FRAGMENT_CACHE_SIZE:
+            _fragments.popitem(last=False)
+    return markup
+
+
+def fragment_cache_stats():
+    with _lock:
+        return dict(_stats, entries=len(_fragments))
+
+
+def init_app(app):
+    app.add_template_global(shirt_card)
@@ -0,0 +1,133 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import or_
+
+from app.image_store import keep_object, release_image_file, store_object
+from app.image_utils import generate_derivatives, normalize_product_image
+from app.models import db, ShirtImage
+
+
+IMAGE_BATCH_SIZE = 16
+# A claimed image whose worker died is handed out again after this long.
+IMAGE_PROCESSING_LEASE = timedelta(minutes=10)
+
+
+def process_image_file(path, upload_folder):
+    """Normalize one upload, copy it into object storage and write its derivatives.
+
+    Runs in a pool process, so no app or DB access; returns (object path, error). The upload
+    stays where it is until the row pointing at the object is committed, so a worker that
+    dies in between leaves an image a retry can process again: normalizing is a no-op the
+    second time and the retry arrives at the same object.
+    """
+    try:
+        normalize_product_image(path, derivatives=False)
+        relative_path = store_object(path, upload_folder, keep_source=True)
+        generate_derivatives(os.path.join(upload_folder, relative_path))
+    except Exception as exc:
+        return None, f'{type(exc).__name__}: {exc}'
+    return relative_path, None
+
+
+def _claim_images(now, limit):
+    images = (
+        ShirtImage.query
+        .filter(or_(
+            ShirtImage.processing_status == 'pending',
+            (ShirtImage.processing_status == 'processing')
+            & (ShirtImage.processing_started_at < now - IMAGE_PROCESSING_LEASE),
+        ))
+        .order_by(ShirtImage.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .all()
+    )
+    for image in images:
+        image.processing_status = 'processing'
+        image.processing_started_at = now
+    db.session.commit()
+    return images
+
+
+def run_pending_images(limit=None, executor=None):
+    """Process pending uploads, in parallel when given an executor; returns how many were handled."""
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    processed = 0
+    while limit is None or processed < limit:
+        batch_size = IMAGE_BATCH_SIZE if limit is None else min(IMAGE_BATCH_SIZE, limit - processed)
+        images = _claim_images(datetime.utcnow(), batch_size)
+        if not images:
+            break
+
+        image_ids = [image.id for image in images]
+        sources = [image.file_path for image in images]
+        paths = [os.path.join(upload_folder, source) for source in sources]
+        folders = [upload_folder] * len(paths)
+        results = executor.map(process_image_file, paths, folders) if executor else map(process_image_file, paths, folders)
+        orphans = []
+        stored_sources = []
+        kept = []
+        for image_id, source, (relative_path, error) in zip(image_ids, sources, results):
+            if relative_path and relative_path != source:
+                stored_sources.append(source)
+            image = db.session.get(ShirtImage, image_id, populate_existing=True)
+            if image is None:
+                # Deleted while it was being processed.
+                if relative_path:
+                    orphans.append(relative_path)
+                continue
+            if relative_path and not error and relative_path != source:
+                kept.append((source, relative_path))
+            if error:
+                image.processing_status = 'failed'
+                image.processing_error = error
+                current_app.logger.warning('Processing image %s failed: %s', image.id, error)
+            else:
+                image.processing_status = 'ready'
+                image.processing_error = None
+                image.file_path = relative_path
+        # Bumps updated_at, so pages and image URLs pick up the processed file.
+        db.session.commit()
+        # A shirt sharing the same photo may have released the object before this commit.
+        for source, relative_path in kept:
+            keep_object(os.path.join(upload_folder, source), relative_path, upload_folder)
+        for source in stored_sources:
+            try:
+                os.remove(os.path.join(upload_folder, source))
+            except FileNotFoundError:
+                pass
+        for relative_path in orphans:
+            release_image_file(relative_path)
+        processed += len(images)
+    return processed
+
+
+@click.command('image-worker')
+@click.option('--once', is_flag=True, help='Process the images that are pending now, then exit.')
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True, help='Parallel image processes.')
+@click.option('--poll-interval', default=2.0, show_default=True, help='Seconds to wait when nothing is pending.')
+@with_appcontext
+def image_worker_command(once, workers, poll_interval):
+    """Normalize uploaded product images and write their derivatives, across several processes."""
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while True:
+            processed = run_pending_images(executor=executor)
+            if once:
+                click.echo(f'processed {processed} image(s)')
+                return
+            if not processed:
+                time.sleep(poll_interval)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+
+def init_app(app):
+    app.cli.add_command(image_worker_command)
@@ -0,0 +1,248 @@
+import hashlib
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: the development server is a single process.
+    fcntl = None
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from app.image_utils import (
+    DERIVATIVE_MIMETYPES,
+    DERIVATIVE_WIDTHS,
+    DERIVED_DIRNAME,
+    derivative_path,
+    generate_derivatives,
+    remove_derivatives,
+)
+from app.models import db, ShirtImage
+
+
+# Processed images live under objects/<first two hex digits>/<sha256><ext>: a file never changes
+# once written, identical photos share one file, and shirt edits never touch the filesystem.
+OBJECTS_DIRNAME = 'objects'
+# Raw uploads wait here, under random names, until app.image_queue processes them.
+INCOMING_DIRNAME = 'incoming'
+# Held while an object is released or re-checked after a commit, across every process sharing uploads.
+OBJECTS_LOCK_FILENAME = '.lock'
+HASH_CHUNK_SIZE = 1024 * 1024
+MIGRATION_BATCH_SIZE = 200
+_EXTENSION_ALIASES = {'.jpeg': '.jpg'}
+_objects_lock = threading.Lock()
+
+
+def is_object_path(file_path):
+    return file_path.startswith(f'{OBJECTS_DIRNAME}/')
+
+
+def object_path(digest, extension):
+    return f'{OBJECTS_DIRNAME}/{digest[:2]}/{digest}{extension}'
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def save_upload(file, upload_folder):
+    """Store an uploaded file for processing and return its path relative to upload_folder."""
+    extension = os.path.splitext(file.filename)[1].lower()
+    relative_path = f'{INCOMING_DIRNAME}/{uuid.uuid4().hex}{extension}'
+    os.makedirs(os.path.join(upload_folder, INCOMING_DIRNAME), exist_ok=True)
+    file.save(os.path.join(upload_folder, relative_path))
+    return relative_path
+
+
+def _link_or_copy(source, target):
+    temp_path = f'{target}.{uuid.uuid4().hex}.tmp'
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copyfile(source, temp_path)
+    os.replace(temp_path, target)
+
+
+def store_object(path, upload_folder, keep_source=False):
+    """Move (or with keep_source, copy) a finished image to its content-addressed path and return that path.
+
+    An identical object that already exists is kept and the file is dropped in its favour. Only
+    touches the filesystem, so it is safe to run from a pool process.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    relative_path = object_path(file_digest(path), _EXTENSION_ALIASES.get(extension, extension))
+    target = os.path.join(upload_folder, relative_path)
+    if os.path.abspath(path) == os.path.abspath(target):
+        return relative_path
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if keep_source:
+        if not os.path.exists(target):
+            _link_or_copy(path, target)
+    elif os.path.exists(target):
+        os.remove(path)
+    else:
+        os.replace(path, target)
+    return relative_path
+
+
+@contextmanager
+def _locked_objects(upload_folder):
+    """Keep reference checks and the file changes that depend on them together."""
+    with _objects_lock:
+        if fcntl is None:
+            yield
+            return
+        objects_dir = os.path.join(upload_folder, OBJECTS_DIRNAME)
+        os.makedirs(objects_dir, exist_ok=True)
+        with open(os.path.join(objects_dir, OBJECTS_LOCK_FILENAME), 'a') as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def keep_object(source, relative_path, upload_folder):
+    """Store source again if the object a just-committed row points at was released meanwhile.
+
+    store_object runs before the row pointing at the object is committed, so a release of the
+    same content can remove the file in between. Call after that commit, while source is still
+    on disk; returns True when the object had to be stored again.
+    """
+    target = os.path.join(upload_folder, relative_path)
+    with _locked_objects(upload_folder):
+        if os.path.exists(target):
+            return False
+        store_object(source, upload_folder, keep_source=True)
+        generate_derivatives(target)
+    return True
+
+
+def _remove_empty_dirs(directory, upload_folder):
+    upload_folder = os.path.abspath(upload_folder)
+    directory = os.path.abspath(directory)
+    while directory.startswith(upload_folder + os.sep):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            return
+        directory = os.path.dirname(directory)
+
+
+def _delete_file(absolute_path, upload_folder, prune_dirs):
+    try:
+        os.remove(absolute_path)
+    except FileNotFoundError:
+        pass
+    remove_derivatives(absolute_path)
+    if prune_dirs:
+        _remove_empty_dirs(os.path.join(os.path.dirname(absolute_path), DERIVED_DIRNAME), upload_folder)
+        _remove_empty_dirs(os.path.dirname(absolute_path), upload_folder)
+
+
+def release_image_file(file_path):
+    """Delete a stored image and its derivatives once no ShirtImage row refers to it any more.
+
+    Call after the commit that removed the rows; objects shared with other shirts are kept.
+    The check reads committed rows on its own connection and holds the objects lock until the
+    file is gone, so keep_object either sees the file removed or this sees its row.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    with _locked_objects(upload_folder):
+        with db.engine.connect() as connection:
+            referenced = connection.execute(
+                select(ShirtImage.id).where(ShirtImage.file_path == file_path).limit(1)
+            ).first()
+        if referenced is not None:
+            return False
+        # Legacy per-shirt folders go away with their last image; the object fan-out stays.
+        _delete_file(os.path.join(upload_folder, file_path), upload_folder, prune_dirs=not is_object_path(file_path))
+    return True
+
+
+def _store_legacy_image(file_path, upload_folder, derivatives):
+    source = os.path.join(upload_folder, file_path)
+    relative_path = store_object(source, upload_folder, keep_source=True)
+    target = os.path.join(upload_folder, relative_path)
+    # Reuse the derivatives already written for the legacy file instead of encoding them again.
+    for width in DERIVATIVE_WIDTHS:
+        for image_format in DERIVATIVE_MIMETYPES:
+            old = derivative_path(source, width, image_format)
+            new = derivative_path(target, width, image_format)
+            if old.exists() and not new.exists():
+                new.parent.mkdir(exist_ok=True)
+                _link_or_copy(old, new)
+    if derivatives:
+        generate_derivatives(target)
+    return relative_path
+
+
+def migrate_legacy_images(batch_size=MIGRATION_BATCH_SIZE):
+    """Move images stored under the old league/brand/team folders into object storage.
+
+    Files are copied, the rows committed, and only then the old files removed, so an interrupted
+    run can simply be started again. Returns (moved, missing) row counts.
+    """
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    legacy = (
+        ~ShirtImage.file_path.startswith(f'{OBJECTS_DIRNAME}/')
+        & ~ShirtImage.file_path.startswith(f'{INCOMING_DIRNAME}/')
+        # Pending uploads are stored by the image worker once processed.
+        & ShirtImage.processing_status.in_(('ready', 'failed'))
+    )
+    moved = 0
+    missing = 0
+    last_id = 0
+    while True:
+        images = (
+            ShirtImage.query.filter(legacy, ShirtImage.id > last_id)
+            .order_by(ShirtImage.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not images:
+            break
+        last_id = images[-1].id
+
+        stored = {}
+        for image in images:
+            if image.file_path not in stored:
+                if not os.path.isfile(os.path.join(upload_folder, image.file_path)):
+                    current_app.logger.warning('Image %s is missing its file %s', image.id, image.file_path)
+                    missing += 1
+                    continue
+                stored[image.file_path] = _store_legacy_image(
+                    image.file_path, upload_folder, derivatives=image.processing_status == 'ready'
+                )
+            image.file_path = stored[image.file_path]
+            moved += 1
+        db.session.commit()
+
+        for file_path, relative_path in stored.items():
+            keep_object(os.path.join(upload_folder, file_path), relative_path, upload_folder)
+        for file_path in stored:
+            _delete_file(os.path.join(upload_folder, file_path), upload_folder, prune_dirs=True)
+    return moved, missing
+
+
+@click.command('migrate-image-storage')
+@click.option('--batch-size', default=MIGRATION_BATCH_SIZE, show_default=True)
+@with_appcontext
+def migrate_image_storage_command(batch_size):
+    """Move existing uploads into content-addressed object storage."""
+    moved, missing = migrate_legacy_images(batch_size)
+    click.echo(f'moved {moved} image(s) to object storage; {missing} missing file(s) left as they are')
+
+
+def init_app(app):
+    app.cli.add_command(migrate_image_storage_command)
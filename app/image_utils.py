@@ -1,12 +1,30 @@
 import os
+import uuid
 from pathlib import Path
 
-from PIL import Image, ImageOps
+from PIL import ExifTags, Image, ImageOps, features
 
 
 PRODUCT_IMAGE_SIZE = (1000, 1500)
 PRODUCT_IMAGE_RATIO = PRODUCT_IMAGE_SIZE[0] / PRODUCT_IMAGE_SIZE[1]
 
+# Resized copies written next to each original, in <dir>/derived/<filename>-<width>.<format>.
+DERIVED_DIRNAME = "derived"
+DERIVATIVE_WIDTHS = (320, 640, 1000)
+# Best first; JPEG is the fallback every browser accepts.
+DERIVATIVE_FORMATS = tuple(
+    name for name, available in (("avif", features.check("avif")), ("webp", features.check("webp")), ("jpeg", True))
+    if available
+)
+DERIVATIVE_MIMETYPES = {"avif": "image/avif", "webp": "image/webp", "jpeg": "image/jpeg"}
+# EXIF orientations that rotate by 90 degrees, swapping width and height on display.
+_SIDEWAYS_ORIENTATIONS = {5, 6, 7, 8}
+_DERIVATIVE_SAVE_KWARGS = {
+    "avif": {"quality": 55, "speed": 8},
+    "webp": {"quality": 80, "method": 4},
+    "jpeg": {"quality": 82, "optimize": True, "progressive": True},
+}
+
 
 def _flatten_transparency(image):
     if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
@@ -16,16 +34,90 @@ def _flatten_transparency(image):
     return image.convert("RGB") if image.mode not in ("RGB", "L") else image
 
 
-def normalize_product_image(path, size=PRODUCT_IMAGE_SIZE):
+def derivative_path(path, width, image_format):
+    image_path = Path(path)
+    return image_path.parent / DERIVED_DIRNAME / f"{image_path.name}-{width}.{image_format}"
+
+
+def generate_derivatives(path, force=False):
+    """Write the width/format ladder for a normalized image; returns how many files were written."""
+    image_path = Path(path)
+    targets = [
+        (width, image_format, derivative_path(image_path, width, image_format))
+        for width in DERIVATIVE_WIDTHS
+        for image_format in DERIVATIVE_FORMATS
+    ]
+    targets = [target for target in targets if force or not target[2].exists()]
+    if not targets:
+        return 0
+
+    written = 0
+    with Image.open(image_path) as original:
+        widest = max(width for width, _, _ in targets)
+        display_width, display_height = _display_size(original)
+        _draft(original, (widest, round(widest * display_height / display_width)))
+        original = _flatten_transparency(ImageOps.exif_transpose(original))
+        resized = {}
+        for width, image_format, target in targets:
+            if width not in resized:
+                height = round(width * original.height / original.width)
+                resized[width] = original if width >= original.width else original.resize(
+                    (width, height), Image.Resampling.LANCZOS
+                )
+            target.parent.mkdir(exist_ok=True)
+            # Unique per writer: workers storing the same object may render its ladder at once.
+            temp_path = target.with_name(f"{target.stem}.{uuid.uuid4().hex}.tmp.{image_format}")
+            resized[width].save(temp_path, image_format.upper(), **_DERIVATIVE_SAVE_KWARGS[image_format])
+            os.replace(temp_path, target)
+            written += 1
+    return written
+
+
+def remove_derivatives(path):
+    for width in DERIVATIVE_WIDTHS:
+        for image_format in DERIVATIVE_MIMETYPES:
+            try:
+                derivative_path(path, width, image_format).unlink()
+            except FileNotFoundError:
+                pass
+
+
+def normalize_product_image(path, size=PRODUCT_IMAGE_SIZE, derivatives=True):
     image_path = Path(path)
     if not image_path.exists() or not image_path.is_file():
         return False
 
+    changed = _normalize_original(image_path, size)
+    if derivatives:
+        generate_derivatives(image_path, force=changed)
+    return changed
+
+
+def _display_size(image):
+    width, height = image.size
+    if image.getexif().get(ExifTags.Base.Orientation) in _SIDEWAYS_ORIENTATIONS:
+        return height, width
+    return width, height
+
+
+def _draft(image, size):
+    """Let the JPEG decoder downscale by 1/2, 1/4 or 1/8 while the result still covers ``size``."""
+    if image.format != "JPEG":
+        return
+    if image.getexif().get(ExifTags.Base.Orientation) in _SIDEWAYS_ORIENTATIONS:
+        size = (size[1], size[0])
+    image.draft(None, size)
+
+
+def _normalize_original(image_path, size):
     with Image.open(image_path) as image:
-        image = ImageOps.exif_transpose(image)
-        if image.size == size:
+        # Reads only the header, so already-normalized files are never decoded.
+        if _display_size(image) == size:
             return False
 
+        _draft(image, size)
+        image = ImageOps.exif_transpose(image)
+
         image = _flatten_transparency(image)
         image = ImageOps.fit(image, size, method=Image.Resampling.LANCZOS, centering=(0.5, 0.5))
 
@@ -0,0 +1,198 @@
+from decimal import Decimal
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, case, cast, event, func, insert, inspect, select, update, Integer
+
+from app.models import db, InventorySummary, Shirt
+
+
+# Prices are summed as integer cents. prezzo_pagato is a FLOAT column (single precision on MySQL),
+# so 49.99 reads back as 49.9900016...; rounding each price to the cent first keeps the sums exact
+# integers on every backend (SQLite has no DECIMAL) and free of that representation error.
+SUMMARY_SCALE = 10 ** 2
+TOTAL_COLUMNS = ('shirt_count', 'total_spent', 'total_margin', 'sold_total_spent', 'sold_total_gain')
+ZERO_TOTALS = (0,) * len(TOTAL_COLUMNS)
+# Shirt attributes that feed the totals; other edits never touch inventory_summary.
+TRACKED_ATTRIBUTES = ('prezzo_pagato', 'internal_price', 'sold', 'status')
+
+
+def _scaled(column):
+    return cast(func.round(column * SUMMARY_SCALE), Integer)
+
+
+def _status_key():
+    return func.coalesce(Shirt.status, '')
+
+
+def totals_query():
+    """Per-status totals computed from the shirts table, in the units stored in inventory_summary."""
+    paid = _scaled(Shirt.prezzo_pagato)
+    selling = _scaled(Shirt.internal_price)
+    priced = and_(Shirt.prezzo_pagato.isnot(None), Shirt.internal_price.isnot(None))
+    sold_priced = and_(priced, Shirt.sold.is_(True))
+    return (
+        select(
+            _status_key().label('status'),
+            func.count(Shirt.id).label('shirt_count'),
+            func.coalesce(func.sum(paid), 0).label('total_spent'),
+            func.coalesce(func.sum(case((priced, selling - paid), else_=0)), 0).label('total_margin'),
+            func.coalesce(func.sum(case((sold_priced, paid), else_=0)), 0).label('sold_total_spent'),
+            func.coalesce(func.sum(case((sold_priced, selling - paid), else_=0)), 0).label('sold_total_gain'),
+        )
+        .group_by(_status_key())
+    )
+
+
+def _totals(connection, shirt_ids=None):
+    statement = totals_query()
+    if shirt_ids is not None:
+        statement = statement.where(Shirt.id.in_(list(shirt_ids)))
+    return {
+        row.status: tuple(int(row._mapping[name]) for name in TOTAL_COLUMNS)
+        for row in connection.execute(statement)
+    }
+
+
+def build_summary(totals):
+    """Dashboard figures from (shirt_count, total_spent, ...) totals in cents."""
+    total_spent, total_margin, sold_total_spent, sold_total_gain = (
+        Decimal(int(value)) / SUMMARY_SCALE for value in totals[1:]
+    )
+
+    margin_percentage = Decimal('0')
+    if total_spent > 0:
+        margin_percentage = (total_margin / total_spent) * Decimal('100')
+
+    sold_gain_percentage = Decimal('0')
+    if sold_total_spent > 0:
+        sold_gain_percentage = (sold_total_gain / sold_total_spent) * Decimal('100')
+
+    return {
+        'total_spent': total_spent.quantize(Decimal('0.01')),
+        'total_margin': total_margin.quantize(Decimal('0.01')),
+        'margin_percentage': margin_percentage.quantize(Decimal('0.01')),
+        'sold_total_gain': sold_total_gain.quantize(Decimal('0.01')),
+        'sold_gain_percentage': sold_gain_percentage.quantize(Decimal('0.01')),
+    }
+
+
+def _sum_rows(rows):
+    return tuple(map(sum, zip(ZERO_TOTALS, *rows)))
+
+
+def compute_inventory_summary(status=None):
+    """Summary recomputed from every shirt in one aggregate query."""
+    totals = _totals(db.session.connection())
+    rows = [values for key, values in totals.items() if status is None or key == status]
+    return build_summary(_sum_rows(rows))
+
+
+def get_inventory_summary(status=None):
+    """Summary read from the maintained inventory_summary rows; one small query."""
+    statement = select(*(func.coalesce(func.sum(getattr(InventorySummary, name)), 0) for name in TOTAL_COLUMNS))
+    if status is not None:
+        statement = statement.where(InventorySummary.status == status)
+    return build_summary(db.session.execute(statement).one())
+
+
+def apply_deltas(connection, deltas):
+    """Add {status: totals} to inventory_summary, creating rows for statuses seen for the first time."""
+    for status, values in deltas.items():
+        if not any(values):
+            continue
+        changes = dict(zip(TOTAL_COLUMNS, values))
+        result = connection.execute(
+            update(InventorySummary)
+            .where(InventorySummary.status == status)
+            .values({name: getattr(InventorySummary, name) + value for name, value in changes.items()})
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(InventorySummary).values(status=status, **changes))
+
+
+def _subtract(after, before):
+    return {
+        status: tuple(new - old for new, old in zip(after.get(status, ZERO_TOTALS), before.get(status, ZERO_TOTALS)))
+        for status in set(after) | set(before)
+    }
+
+
+def snapshot_totals(connection, shirt_ids):
+    """Per-status totals of some shirts, for writes that bypass the session to diff against."""
+    return _totals(connection, shirt_ids) if shirt_ids else {}
+
+
+def apply_totals_change(connection, before, after):
+    """Move inventory_summary by the difference between two snapshot_totals of the same shirts."""
+    apply_deltas(connection, _subtract(after, before))
+
+
+def _tracked_change(shirt):
+    state = inspect(shirt)
+    return any(state.attrs[name].history.has_changes() for name in TRACKED_ATTRIBUTES)
+
+
+def _before_flush(session, flush_context, instances):
+    # Totals of the rows about to change, read from the database before the flush writes them.
+    shirt_ids = {obj.id for obj in session.deleted if isinstance(obj, Shirt)}
+    shirt_ids.update(
+        obj.id for obj in session.dirty
+        if isinstance(obj, Shirt) and obj not in session.deleted and _tracked_change(obj)
+    )
+    shirt_ids.discard(None)
+    session.info['inventory_before'] = (shirt_ids, _totals(session.connection(), shirt_ids) if shirt_ids else {})
+
+
+def _after_flush(session, flush_context):
+    shirt_ids, before = session.info.pop('inventory_before', (set(), {}))
+    shirt_ids = shirt_ids | {obj.id for obj in session.new if isinstance(obj, Shirt)}
+    if not shirt_ids:
+        return
+    # Deleted rows are gone now, so they only appear on the "before" side.
+    after = _totals(session.connection(), shirt_ids)
+    apply_deltas(session.connection(), _subtract(after, before))
+
+
+def reconcile_inventory_summary(fix=True):
+    """Recompute every status from scratch; returns {status: (stored, actual)} for rows that drifted."""
+    connection = db.session.connection()
+    actual = _totals(connection)
+    stored = {
+        row.status: tuple(int(row._mapping[name]) for name in TOTAL_COLUMNS)
+        for row in connection.execute(select(InventorySummary))
+    }
+    drift = {
+        status: (stored.get(status, ZERO_TOTALS), actual.get(status, ZERO_TOTALS))
+        for status in set(stored) | set(actual)
+        if stored.get(status, ZERO_TOTALS) != actual.get(status, ZERO_TOTALS)
+    }
+    if fix and drift:
+        apply_deltas(connection, _subtract(actual, stored))
+        db.session.commit()
+    return drift
+
+
+@click.command('inventory-reconcile')
+@click.option('--dry-run', is_flag=True, help='Only report drift; leave inventory_summary as it is.')
+@with_appcontext
+def inventory_reconcile_command(dry_run):
+    """Recompute the inventory totals from the shirts table and report any drift."""
+    drift = reconcile_inventory_summary(fix=not dry_run)
+    if not drift:
+        click.echo('inventory_summary matches the shirts table')
+        return
+    for status, (stored, actual) in sorted(drift.items()):
+        differences = ', '.join(
+            f'{name} {old} -> {new}' for name, old, new in zip(TOTAL_COLUMNS, stored, actual) if old != new
+        )
+        click.echo(f"status {status or '(none)'!r}: {differences}")
+    click.echo(f"{'found' if dry_run else 'fixed'} drift in {len(drift)} status row(s)")
+
+
+def init_app(app):
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+    app.cli.add_command(inventory_reconcile_command)
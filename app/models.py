@@ -2,6 +2,8 @@ from datetime import datetime
 import re
 import unicodedata
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import validates
 
 def _normalize_team_key(name):
     if not name:
@@ -73,6 +75,9 @@ def map_national_team(name):
 
 db = SQLAlchemy()
 
+# Microsecond precision on MySQL too, so two writes in the same second still get distinct stamps.
+PreciseDateTime = db.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+
 class Shirt(db.Model):
     __tablename__ = 'shirts'
     
@@ -85,9 +90,13 @@ class Shirt(db.Model):
     taglia = db.Column(db.String(10), nullable=False)
     colore = db.Column(db.String(50), nullable=False)
     stagione = db.Column(db.String(20), nullable=False)
+    # utils.season_sort_value(stagione), kept in step with stagione by _derive_season_sort.
+    season_sort = db.Column(db.String(32), nullable=False)
     tipologia = db.Column(db.String(50), nullable=True)
     type = db.Column(db.String(50), nullable=True)
     maniche = db.Column(db.String(50), nullable=True)
+    # 'long' / 'short' from normalize_sleeve_group, kept in step with maniche by _derive_sleeve_group.
+    sleeve_group = db.Column(db.String(10), nullable=True, index=True)
     player_issued = db.Column(db.Boolean, default=False)
     nazionale = db.Column(db.Boolean, default=False)
     prezzo_pagato = db.Column(db.Float, nullable=True)
@@ -98,9 +107,64 @@ class Shirt(db.Model):
     vinted_uk_url = db.Column(db.String(2048), nullable=True)
     vinted_eu_url = db.Column(db.String(2048), nullable=True)
     status = db.Column(db.String(20), default='active')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Non-null so the (created_at, id) keyset seek reaches every row; legacy rows hold 1970-01-01.
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    # Bumped by every UPDATE and, via app.catalog_cache, by writes to the shirt's images.
+    updated_at = db.Column(PreciseDateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Per-locale URL slug and title, rebuilt from the fields above by app.shirt_names on every write.
+    slug_en = db.Column(db.String(1024), nullable=True)
+    slug_it = db.Column(db.String(1024), nullable=True)
+    display_name_en = db.Column(db.String(1024), nullable=True)
+    display_name_it = db.Column(db.String(1024), nullable=True)
+    # The image is_cover picks, else the first one; maintained by app.cover_images after every flush.
+    cover_image_id = db.Column(
+        db.Integer,
+        db.ForeignKey('shirt_images.id', name='fk_shirts_cover_image_id', ondelete='SET NULL', use_alter=True),
+        nullable=True,
+    )
     
-    images = db.relationship('ShirtImage', backref='shirt', cascade='all, delete-orphan', lazy=True)
+    images = db.relationship(
+        'ShirtImage',
+        backref='shirt',
+        cascade='all, delete-orphan',
+        lazy=True,
+        foreign_keys='ShirtImage.shirt_id',
+    )
+    cover_image = db.relationship('ShirtImage', foreign_keys=[cover_image_id], viewonly=True, lazy='select')
+    search_document = db.relationship(
+        'ShirtSearchDocument',
+        uselist=False,
+        cascade='all, delete-orphan',
+        lazy=True,
+    )
+
+    # Access paths of the public catalog and the dashboard filters; see app/query_plans.py.
+    __table_args__ = (
+        db.Index('ix_shirts_status_created_at', 'status', 'created_at', 'id'),
+        db.Index('ix_shirts_status_sold', 'status', 'sold'),
+        db.Index('ix_shirts_brand_status', 'brand', 'status'),
+        db.Index('ix_shirts_campionato_status', 'campionato', 'status'),
+        db.Index('ix_shirts_colore_status', 'colore', 'status'),
+        db.Index('ix_shirts_stagione_status', 'stagione', 'status'),
+        db.Index('ix_shirts_type_status', 'type', 'status'),
+        db.Index('ix_shirts_taglia_status', 'taglia', 'status'),
+        db.Index('ix_shirts_season_sort_created_at', 'season_sort', 'created_at', 'id'),
+        db.Index('ix_shirts_created_at', 'created_at', 'id'),
+    )
+
+    @validates('maniche')
+    def _derive_sleeve_group(self, key, value):
+        from app.utils import normalize_sleeve_group
+
+        self.sleeve_group = normalize_sleeve_group(value)
+        return value
+
+    @validates('stagione')
+    def _derive_season_sort(self, key, value):
+        from app.utils import season_sort_value
+
+        self.season_sort = season_sort_value(value)
+        return value
 
     @property
     def display_name(self):
@@ -121,13 +185,6 @@ class Shirt(db.Model):
     def team_display_name(self):
         return self.squadra
 
-    @property
-    def cover_image(self):
-        cover = ShirtImage.query.filter_by(shirt_id=self.id, is_cover=True).first()
-        if not cover and self.images:
-            return self.images[0]
-        return cover
-
     @property
     def slug(self):
         base = self.display_name or ""
@@ -169,6 +226,7 @@ class Shirt(db.Model):
             'vinted_eu_url': self.vinted_eu_url,
             'status': self.status,
             'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None,
         }
 
 class ShirtImage(db.Model):
@@ -179,3 +237,73 @@ class ShirtImage(db.Model):
     file_path = db.Column(db.String(255), nullable=False)
     is_cover = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # pending -> processing (claimed at processing_started_at) -> ready | failed; see app.image_queue.
+    processing_status = db.Column(db.String(20), nullable=False, default='ready')
+    processing_started_at = db.Column(db.DateTime, nullable=True)
+    processing_error = db.Column(db.Text, nullable=True)
+    updated_at = db.Column(PreciseDateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_shirt_images_shirt_id_is_cover', 'shirt_id', 'is_cover'),
+        db.Index('ix_shirt_images_processing_status', 'processing_status'),
+        # Shared objects are deleted once no row refers to them; see app.image_store.
+        db.Index('ix_shirt_images_file_path', 'file_path'),
+    )
+
+
+class ShirtSearchDocument(db.Model):
+    """Denormalized search text for a shirt, indexed with FULLTEXT (MySQL) or FTS5 (SQLite)."""
+    __tablename__ = 'shirt_search'
+
+    shirt_id = db.Column(db.Integer, db.ForeignKey('shirts.id', ondelete='CASCADE'), primary_key=True)
+    document = db.Column(db.Text, nullable=False, default='')
+
+    __table_args__ = (
+        db.Index('ix_shirt_search_document', 'document', mysql_prefix='FULLTEXT').ddl_if(dialect='mysql'),
+    )
+
+
+class ShirtShuffleRank(db.Model):
+    """Precomputed position of a shirt in the catalog shuffle for one pooled seed."""
+    __tablename__ = 'shirt_shuffle_ranks'
+
+    seed = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    shirt_id = db.Column(db.Integer, db.ForeignKey('shirts.id', ondelete='CASCADE'), primary_key=True)
+    rank = db.Column(db.BigInteger, nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_shirt_shuffle_ranks_seed_rank', 'seed', 'rank', 'shirt_id'),
+    )
+
+
+class InventorySummary(db.Model):
+    """Running price totals per shirt status, kept in step with shirts by app.inventory_summary."""
+    __tablename__ = 'inventory_summary'
+
+    # '' collects shirts without a status.
+    status = db.Column(db.String(20), primary_key=True)
+    shirt_count = db.Column(db.Integer, nullable=False, default=0)
+    # Price sums in cents (app.inventory_summary.SUMMARY_SCALE), so they stay exact integers.
+    total_spent = db.Column(db.BigInteger, nullable=False, default=0)
+    total_margin = db.Column(db.BigInteger, nullable=False, default=0)
+    sold_total_spent = db.Column(db.BigInteger, nullable=False, default=0)
+    sold_total_gain = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class TranslationJob(db.Model):
+    """Pending Italian translation of a shirt description, worked off by `flask translation-worker`."""
+    __tablename__ = 'translation_jobs'
+
+    shirt_id = db.Column(db.Integer, db.ForeignKey('shirts.id', ondelete='CASCADE'), primary_key=True)
+    source_text = db.Column(db.Text, nullable=False)
+    # pending -> running (leased until run_after) -> row deleted on success, or failed after the last attempt
+    # (until run_after, when the worker re-arms it).
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_translation_jobs_status_run_after', 'status', 'run_after'),
+    )
@@ -7,8 +7,6 @@ import requests
 from requests.exceptions import RequestException, Timeout
 from flask import current_app
 
-from app.models import db
-
 
 OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 OPENROUTER_TIMEOUT = (3, 8)
@@ -95,18 +93,3 @@ def translate_to_italian(text: str) -> Optional[str]:
             current_app.logger.exception("OpenRouter translation failed: %s", exc)
             return None
 
-
-def get_or_translate_description(shirt) -> Optional[str]:
-    if not shirt.descrizione:
-        return None
-
-    if shirt.descrizione_ita:
-        return shirt.descrizione_ita
-
-    translated = translate_to_italian(shirt.descrizione)
-    if translated:
-        shirt.descrizione_ita = translated
-        db.session.commit()
-        return translated
-
-    return shirt.descrizione
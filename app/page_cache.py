@@ -0,0 +1,266 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import Response, current_app, make_response, request, session
+from flask_babel import get_locale
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from app.catalog_cache import _write_atomic, catalog_changed, catalog_last_modified, catalog_version, deploy_stamp
+from app.models import db
+
+
+PAGES_DIRNAME = 'pages'
+PAGE_CACHE_MEMORY_SIZE = int(os.getenv('PAGE_CACHE_MEMORY_SIZE', '256'))
+# Pages from older catalog versions are kept this long so they can be served while the database is down.
+PAGE_CACHE_MAX_AGE = int(os.getenv('PAGE_CACHE_MAX_AGE_DAYS', '7')) * 86400
+# Caps on the shared pages directory; a write that crosses one prunes the least recently written
+# pages down to PAGE_CACHE_PRUNE_TO of both caps.
+PAGE_CACHE_MAX_ENTRIES = int(os.getenv('PAGE_CACHE_MAX_ENTRIES', '20000'))
+PAGE_CACHE_MAX_BYTES = int(os.getenv('PAGE_CACHE_MAX_MB', '512')) * 1024 * 1024
+PAGE_CACHE_PRUNE_TO = 0.9
+
+_lock = threading.Lock()
+_memory = OrderedDict()
+_stats = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'stale': 0, 'bypassed': 0, 'pruned': 0}
+# This process's running estimate of the pages directory, recounted by every prune.
+_disk = {'entries': None, 'bytes': 0}
+
+
+def normalized_args(args, ignore=()):
+    """Query args as a sorted tuple, so reordered or padded URLs for the same page share one key.
+
+    Blank values and ``page=1`` are dropped; ``lang`` is covered by the locale and
+    ``canonical_lang`` parts of the key.
+    """
+    normalized = []
+    for key, values in args.lists():
+        if key == 'lang' or key in ignore:
+            continue
+        values = [value.strip() for value in values if value and value.strip()]
+        if key == 'page' and values == ['1']:
+            continue
+        if values:
+            normalized.append((key, tuple(values)))
+    return tuple(sorted(normalized))
+
+
+def canonical_lang():
+    """The ``lang`` a page's canonical URL keeps: the locale shown, when the URL asked for it."""
+    lang = request.args.get('lang')
+    return lang if lang and lang == str(get_locale()) else None
+
+
+def _cache_key(view_args, args):
+    parts = [
+        request.endpoint,
+        request.host_url,
+        str(get_locale() or 'en'),
+        session.get('lang'),
+        canonical_lang(),
+        sorted(view_args.items()),
+        args,
+    ]
+    return hashlib.sha256(json.dumps(parts, default=str).encode('utf-8')).hexdigest()
+
+
+def _pages_dir():
+    return os.path.join(current_app.config['CACHE_FOLDER'], PAGES_DIRNAME)
+
+
+def _remember(key, entry):
+    with _lock:
+        _memory[key] = entry
+        _memory.move_to_end(key)
+        while len(_memory) > PAGE_CACHE_MEMORY_SIZE:
+            _memory.popitem(last=False)
+
+
+def _load_entry(key, version):
+    """Return the newest entry for key, preferring one rendered for ``version``."""
+    with _lock:
+        entry = _memory.get(key)
+    if entry is not None and entry['version'] == version:
+        _stats['hits'] += 1
+        return entry
+
+    try:
+        with open(os.path.join(_pages_dir(), f'{key}.json'), encoding='utf-8') as handle:
+            stored = json.load(handle)
+    except (FileNotFoundError, ValueError):
+        stored = None
+    if stored is not None and (entry is None or stored['version'] == version):
+        entry = stored
+        _remember(key, entry)
+        if entry['version'] == version:
+            _stats['shared_hits'] += 1
+    return entry
+
+
+def _store_entry(key, version, response):
+    body = response.get_data(as_text=True)
+    entry = {
+        'version': version,
+        'body': body,
+        'mimetype': response.mimetype,
+        'etag': hashlib.sha256(body.encode('utf-8')).hexdigest(),
+        'last_modified': (response.last_modified or catalog_last_modified()).isoformat(),
+    }
+    content = json.dumps(entry)
+    pages_dir = _pages_dir()
+    os.makedirs(pages_dir, exist_ok=True)
+    _write_atomic(os.path.join(pages_dir, f'{key}.json'), content)
+    _remember(key, entry)
+    _count_write(pages_dir, len(content.encode('utf-8')))
+    return entry
+
+
+def _respond(entry, state):
+    response = Response(entry['body'], mimetype=entry['mimetype'])
+    response.set_etag(entry['etag'])
+    response.last_modified = datetime.fromisoformat(entry['last_modified'])
+    response.cache_control.no_cache = True
+    response.vary.update(('Accept-Language', 'Cookie'))
+    response.headers['X-Page-Cache'] = state
+    return response.make_conditional(request)
+
+
+def _stale_response(entry):
+    db.session.rollback()
+    if entry is None:
+        return None
+    current_app.logger.warning('Database unavailable, serving stale %s', request.path)
+    _stats['stale'] += 1
+    return _respond(entry, 'STALE')
+
+
+def cached_page(key_args=None, version=None, query_args=None):
+    """Serve a rendered page from the shared page cache until what it shows changes.
+
+    ``key_args`` returns the request details the page depends on; it defaults to
+    the normalized query string. ``version`` is called with the view arguments
+    and returns the token the page is valid for; it defaults to the catalog
+    version, so any shirt write re-renders the page. ``query_args`` names the
+    query args the page reads besides ``lang``; requests carrying any other arg
+    are rendered without the cache, so made-up URLs cannot fill it. So are
+    requests with flashed messages waiting, which the base template renders
+    for this visitor only. When the database is unreachable, the last rendered
+    copy is served instead.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+            unknown_args = query_args is not None and any(
+                name != 'lang' and name not in query_args for name in request.args
+            )
+            if unknown_args or session.get('_flashes'):
+                _stats['bypassed'] += 1
+                response = make_response(view(*args, **kwargs))
+                response.headers['X-Page-Cache'] = 'BYPASS'
+                return response
+
+            key = _cache_key(kwargs, key_args() if key_args else normalized_args(request.args))
+            try:
+                # Per-page versions outlive restarts, so they also carry the code fingerprint.
+                current = f'{deploy_stamp()}:{version(**kwargs)}' if version else catalog_version()
+            except (OperationalError, InterfaceError):
+                stale = _stale_response(_load_entry(key, None))
+                if stale is None:
+                    raise
+                return stale
+
+            entry = _load_entry(key, current)
+            if entry is not None and entry['version'] == current:
+                return _respond(entry, 'HIT')
+
+            try:
+                response = make_response(view(*args, **kwargs))
+            except (OperationalError, InterfaceError):
+                stale = _stale_response(entry)
+                if stale is None:
+                    raise
+                return stale
+
+            if response.status_code != 200 or response.direct_passthrough:
+                return response
+            _stats['misses'] += 1
+            return _respond(_store_entry(key, current, response), 'MISS')
+        return wrapper
+    return decorator
+
+
+def page_cache_stats():
+    with _lock:
+        size = len(_memory)
+        disk_entries = _disk['entries']
+    return dict(_stats, memory_entries=size, disk_entries=disk_entries)
+
+
+def _prune_pages_dir(pages_dir, max_entries, max_bytes):
+    """Drop expired pages, then the least recently written ones beyond the caps.
+
+    Returns the (entries, bytes) left in the directory.
+    """
+    cutoff = time.time() - PAGE_CACHE_MAX_AGE
+    try:
+        items = list(os.scandir(pages_dir))
+    except FileNotFoundError:
+        return 0, 0
+    pages = []
+    for item in items:
+        try:
+            info = item.stat()
+        except FileNotFoundError:
+            continue
+        # Temporary files belong to writes still in flight unless they have expired.
+        if item.name.endswith('.json') or info.st_mtime < cutoff:
+            pages.append((info.st_mtime, info.st_size, item.path))
+
+    entries = size = 0
+    for mtime, page_size, path in sorted(pages, reverse=True):
+        if mtime >= cutoff and entries < max_entries and size + page_size <= max_bytes:
+            entries += 1
+            size += page_size
+            continue
+        try:
+            os.remove(path)
+            _stats['pruned'] += 1
+        except FileNotFoundError:
+            pass
+    return entries, size
+
+
+def _count_write(pages_dir, size):
+    with _lock:
+        if _disk['entries'] is not None:
+            # Rewrites of an existing page are counted too; the prune recounts exactly.
+            _disk['entries'] += 1
+            _disk['bytes'] += size
+            if _disk['entries'] <= PAGE_CACHE_MAX_ENTRIES and _disk['bytes'] <= PAGE_CACHE_MAX_BYTES:
+                return
+    entries, size = _prune_pages_dir(
+        pages_dir,
+        int(PAGE_CACHE_MAX_ENTRIES * PAGE_CACHE_PRUNE_TO),
+        int(PAGE_CACHE_MAX_BYTES * PAGE_CACHE_PRUNE_TO),
+    )
+    with _lock:
+        _disk.update(entries=entries, bytes=size)
+
+
+def _prune_pages(app, **extra):
+    pages_dir = os.path.join(app.config['CACHE_FOLDER'], PAGES_DIRNAME)
+    entries, size = _prune_pages_dir(pages_dir, PAGE_CACHE_MAX_ENTRIES, PAGE_CACHE_MAX_BYTES)
+    with _lock:
+        _disk.update(entries=entries, bytes=size)
+
+
+def init_app(app):
+    catalog_changed.connect(_prune_pages, weak=False)
+    app.add_template_global(canonical_lang)
@@ -0,0 +1,112 @@
+import threading
+from datetime import datetime
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import and_, or_
+
+from app.catalog_cache import catalog_version
+from app.models import Shirt
+
+
+CURSOR_SALT = 'catalog-cursor'
+COUNT_CACHE_SIZE = 512
+
+_count_lock = threading.Lock()
+_count_cache = {'version': None, 'counts': {}}
+
+
+class KeysetPage:
+    """One page of a seek-paginated query, shaped like the bits of Pagination the templates use."""
+
+    def __init__(self, items, per_page, next_cursor, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.has_next = next_cursor is not None
+        self.total = total
+
+    def __iter__(self):
+        return iter(self.items)
+
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=CURSOR_SALT)
+
+
+def encode_cursor(sort, seed, sort_value, shirt_id):
+    if isinstance(sort_value, datetime):
+        sort_value = {'dt': sort_value.isoformat()}
+    return _serializer().dumps([sort, seed, sort_value, shirt_id])
+
+
+def decode_cursor(token, sort, seed):
+    """Return (sort_value, shirt_id) for a token issued for the same sort and seed, else None."""
+    if not token:
+        return None
+    try:
+        cursor_sort, cursor_seed, sort_value, shirt_id = _serializer().loads(token)
+    except (BadSignature, TypeError, ValueError):
+        return None
+    if cursor_sort != sort or cursor_seed != seed:
+        return None
+    if isinstance(sort_value, dict) and 'dt' in sort_value:
+        sort_value = datetime.fromisoformat(sort_value['dt'])
+    return sort_value, shirt_id
+
+
+def keyset_paginate(query, sort, seed, sort_expr, descending, after, per_page, total=None, offset=0,
+                    strict=False):
+    """Seek past the (sort_expr, id) pair in ``after`` instead of scanning an OFFSET.
+
+    Without a valid cursor the page starts at ``offset``, so a client can switch
+    from numbered pages to cursors part way through. With ``strict``, an ``after``
+    that is present but does not decode for this sort and seed raises ValueError
+    instead, so a client following cursors never silently starts over.
+
+    ``query`` must not be ordered yet; the ordering is applied here so it always
+    matches the seek predicate.
+    """
+    if descending:
+        query = query.order_by(sort_expr.desc(), Shirt.id.desc())
+    else:
+        query = query.order_by(sort_expr.asc(), Shirt.id.asc())
+
+    position = decode_cursor(after, sort, seed)
+    if position is None and after and strict:
+        raise ValueError('Invalid or expired cursor; start again without after.')
+    if position is not None:
+        sort_value, shirt_id = position
+        if descending:
+            query = query.filter(or_(sort_expr < sort_value, and_(sort_expr == sort_value, Shirt.id < shirt_id)))
+        else:
+            query = query.filter(or_(sort_expr > sort_value, and_(sort_expr == sort_value, Shirt.id > shirt_id)))
+    elif offset:
+        query = query.offset(offset)
+
+    rows = query.add_columns(sort_expr.label('sort_key')).limit(per_page + 1).all()
+    items = [row[0] for row in rows[:per_page]]
+    next_cursor = None
+    if len(rows) > per_page:
+        last_shirt, last_key = rows[per_page - 1]
+        next_cursor = encode_cursor(sort, seed, last_key, last_shirt.id)
+    return KeysetPage(items, per_page, next_cursor, total=total)
+
+
+def cached_count(query, key):
+    """COUNT(*) for a filtered query, remembered until the next catalog write."""
+    version = catalog_version()
+    with _count_lock:
+        if _count_cache['version'] != version:
+            _count_cache['version'] = version
+            _count_cache['counts'] = {}
+        if key in _count_cache['counts']:
+            return _count_cache['counts'][key]
+
+    total = query.order_by(None).count()
+    with _count_lock:
+        if _count_cache['version'] == version:
+            if len(_count_cache['counts']) >= COUNT_CACHE_SIZE:
+                _count_cache['counts'].clear()
+            _count_cache['counts'][key] = total
+    return total
@@ -0,0 +1,176 @@
+from datetime import date, datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, or_, select, text
+
+from app.models import db, Shirt, ShirtImage, ShirtSearchDocument, ShirtShuffleRank
+from app.shuffle import pool_seeds
+
+
+# Plan lines that may walk a whole structure: the FTS5 match itself and constant subqueries.
+_SQLITE_ALLOWED_SCANS = ('VIRTUAL TABLE', 'CONSTANT ROW')
+# MySQL access types that read every row of a table or index.
+_MYSQL_FULL_SCAN_TYPES = {'ALL', 'index'}
+# Dashboard sorts checked by explain-queries; 'default' is what the dashboard opens with.
+DASHBOARD_PLAN_SORTS = ('default', 'chronological', 'reverse_chronological', 'newest')
+# Plan lines saying the ORDER BY is sorted after reading instead of read in index order.
+_SORT_MARKERS = ('USE TEMP B-TREE FOR ORDER BY', 'Using filesort')
+
+
+def _sample_values():
+    row = db.session.execute(
+        select(
+            Shirt.id, Shirt.brand, Shirt.campionato, Shirt.colore,
+            Shirt.stagione, Shirt.type, Shirt.taglia, Shirt.product_code,
+        ).limit(1)
+    ).first()
+    if row is None:
+        return {
+            'id': 1, 'brand': 'Nike', 'campionato': 'Serie A', 'colore': 'Red',
+            'stagione': '1995/1996', 'type': 'Shirt', 'taglia': 'L', 'product_code': 1,
+        }
+    return dict(row._mapping)
+
+
+def representative_queries():
+    """The statements behind catalog(), dashboard() and the cover image pointer, with sample values.
+
+    Every entry is expected to reach its rows through an index.
+    """
+    from app.blueprints.admin import (
+        DASHBOARD_DEFAULT_SORT,
+        DASHBOARD_PAGE_SIZE,
+        apply_dashboard_filters,
+        dashboard_order,
+    )
+
+    sample = _sample_values()
+    active = Shirt.query.filter(Shirt.status == 'active')
+    seek_time = datetime(2024, 1, 1)
+    # Visitors without a seed get one of today's pooled seeds, read as a cursor page of one extra row.
+    default_seed = pool_seeds(date.today())[0]
+    default_catalog = active.join(
+        ShirtShuffleRank,
+        (ShirtShuffleRank.shirt_id == Shirt.id) & (ShirtShuffleRank.seed == default_seed),
+    ).order_by(ShirtShuffleRank.rank.asc(), Shirt.id.asc()).add_columns(ShirtShuffleRank.rank.label('sort_key'))
+    queries = {
+        'catalog default': default_catalog.limit(25),
+        'catalog default filtered': default_catalog.filter(Shirt.id.in_([sample['id'], sample['id'] + 1])).limit(25),
+        'catalog newest': active.order_by(Shirt.created_at.desc(), Shirt.id.desc()).limit(24),
+        'catalog oldest': active.order_by(Shirt.created_at.asc(), Shirt.id.asc()).limit(24),
+        'catalog newest after cursor': active.filter(
+            or_(Shirt.created_at < seek_time, and_(Shirt.created_at == seek_time, Shirt.id < sample['id']))
+        ).order_by(Shirt.created_at.desc(), Shirt.id.desc()).limit(25),
+        'catalog shuffled': active.join(
+            ShirtShuffleRank,
+            (ShirtShuffleRank.shirt_id == Shirt.id) & (ShirtShuffleRank.seed == 12345),
+        ).order_by(ShirtShuffleRank.rank.asc(), Shirt.id.asc()).limit(24),
+        'catalog filtered ids': active.filter(Shirt.id.in_([sample['id'], sample['id'] + 1])),
+        'catalog images': ShirtImage.query.filter(ShirtImage.shirt_id.in_([sample['id'], sample['id'] + 1])),
+        'cover image': ShirtImage.query.filter(ShirtImage.id.in_([sample['id'], sample['id'] + 1])),
+        'cover image refresh': ShirtImage.query.filter_by(shirt_id=sample['id'])
+        .order_by(ShirtImage.is_cover.desc(), ShirtImage.id.asc()).limit(1),
+        'search documents': ShirtSearchDocument.query.filter(ShirtSearchDocument.shirt_id == sample['id']),
+        'dashboard product code': Shirt.query.filter(Shirt.product_code == sample['product_code']),
+        'dashboard status newest': Shirt.query.filter(Shirt.status == 'draft').order_by(Shirt.created_at.desc()),
+        'dashboard status sold': Shirt.query.filter(Shirt.status == 'active', Shirt.sold.is_(True)),
+    }
+    for field in ('brand', 'campionato', 'colore', 'stagione', 'type', 'taglia'):
+        column = getattr(Shirt, field)
+        queries[f'dashboard {field}'] = Shirt.query.filter(column == sample[field])
+        queries[f'dashboard {field} and status'] = Shirt.query.filter(
+            column == sample[field], Shirt.status == 'active'
+        )
+
+    # One dashboard page per sort, unfiltered and with each of the filters it offers by value.
+    dashboard_filters = {'': {}, ' status': {'status_filter': 'active'}, ' sold': {'sold_filter': 'yes'}}
+    for field in ('brand', 'campionato', 'colore', 'stagione', 'type', 'taglia'):
+        dashboard_filters[f' {field}'] = {field: sample[field]}
+    for sort in DASHBOARD_PLAN_SORTS:
+        order = dashboard_order(DASHBOARD_DEFAULT_SORT if sort == 'default' else sort)
+        for suffix, args in dashboard_filters.items():
+            page = apply_dashboard_filters(Shirt.query, args).order_by(*order).limit(DASHBOARD_PAGE_SIZE)
+            queries[f"dashboard {sort.replace('_', ' ')}{suffix}"] = page
+    return queries
+
+
+def _compile(query):
+    dialect = db.session.get_bind().dialect
+    statement = getattr(query, 'statement', query)
+    return str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+
+def _plan_rows(query):
+    prefix = 'EXPLAIN QUERY PLAN' if db.session.get_bind().dialect.name == 'sqlite' else 'EXPLAIN'
+    return [dict(row) for row in db.session.execute(text(f'{prefix} {_compile(query)}')).mappings()]
+
+
+def _describe(row):
+    if 'detail' in row:
+        return row['detail']
+    return ' '.join(f'{key}={value}' for key, value in row.items() if value is not None)
+
+
+def _is_full_scan(row):
+    if 'detail' in row:
+        detail = row['detail']
+        return detail.startswith('SCAN ') and not any(allowed in detail for allowed in _SQLITE_ALLOWED_SCANS)
+    return row.get('type') in _MYSQL_FULL_SCAN_TYPES
+
+
+def _is_index_walk(row):
+    if 'detail' in row:
+        return ' USING INDEX ' in row['detail'] or ' USING COVERING INDEX ' in row['detail']
+    return row.get('type') == 'index'
+
+
+def _is_sorted_after_reading(row):
+    return any(marker in str(row.get('detail') or row.get('Extra') or '') for marker in _SORT_MARKERS)
+
+
+def explain(query):
+    """Return the plan lines for a query as plain strings."""
+    return [_describe(row) for row in _plan_rows(query)]
+
+
+def full_scans(query):
+    """Plan lines showing a full table or index scan; empty when every table is searched.
+
+    A LIMITed query that walks an index in its ORDER BY order stops after the page it
+    needs, so that index walk does not count as a full scan.
+    """
+    rows = _plan_rows(query)
+    ordered_walk = ' LIMIT ' in _compile(query) and not any(_is_sorted_after_reading(row) for row in rows)
+    return [
+        _describe(row) for row in rows
+        if _is_full_scan(row) and not (ordered_walk and _is_index_walk(row))
+    ]
+
+
+def check_query_plans():
+    """Map of query name to its full-scan plan lines, for every representative query that has one."""
+    failures = {}
+    for name, query in representative_queries().items():
+        offending = full_scans(query)
+        if offending:
+            failures[name] = offending
+    return failures
+
+
+@click.command('explain-queries')
+@with_appcontext
+def explain_queries_command():
+    """EXPLAIN the catalog and dashboard queries; exit non-zero if any needs a full scan."""
+    failures = check_query_plans()
+    for name, query in representative_queries().items():
+        status = 'FULL SCAN' if name in failures else 'ok'
+        click.echo(f'{status:9} {name}')
+        for line in failures.get(name, ()):
+            click.echo(f'          {line}')
+    if failures:
+        raise click.ClickException(f'{len(failures)} query plan(s) fall back to a full scan')
+
+
+def init_app(app):
+    app.cli.add_command(explain_queries_command)
@@ -0,0 +1,182 @@
+import re
+import unicodedata
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import DDL, event, func, literal_column, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import column, table
+
+from app.models import db, map_national_team, Shirt, ShirtSearchDocument, NATIONAL_TEAM_PAIRS
+from app.utils import (
+    color_label,
+    competition_label_localized,
+    feature_label,
+    sleeve_label,
+    type_label_or_shirt,
+)
+
+
+FTS_TABLE = 'shirt_search_fts'
+MYSQL_MIN_TERM_LENGTH = 3
+_TERM_REGEX = re.compile(r'[0-9a-z]+')
+
+# SQLite keeps an FTS5 mirror of shirt_search in sync through triggers, so the
+# application only ever writes the plain table on every backend.
+SQLITE_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        document,
+        content='shirt_search',
+        content_rowid='shirt_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS shirt_search_ai AFTER INSERT ON shirt_search BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.shirt_id, new.document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS shirt_search_ad AFTER DELETE ON shirt_search BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.shirt_id, old.document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS shirt_search_au AFTER UPDATE ON shirt_search BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.shirt_id, old.document);
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.shirt_id, new.document);
+    END
+    """,
+]
+SQLITE_FTS_DROP_DDL = [
+    'DROP TRIGGER IF EXISTS shirt_search_au',
+    'DROP TRIGGER IF EXISTS shirt_search_ad',
+    'DROP TRIGGER IF EXISTS shirt_search_ai',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+_TEAM_ALIASES = {}
+for en_name, it_name in NATIONAL_TEAM_PAIRS:
+    _TEAM_ALIASES.setdefault(it_name, [it_name])
+    if en_name not in _TEAM_ALIASES[it_name]:
+        _TEAM_ALIASES[it_name].append(en_name)
+
+
+def search_terms(value):
+    if not value:
+        return []
+    normalized = unicodedata.normalize('NFKD', str(value))
+    ascii_text = normalized.encode('ascii', 'ignore').decode('ascii')
+    return _TERM_REGEX.findall(ascii_text.lower())
+
+
+def build_search_document(shirt):
+    """Searchable text for a shirt: raw fields plus the English/Italian labels shown on the site."""
+    parts = [
+        str(shirt.product_code) if getattr(shirt, 'product_code', None) is not None else None,
+        getattr(shirt, 'player_name', None),
+        getattr(shirt, 'brand', None),
+        getattr(shirt, 'squadra', None),
+        getattr(shirt, 'campionato', None),
+        getattr(shirt, 'colore', None),
+        getattr(shirt, 'stagione', None),
+        getattr(shirt, 'tipologia', None),
+        getattr(shirt, 'type', None),
+        getattr(shirt, 'maniche', None),
+    ]
+    for locale in ('en', 'it'):
+        parts.extend([
+            type_label_or_shirt(getattr(shirt, 'type', None), locale),
+            feature_label(getattr(shirt, 'tipologia', None), locale),
+            color_label(getattr(shirt, 'colore', None), locale),
+            sleeve_label(getattr(shirt, 'maniche', None), locale),
+            competition_label_localized(shirt, locale),
+        ])
+    parts.extend(_TEAM_ALIASES.get(map_national_team(getattr(shirt, 'squadra', None)), []))
+    if getattr(shirt, 'player_issued', False):
+        parts.append('Player Issue')
+    parts.extend([getattr(shirt, 'descrizione', None), getattr(shirt, 'descrizione_ita', None)])
+
+    seen = set()
+    unique_parts = []
+    for part in parts:
+        if part and part not in seen:
+            seen.add(part)
+            unique_parts.append(str(part))
+    return '\n'.join(unique_parts)
+
+
+def search_match_scores(q):
+    """Subquery of (shirt_id, score) rows matching every term of q, best match first.
+
+    Returns None when the current backend or query cannot use the index, in which
+    case callers fall back to their ilike filters.
+    """
+    dialect = db.session.get_bind().dialect.name
+    terms = search_terms(q)
+
+    if dialect == 'mysql':
+        terms = [term for term in terms if len(term) >= MYSQL_MIN_TERM_LENGTH]
+        if not terms:
+            return None
+        score = match(ShirtSearchDocument.document, against=' '.join(f'+{term}*' for term in terms)).in_boolean_mode()
+        return (
+            select(ShirtSearchDocument.shirt_id.label('shirt_id'), score.label('score'))
+            .where(score > 0)
+            .subquery('search_matches')
+        )
+
+    if dialect == 'sqlite':
+        if not terms:
+            return None
+        fts = table(FTS_TABLE, column('rowid'))
+        fts_ref = literal_column(FTS_TABLE)
+        return (
+            select(fts.c.rowid.label('shirt_id'), (-func.bm25(fts_ref)).label('score'))
+            .where(fts_ref.op('MATCH')(' '.join(f'"{term}"*' for term in terms)))
+            .subquery('search_matches')
+        )
+
+    return None
+
+
+def refresh_search_document(shirt):
+    document = build_search_document(shirt)
+    if shirt.search_document is None:
+        shirt.search_document = ShirtSearchDocument(document=document)
+    elif shirt.search_document.document != document:
+        shirt.search_document.document = document
+
+
+def reindex_all():
+    shirts = Shirt.query.options(selectinload(Shirt.search_document)).all()
+    for shirt in shirts:
+        refresh_search_document(shirt)
+    db.session.commit()
+    return len(shirts)
+
+
+def _before_flush(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Shirt) and obj not in session.deleted and session.is_modified(obj):
+            refresh_search_document(obj)
+
+
+@click.command('search-reindex')
+@with_appcontext
+def search_reindex_command():
+    """Rebuild the full-text search documents for every shirt."""
+    click.echo(f'indexed {reindex_all()} shirt(s)')
+
+
+def init_app(app):
+    search_table = ShirtSearchDocument.__table__
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+        for statement in SQLITE_FTS_DDL:
+            event.listen(search_table, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+        for statement in SQLITE_FTS_DROP_DDL:
+            event.listen(search_table, 'before_drop', DDL(statement).execute_if(dialect='sqlite'))
+    app.cli.add_command(search_reindex_command)
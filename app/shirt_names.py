@@ -0,0 +1,64 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event
+
+from app.models import db, Shirt
+from app.utils import build_shirt_slug, display_name_localized
+
+
+NAME_LOCALES = ('en', 'it')
+
+
+def refresh_shirt_names(shirt):
+    for locale in NAME_LOCALES:
+        slug = build_shirt_slug(shirt, locale)
+        display_name = display_name_localized(shirt, locale)
+        if getattr(shirt, f'slug_{locale}') != slug:
+            setattr(shirt, f'slug_{locale}', slug)
+        if getattr(shirt, f'display_name_{locale}') != display_name:
+            setattr(shirt, f'display_name_{locale}', display_name)
+
+
+def shirt_slug(shirt, locale):
+    """Stored slug for the locale; built on the fly for locales or rows without one."""
+    if locale in NAME_LOCALES:
+        slug = getattr(shirt, f'slug_{locale}', None)
+        if slug:
+            return slug
+    return build_shirt_slug(shirt, locale)
+
+
+def shirt_display_name(shirt, locale):
+    """Stored display name for the locale; built on the fly for locales or rows without one."""
+    if locale in NAME_LOCALES:
+        display_name = getattr(shirt, f'display_name_{locale}', None)
+        if display_name:
+            return display_name
+    return display_name_localized(shirt, locale)
+
+
+def rebuild_all():
+    shirts = Shirt.query.all()
+    for shirt in shirts:
+        refresh_shirt_names(shirt)
+    db.session.commit()
+    return len(shirts)
+
+
+def _before_flush(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Shirt) and obj not in session.deleted and session.is_modified(obj):
+            refresh_shirt_names(obj)
+
+
+@click.command('rebuild-shirt-names')
+@with_appcontext
+def rebuild_shirt_names_command():
+    """Recompute the stored slugs and display names, e.g. after label translations change."""
+    click.echo(f'refreshed names for {rebuild_all()} shirt(s)')
+
+
+def init_app(app):
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+    app.cli.add_command(rebuild_shirt_names_command)
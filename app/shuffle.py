@@ -0,0 +1,157 @@
+import hashlib
+import os
+import random
+import threading
+from datetime import date, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, insert, literal, select
+from sqlalchemy.exc import IntegrityError
+
+from app.models import db, Shirt, ShirtShuffleRank
+
+
+SHUFFLE_MODULUS = 2147483647
+SHUFFLE_MULTIPLIER = 1103515245
+SHUFFLE_POOL_SIZE = int(os.getenv('SHUFFLE_POOL_SIZE', '8'))
+
+_lock = threading.Lock()
+_pool = {'key': None, 'seeds': (), 'stored': frozenset()}
+
+
+def shuffle_rank(shirt_id, seed):
+    """Same ordering the catalog has always used for a given seed."""
+    return ((shirt_id * SHUFFLE_MULTIPLIER) + seed) % SHUFFLE_MODULUS
+
+
+def shuffle_rank_expression(seed):
+    return ((Shirt.id * SHUFFLE_MULTIPLIER) + seed) % SHUFFLE_MODULUS
+
+
+def pool_seeds(day):
+    seeds = []
+    for slot in range(SHUFFLE_POOL_SIZE):
+        digest = hashlib.sha256(f'{day.isoformat()}:{slot}'.encode('ascii')).hexdigest()
+        seeds.append(int(digest[:8], 16) % (SHUFFLE_MODULUS - 1) + 1)
+    return seeds
+
+
+def _fill_seed(connection, seed):
+    connection.execute(
+        insert(ShirtShuffleRank).from_select(
+            ['seed', 'shirt_id', 'rank'],
+            select(literal(seed), Shirt.id, shuffle_rank_expression(seed)),
+        )
+    )
+
+
+def _stored_seeds(connection):
+    return set(connection.execute(select(ShirtShuffleRank.seed).distinct()).scalars())
+
+
+def fill_shuffle_pool(today=None):
+    """Store ranks for today's seeds and drop seeds older than yesterday.
+
+    Writes in a transaction of its own, never the caller's session, so request
+    handlers stay read-only. Returns the seeds that have stored ranks afterwards.
+    """
+    today = today or date.today()
+    seeds = pool_seeds(today)
+    keep = set(seeds) | set(pool_seeds(today - timedelta(days=1)))
+    try:
+        with db.engine.begin() as connection:
+            stored = _stored_seeds(connection)
+            for seed in seeds:
+                if seed not in stored:
+                    _fill_seed(connection, seed)
+            stale = stored - keep
+            if stale:
+                connection.execute(delete(ShirtShuffleRank).where(ShirtShuffleRank.seed.in_(stale)))
+    except IntegrityError:
+        # Another worker filled the same seed first; its rows are identical.
+        pass
+    with db.engine.connect() as connection:
+        return frozenset(_stored_seeds(connection) & keep)
+
+
+def ensure_shuffle_pool(today=None):
+    """Today's seeds and the seeds with stored ranks, filling the pool if it is not ready yet.
+
+    Runs its queries at most once per process per day once the pool is complete;
+    ``flask shuffle-pool`` fills it ahead of the first visitor.
+    """
+    today = today or date.today()
+    pool_key = (today, str(db.engine.url))
+    with _lock:
+        if _pool['key'] == pool_key:
+            return _pool['seeds'], _pool['stored']
+
+    seeds = tuple(pool_seeds(today))
+    stored = fill_shuffle_pool(today)
+    # An incomplete pool (a concurrent fill not committed yet) is looked at again next time.
+    if stored.issuperset(seeds):
+        with _lock:
+            _pool.update(key=pool_key, seeds=seeds, stored=stored)
+    return seeds, stored
+
+
+def resolve_shuffle_seed(seed=None):
+    """Pick one of today's pooled seeds for visitors without one, so shuffled pages repeat and cache well.
+
+    Needs no database access; ``apply_shuffle_order`` fills the pool when it is first used.
+    """
+    if seed is None:
+        return random.choice(pool_seeds(date.today()))
+    return seed
+
+
+def apply_shuffle_order(query, seed):
+    """Join the stored ranks for pooled seeds; other seeds fall back to computing the rank per row.
+
+    Returns the query and the sort expression to order on.
+    """
+    _, stored = ensure_shuffle_pool()
+    if seed in stored:
+        query = query.join(
+            ShirtShuffleRank,
+            (ShirtShuffleRank.shirt_id == Shirt.id) & (ShirtShuffleRank.seed == seed),
+        )
+        return query, ShirtShuffleRank.rank
+    return query, shuffle_rank_expression(seed)
+
+
+def _after_flush(session, flush_context):
+    new_ids = [obj.id for obj in session.new if isinstance(obj, Shirt)]
+    deleted_ids = [obj.id for obj in session.deleted if isinstance(obj, Shirt)]
+    if not new_ids and not deleted_ids:
+        return
+
+    connection = session.connection()
+    if deleted_ids:
+        connection.execute(delete(ShirtShuffleRank).where(ShirtShuffleRank.shirt_id.in_(deleted_ids)))
+    if new_ids:
+        seeds = connection.execute(select(ShirtShuffleRank.seed).distinct()).scalars().all()
+        if seeds:
+            connection.execute(
+                insert(ShirtShuffleRank),
+                [
+                    {'seed': seed, 'shirt_id': shirt_id, 'rank': shuffle_rank(shirt_id, seed)}
+                    for seed in seeds
+                    for shirt_id in new_ids
+                ],
+            )
+
+
+@click.command('shuffle-pool')
+@with_appcontext
+def shuffle_pool_command():
+    """Store today's shuffle ranks and drop old ones (run daily, e.g. from cron, just after midnight)."""
+    stored = fill_shuffle_pool()
+    click.echo(f'{len(stored)} shuffle seeds have stored ranks')
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+    app.cli.add_command(shuffle_pool_command)
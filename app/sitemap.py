@@ -0,0 +1,193 @@
+import gzip
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape
+
+import click
+from flask import current_app, request, send_file, url_for
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from app.catalog_cache import _write_atomic, catalog_last_modified, catalog_version
+from app.models import db, Shirt
+
+
+SITEMAP_DIRNAME = 'sitemap'
+MANIFEST_FILENAME = 'manifest.json'
+INDEX_FILENAME = 'sitemap-index.xml.gz'
+# The sitemap protocol allows at most 50,000 URLs per file.
+SITEMAP_MAX_URLS = int(os.getenv('SITEMAP_MAX_URLS', '50000'))
+SITEMAP_BATCH_SIZE = 1000
+SITEMAP_LOCALES = ('en', 'it')
+
+URLSET_OPEN = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+URLSET_CLOSE = '</urlset>\n'
+INDEX_OPEN = '<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+INDEX_CLOSE = '</sitemapindex>\n'
+
+_lock = threading.Lock()
+
+
+def _sitemap_dir():
+    return os.path.join(current_app.config['CACHE_FOLDER'], SITEMAP_DIRNAME)
+
+
+def _shard_filename(shard):
+    return f'sitemap-{shard}.xml.gz'
+
+
+def sitemap_entries(url_root):
+    """(loc, lastmod) for the catalog and every active shirt, streamed in batches."""
+    catalog_lastmod = catalog_last_modified().date().isoformat()
+    for locale in SITEMAP_LOCALES:
+        yield f"{url_root}{url_for('public.catalog')}?lang={locale}", catalog_lastmod
+
+    rows = db.session.execute(
+        select(Shirt.id, Shirt.slug_en, Shirt.slug_it, Shirt.updated_at)
+        .where(Shirt.status == 'active')
+        .order_by(Shirt.id)
+        .execution_options(yield_per=SITEMAP_BATCH_SIZE)
+    )
+    for row in rows:
+        lastmod = row.updated_at.date().isoformat() if row.updated_at else None
+        for locale in SITEMAP_LOCALES:
+            # A row without a stored slug links to /shirt/<id>, which redirects to the canonical URL.
+            slug = getattr(row, f'slug_{locale}') or None
+            yield f"{url_root}{url_for('public.shirt_detail', shirt_id=row.id, slug=slug)}?lang={locale}", lastmod
+
+
+def _write_entry(handle, tag, loc, lastmod):
+    handle.write(f'  <{tag}>\n    <loc>{escape(loc)}</loc>\n')
+    if lastmod:
+        handle.write(f'    <lastmod>{lastmod}</lastmod>\n')
+    handle.write(f'  </{tag}>\n')
+
+
+def generate_sitemap(url_root):
+    """Write gzip shards (and an index when there is more than one) for the current catalog version."""
+    version = catalog_version()
+    sitemap_dir = _sitemap_dir()
+    target = os.path.join(sitemap_dir, version)
+    temp_dir = f'{target}.{os.getpid()}.{uuid.uuid4().hex}.tmp'
+    os.makedirs(temp_dir)
+
+    shards = 0
+    count = 0
+    handle = None
+    try:
+        for loc, lastmod in sitemap_entries(url_root):
+            if handle is None or count == SITEMAP_MAX_URLS:
+                if handle is not None:
+                    handle.write(URLSET_CLOSE)
+                    handle.close()
+                shards += 1
+                count = 0
+                handle = gzip.open(os.path.join(temp_dir, _shard_filename(shards)), 'wt', encoding='utf-8')
+                handle.write(URLSET_OPEN)
+            _write_entry(handle, 'url', loc, lastmod)
+            count += 1
+    finally:
+        if handle is not None:
+            handle.write(URLSET_CLOSE)
+            handle.close()
+
+    generated_at = datetime.now(timezone.utc).replace(microsecond=0)
+    if shards > 1:
+        with gzip.open(os.path.join(temp_dir, INDEX_FILENAME), 'wt', encoding='utf-8') as index:
+            index.write(INDEX_OPEN)
+            for shard in range(1, shards + 1):
+                loc = f"{url_root}{url_for('public.sitemap_shard', shard=shard)}"
+                _write_entry(index, 'sitemap', loc, generated_at.isoformat())
+            index.write(INDEX_CLOSE)
+
+    try:
+        os.rename(temp_dir, target)
+    except OSError:
+        # Another worker finished the same version first.
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    manifest = {'version': version, 'shards': shards, 'generated_at': generated_at.isoformat()}
+    _write_atomic(os.path.join(sitemap_dir, MANIFEST_FILENAME), json.dumps(manifest))
+    _prune(sitemap_dir, keep=version)
+    return manifest
+
+
+def _prune(sitemap_dir, keep):
+    for name in os.listdir(sitemap_dir):
+        path = os.path.join(sitemap_dir, name)
+        if name != keep and os.path.isdir(path) and not name.endswith('.tmp'):
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _read_manifest():
+    try:
+        with open(os.path.join(_sitemap_dir(), MANIFEST_FILENAME), encoding='utf-8') as handle:
+            return json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def sitemap_path(url_root, shard=None):
+    """Gzip file to serve for the index (shard=None) or one shard, or None if there is no such shard.
+
+    Files are only rebuilt when the catalog version has moved on since they were written.
+    """
+    manifest = _read_manifest()
+    version = catalog_version()
+    if manifest is None or manifest['version'] != version:
+        with _lock:
+            manifest = _read_manifest()
+            if manifest is None or manifest['version'] != version:
+                manifest = generate_sitemap(url_root)
+
+    if shard is None:
+        filename = INDEX_FILENAME if manifest['shards'] > 1 else _shard_filename(1)
+    elif 1 <= shard <= manifest['shards']:
+        filename = _shard_filename(shard)
+    else:
+        return None
+    return os.path.join(_sitemap_dir(), manifest['version'], filename)
+
+
+def sitemap_response(path):
+    """Send a stored gzip file as-is to clients that accept gzip, decompressed to the rest."""
+    if 'gzip' in request.accept_encodings:
+        response = send_file(path, mimetype='application/xml', conditional=True)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        with gzip.open(path, 'rb') as handle:
+            response = current_app.response_class(handle.read(), mimetype='application/xml')
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def serve_sitemap(url_root, shard=None):
+    """Response for the index or a shard, or None when the shard does not exist."""
+    path = sitemap_path(url_root, shard)
+    if path is None:
+        return None
+    try:
+        return sitemap_response(path)
+    except FileNotFoundError:
+        # Pruned by a worker that just wrote a newer version; serve that one.
+        path = sitemap_path(url_root, shard)
+        return sitemap_response(path) if path else None
+
+
+@click.command('sitemap-generate')
+@with_appcontext
+def sitemap_generate_command():
+    """Write the sitemap files for the current catalog version ahead of the first crawler hit."""
+    from app.blueprints.public import CANONICAL_BASE_URL
+
+    with current_app.test_request_context():
+        manifest = generate_sitemap(CANONICAL_BASE_URL)
+    click.echo(f"wrote {manifest['shards']} sitemap shard(s) for version {manifest['version']}")
+
+
+def init_app(app):
+    app.cli.add_command(sitemap_generate_command)
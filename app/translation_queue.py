@@ -0,0 +1,219 @@
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, exists, inspect, insert, literal, or_, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import openrouter
+from app.models import db, Shirt, TranslationJob
+
+
+TRANSLATION_MAX_ATTEMPTS = int(os.getenv('TRANSLATION_MAX_ATTEMPTS', '8'))
+TRANSLATION_BACKOFF_BASE = 30
+TRANSLATION_BACKOFF_MAX = 3600
+# Failed jobs start over with fresh attempts after this long, so an upstream outage heals by itself.
+TRANSLATION_FAILED_COOLDOWN = timedelta(hours=int(os.getenv('TRANSLATION_FAILED_COOLDOWN_HOURS', '24')))
+# How long a worker owns a claimed job before another worker may take it over.
+TRANSLATION_LEASE = timedelta(minutes=5)
+
+
+def _needs_translation(shirt):
+    return bool(shirt.descrizione) and not shirt.descrizione_ita
+
+
+def translated_description(shirt):
+    """Italian description if it is ready, else the English text.
+
+    A pure read: jobs are queued when descriptions are saved (_after_flush) and, for rows that
+    predate the queue, by queue_missing_translations, so the detail page never writes.
+    """
+    if not shirt.descrizione:
+        return None
+    return shirt.descrizione_ita or shirt.descrizione
+
+
+def queue_missing_translations():
+    """Queue every shirt that needs a translation but has no job yet; returns how many were queued.
+
+    Runs on its own connection, so it never commits anyone else's session.
+    """
+    now = datetime.utcnow()
+    missing = (
+        select(
+            Shirt.id,
+            Shirt.descrizione,
+            literal('pending'),
+            literal(0),
+            literal(now, TranslationJob.run_after.type),
+            literal(now, TranslationJob.created_at.type),
+        )
+        .where(
+            Shirt.descrizione.isnot(None),
+            Shirt.descrizione != '',
+            or_(Shirt.descrizione_ita.is_(None), Shirt.descrizione_ita == ''),
+            ~exists().where(TranslationJob.shirt_id == Shirt.id),
+        )
+    )
+    try:
+        with db.engine.begin() as connection:
+            return connection.execute(
+                insert(TranslationJob).from_select(
+                    ['shirt_id', 'source_text', 'status', 'attempts', 'run_after', 'created_at'],
+                    missing,
+                )
+            ).rowcount
+    except IntegrityError:
+        # A save queued one of them meanwhile; the rest are picked up on the next run.
+        return 0
+
+
+def _after_flush(session, flush_context):
+    deleted_ids = [obj.id for obj in session.deleted if isinstance(obj, Shirt)]
+    if deleted_ids:
+        session.connection().execute(delete(TranslationJob).where(TranslationJob.shirt_id.in_(deleted_ids)))
+
+    queued = {}
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, Shirt) or obj in session.deleted or not _needs_translation(obj):
+            continue
+        state = inspect(obj)
+        if obj in session.new or state.attrs.descrizione.history.has_changes() \
+                or state.attrs.descrizione_ita.history.has_changes():
+            queued[obj.id] = obj.descrizione
+    if not queued:
+        return
+
+    # Replace any older job so a re-edited description starts over with fresh attempts.
+    connection = session.connection()
+    connection.execute(delete(TranslationJob).where(TranslationJob.shirt_id.in_(list(queued))))
+    now = datetime.utcnow()
+    connection.execute(
+        insert(TranslationJob),
+        [
+            {
+                'shirt_id': shirt_id,
+                'source_text': text,
+                'status': 'pending',
+                'attempts': 0,
+                'run_after': now,
+                'created_at': now,
+            }
+            for shirt_id, text in queued.items()
+        ],
+    )
+
+
+def backoff_delay(attempts):
+    delay = min(TRANSLATION_BACKOFF_BASE * (2 ** (attempts - 1)), TRANSLATION_BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def _claim_next_job(now):
+    job = (
+        TranslationJob.query
+        .filter(TranslationJob.status.in_(('pending', 'running')), TranslationJob.run_after <= now)
+        .order_by(TranslationJob.run_after)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if job is None:
+        db.session.rollback()
+        return None
+    job.status = 'running'
+    job.run_after = now + TRANSLATION_LEASE
+    db.session.commit()
+    return job
+
+
+def run_translation_job(job):
+    """Translate one claimed job; returns True when the shirt got its Italian description."""
+    shirt = db.session.get(Shirt, job.shirt_id)
+    if shirt is None or not _needs_translation(shirt):
+        # Deleted or translated by hand since the job was queued.
+        db.session.delete(job)
+        db.session.commit()
+        return False
+    if shirt.descrizione != job.source_text:
+        # Re-edited while claimed: start over on the current text.
+        job.source_text = shirt.descrizione
+        job.status = 'pending'
+        job.attempts = 0
+        job.run_after = datetime.utcnow()
+        db.session.commit()
+        return False
+
+    translated = openrouter.translate_to_italian(job.source_text)
+    if translated:
+        shirt.descrizione_ita = translated
+        db.session.delete(job)
+        db.session.commit()
+        return True
+
+    job.attempts += 1
+    job.last_error = 'translation unavailable'
+    if job.attempts >= TRANSLATION_MAX_ATTEMPTS:
+        job.status = 'failed'
+        job.run_after = datetime.utcnow() + TRANSLATION_FAILED_COOLDOWN
+        current_app.logger.warning('Giving up translating shirt %s after %s attempts.', job.shirt_id, job.attempts)
+    else:
+        job.status = 'pending'
+        job.run_after = datetime.utcnow() + backoff_delay(job.attempts)
+    db.session.commit()
+    return False
+
+
+def retry_failed_translations(now=None):
+    """Re-arm failed jobs whose cooldown is over (all of them when now is None); returns how many."""
+    statement = update(TranslationJob).where(TranslationJob.status == 'failed')
+    if now is not None:
+        statement = statement.where(TranslationJob.run_after <= now)
+    rearmed = db.session.execute(
+        statement.values(status='pending', attempts=0, run_after=now or datetime.utcnow())
+    ).rowcount
+    db.session.commit()
+    return rearmed
+
+
+def run_pending_translations(limit=None):
+    """Work off due jobs, failed ones included once their cooldown is over; returns how many were processed."""
+    retry_failed_translations(datetime.utcnow())
+    processed = 0
+    while limit is None or processed < limit:
+        job = _claim_next_job(datetime.utcnow())
+        if job is None:
+            break
+        run_translation_job(job)
+        processed += 1
+    return processed
+
+
+@click.command('translation-worker')
+@click.option('--once', is_flag=True, help='Process the jobs that are due now, then exit.')
+@click.option('--poll-interval', default=5.0, show_default=True, help='Seconds to wait when the queue is empty.')
+@click.option('--retry-failed', is_flag=True, help='Retry failed jobs now instead of after their cooldown.')
+@with_appcontext
+def translation_worker_command(once, poll_interval, retry_failed):
+    """Translate queued shirt descriptions to Italian, retrying failures with backoff."""
+    queued = queue_missing_translations()
+    if queued:
+        click.echo(f'queued {queued} shirt(s) saved before the translation queue')
+    if retry_failed:
+        click.echo(f'retrying {retry_failed_translations()} failed translation job(s)')
+    while True:
+        processed = run_pending_translations()
+        if once:
+            click.echo(f'processed {processed} translation job(s)')
+            return
+        if not processed:
+            time.sleep(poll_interval)
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+    app.cli.add_command(translation_worker_command)
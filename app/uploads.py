@@ -0,0 +1,127 @@
+import os
+from urllib.parse import quote
+
+from flask import abort, current_app, request, send_file, url_for
+from werkzeug.utils import safe_join, send_file as werkzeug_send_file
+
+from app.image_store import is_object_path
+from app.image_utils import DERIVATIVE_FORMATS, DERIVATIVE_MIMETYPES, DERIVATIVE_WIDTHS, derivative_path
+
+
+# Versioned image URLs never change content, so browsers and proxies may keep them for a year.
+IMMUTABLE_MAX_AGE = 365 * 86400
+# flask streams files from the worker; x-accel (nginx) and x-sendfile (Apache, lighttpd) only
+# authorize the request and leave the transfer to the proxy.
+UPLOADS_DELIVERY_MODES = ('flask', 'x-accel', 'x-sendfile')
+# Catalog cards are two columns wide on phones and three from the xl breakpoint.
+CARD_IMAGE_SIZES = '(min-width: 1280px) 33vw, 50vw'
+
+
+def image_version(image):
+    if image.processing_status != 'ready':
+        # The file is still being rewritten by app.image_queue; keep it out of long-lived caches.
+        return None
+    if is_object_path(image.file_path):
+        # Content-addressed: the path itself changes with the content.
+        return None
+    stamp = image.updated_at or image.created_at
+    return int(stamp.timestamp() * 1000) if stamp else None
+
+
+def image_url(image, **kwargs):
+    """URL of an uploaded shirt image that changes whenever its content does.
+
+    Pass ``w`` for a resized copy in the best format the browser accepts.
+    """
+    return url_for('uploaded_file', filename=image.file_path, v=image_version(image), **kwargs)
+
+
+def image_srcset(image, widths=DERIVATIVE_WIDTHS):
+    return ', '.join(f'{image_url(image, w=width)} {width}w' for width in widths)
+
+
+def _accepts_explicitly(mimetype):
+    # Browsers list the modern formats they decode; image/* and */* say nothing about AVIF or WebP.
+    return any(value == mimetype and quality > 0 for value, quality in request.accept_mimetypes)
+
+
+def _derivative_for(filename, width):
+    """Smallest ladder step covering ``width``, in the first format the request accepts."""
+    width = next((step for step in DERIVATIVE_WIDTHS if step >= width), DERIVATIVE_WIDTHS[-1])
+    original = safe_join(current_app.config['UPLOAD_FOLDER'], filename)
+    if original is None:
+        return None, None
+    for image_format in DERIVATIVE_FORMATS:
+        mimetype = DERIVATIVE_MIMETYPES[image_format]
+        if image_format != 'jpeg' and not _accepts_explicitly(mimetype):
+            continue
+        path = derivative_path(original, width, image_format)
+        if os.path.isfile(path):
+            return path, mimetype
+    return None, None
+
+
+def _cache_forever(response):
+    # send_file marks every response no-cache; that would force a revalidation on each view.
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+
+
+def _send_upload(path, mimetype=None):
+    """Send a file under UPLOAD_FOLDER, or hand its transfer to the proxy per UPLOADS_DELIVERY."""
+    delivery = current_app.config['UPLOADS_DELIVERY']
+    if delivery == 'flask':
+        return send_file(path, mimetype=mimetype, conditional=True)
+
+    # Flask still sets ETag and Last-Modified and answers revalidations; the proxy streams the
+    # bytes and serves Range requests from the file itself.
+    response = werkzeug_send_file(
+        path,
+        request.environ,
+        mimetype=mimetype,
+        conditional=False,
+        use_x_sendfile=True,
+        response_class=current_app.response_class,
+    )
+    if delivery == 'x-accel':
+        del response.headers['X-Sendfile']
+        relative_path = os.path.relpath(path, current_app.config['UPLOAD_FOLDER']).replace(os.sep, '/')
+        response.headers['X-Accel-Redirect'] = current_app.config['UPLOADS_ACCEL_PREFIX'] + quote(relative_path)
+    response = response.make_conditional(request, accept_ranges=True)
+    if response.status_code == 304:
+        response.headers.pop('X-Sendfile', None)
+        response.headers.pop('X-Accel-Redirect', None)
+    return response
+
+
+def uploaded_file(filename):
+    immutable = is_object_path(filename) or bool(request.args.get('v'))
+    width = request.args.get('w', type=int)
+    if width:
+        path, mimetype = _derivative_for(filename, width)
+        if path is not None:
+            response = _send_upload(path, mimetype)
+            response.vary.add('Accept')
+            if immutable:
+                _cache_forever(response)
+            return response
+
+    path = safe_join(current_app.config['UPLOAD_FOLDER'], filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    response = _send_upload(path)
+    # Also the fallback for images whose derivatives were not generated yet, so never cached for good.
+    if immutable and not width:
+        _cache_forever(response)
+    return response
+
+
+def init_app(app):
+    if app.config['UPLOADS_DELIVERY'] not in UPLOADS_DELIVERY_MODES:
+        raise ValueError(f"UPLOADS_DELIVERY must be one of {', '.join(UPLOADS_DELIVERY_MODES)}")
+    app.add_url_rule('/uploads/<path:filename>', 'uploaded_file', uploaded_file)
+    app.add_template_global(image_url)
+    app.add_template_global(image_srcset)
+    app.jinja_env.globals['card_image_sizes'] = CARD_IMAGE_SIZES
@@ -60,6 +60,8 @@ COLOR_LABELS_IT = {
 }
 
 _SEASON_START_YEAR_REGEX = re.compile(r'((?:19|20)\d{2})')
+# Stands in for the year of seasons without one, so they sort after every real season.
+UNKNOWN_SEASON_YEAR = 9999
 _SIZE_ORDER = {
     'XXS': 0,
     'XS': 1,
@@ -111,6 +113,13 @@ def type_label(value, locale):
         return TYPE_LABELS_IT.get(label, label)
     return label
 
+def season_start_year(value):
+    """First 19xx/20xx year in a season label ('1995/1996' -> 1995), or None."""
+    if value is None:
+        return None
+    match = _SEASON_START_YEAR_REGEX.search(str(value))
+    return int(match.group(1)) if match else None
+
 def season_sort_key(value):
     if value is None:
         return (float('inf'), '')
@@ -119,12 +128,19 @@ def season_sort_key(value):
     if not text:
         return (float('inf'), '')
 
-    match = _SEASON_START_YEAR_REGEX.search(text)
-    if match:
-        return (int(match.group(1)), text.lower())
+    year = season_start_year(text)
+    if year is not None:
+        return (year, text.lower())
 
     return (float('inf'), text.lower())
 
+def season_sort_value(value):
+    """season_sort_key as one string an index can order by: '1995 1995/1996', '9999 vintage'."""
+    year, text = season_sort_key(value)
+    if year == float('inf'):
+        year = UNKNOWN_SEASON_YEAR
+    return f'{year:04d} {text}'
+
 def size_sort_key(value):
     if value is None:
         return (float('inf'), '')
@@ -142,6 +158,20 @@ def is_accessory_type(value):
     key = str(value).strip().lower()
     return key in _ACCESSORY_TYPE_KEYS
 
+def normalize_sleeve_group(value):
+    if not value:
+        return None
+    key = str(value).strip().lower()
+    if key in {'l/s', 'ls', 'long sleeve', 'long sleeves', 'long-sleeve', 'long-sleeves', 'maniche lunghe'}:
+        return 'long'
+    if key in {'s/s', 'ss', 'short sleeve', 'short sleeves', 'short-sleeve', 'short-sleeves', 'maniche corte'}:
+        return 'short'
+    if 'lunghe' in key or 'long' in key:
+        return 'long'
+    if 'corte' in key or 'short' in key:
+        return 'short'
+    return None
+
 def type_label_or_shirt(value, locale):
     if value:
         return type_label(value, locale)
@@ -198,6 +228,40 @@ def competition_label_localized(shirt, locale):
         return 'Nazionali'
     return campionato
 
+def display_name_localized(shirt, locale):
+    parts = []
+    team_name = team_name_localized(shirt, locale)
+
+    if locale == 'it':
+        parts.append(type_label_or_shirt(getattr(shirt, 'type', None), locale))
+        tipologia = getattr(shirt, 'tipologia', None)
+        if tipologia:
+            parts.append(feature_label(tipologia, locale))
+        if getattr(shirt, 'player_name', None):
+            parts.append(shirt.player_name)
+        # Sleeve type stays a filter-only attribute; omit from Italian display titles.
+        if getattr(shirt, 'brand', None):
+            parts.append(shirt.brand)
+        if team_name:
+            parts.append(team_name)
+    else:
+        if getattr(shirt, 'player_name', None):
+            parts.append(shirt.player_name)
+        if team_name:
+            parts.append(team_name)
+        if getattr(shirt, 'brand', None):
+            parts.append(shirt.brand)
+        tipologia = getattr(shirt, 'tipologia', None)
+        if tipologia:
+            parts.append(feature_label(tipologia, locale))
+        parts.append(type_label_or_shirt(getattr(shirt, 'type', None), locale))
+
+    if getattr(shirt, 'stagione', None):
+        stagione = shirt.stagione
+        parts.append(stagione)
+
+    return ' '.join([p for p in parts if p])
+
 def build_shirt_slug(shirt, locale):
     parts = []
     if getattr(shirt, 'player_name', None):
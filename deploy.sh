@@ -4,6 +4,10 @@
 PROJECT_DIR="/var/www/kitaly/kitaly"
 VENV_PATH="$PROJECT_DIR/venv"
 SERVICE_NAME="kitaly"
+# Background jobs the site relies on; their units live in deploy/systemd.
+WORKER_UNITS="kitaly-image-worker.service kitaly-translation-worker.service kitaly-shuffle-pool.timer"
+# The workers write uploads and cache files, so they run as the user that owns the project.
+SERVICE_USER="$(stat -c %U $PROJECT_DIR)"
 
 echo "🚀 Starting deployment..."
 
@@ -30,7 +34,19 @@ pybabel compile -d translations
 echo "🔄 Restarting Gunicorn service..."
 sudo systemctl restart $SERVICE_NAME
 
-# 6. Restart Nginx (optional, usually not needed for code changes, but good for safety)
+# 6. Install and (re)start the background workers
+echo "⚙️ Installing worker units..."
+for unit in $PROJECT_DIR/deploy/systemd/kitaly-*; do
+    sed -e "s|@PROJECT_DIR@|$PROJECT_DIR|g" -e "s|@VENV_PATH@|$VENV_PATH|g" -e "s|@SERVICE_USER@|$SERVICE_USER|g" \
+        "$unit" | sudo tee "/etc/systemd/system/$(basename "$unit")" > /dev/null
+done
+sudo systemctl daemon-reload
+sudo systemctl enable $WORKER_UNITS
+sudo systemctl restart $WORKER_UNITS
+# Fill today's shuffle pool now rather than waiting for the timer.
+sudo systemctl start kitaly-shuffle-pool.service
+
+# 7. Restart Nginx (optional, usually not needed for code changes, but good for safety)
 # sudo systemctl restart nginx
 
 echo "✅ Deployment complete! Website is live."
@@ -0,0 +1,39 @@
+"""add updated_at to shirts and shirt images
+
+Revision ID: 0b6e3d9a4c18
+Revises: f2a8d5c1b7e9
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import mysql
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6e3d9a4c18'
+down_revision = 'f2a8d5c1b7e9'
+branch_labels = None
+depends_on = None
+
+
+def _precise_datetime():
+    return sa.DateTime().with_variant(mysql.DATETIME(fsp=6), 'mysql')
+
+
+def upgrade():
+    for table in ('shirts', 'shirt_images'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', _precise_datetime(), nullable=True))
+
+        # Nothing better is known about existing rows than when they were created.
+        op.execute(f"UPDATE {table} SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP)")
+
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column('updated_at', existing_type=_precise_datetime(), nullable=False)
+
+
+def downgrade():
+    for table in ('shirt_images', 'shirts'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('updated_at')
@@ -0,0 +1,273 @@
+"""add shirt full-text search index
+
+Revision ID: 2d7c4e9a1b36
+Revises: 6a9d8f1c2b3e
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d7c4e9a1b36'
+down_revision = '6a9d8f1c2b3e'
+branch_labels = None
+depends_on = None
+
+
+# Frozen copies of app.search as of this revision, so replaying the migration does not
+# depend on how the application builds documents today. `flask search-reindex` brings
+# existing documents up to date with the current builder.
+FTS_TABLE = 'shirt_search_fts'
+SQLITE_FTS_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        document,
+        content='shirt_search',
+        content_rowid='shirt_id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS shirt_search_ai AFTER INSERT ON shirt_search BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.shirt_id, new.document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS shirt_search_ad AFTER DELETE ON shirt_search BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.shirt_id, old.document);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS shirt_search_au AFTER UPDATE ON shirt_search BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, document) VALUES ('delete', old.shirt_id, old.document);
+        INSERT INTO {FTS_TABLE}(rowid, document) VALUES (new.shirt_id, new.document);
+    END
+    """,
+]
+SQLITE_FTS_DROP_DDL = [
+    'DROP TRIGGER IF EXISTS shirt_search_au',
+    'DROP TRIGGER IF EXISTS shirt_search_ad',
+    'DROP TRIGGER IF EXISTS shirt_search_ai',
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+]
+
+TYPE_LABELS_IT = {
+    'Shirt': 'Maglia',
+    'Training Top': "Capo d'allenamento",
+    'Polo Shirt': 'Polo',
+    'T-Shirt': 'Maglietta',
+    'Sweatshirt': 'Felpa',
+    'Hoodie': 'Felpa con cappuccio',
+    'Coat': 'Giacca',
+    '1/4 Zip': '1/4 Zip',
+    'Track Jacket': 'Giacca da Tuta',
+    'Tracksuit': 'Tuta',
+    'Bottoms': 'Pantaloni',
+    'Shorts': 'Pantaloncini',
+    'Gilet': 'Smanicato',
+    'Vest': 'Canottiera',
+    'Accessory': 'Accessorio',
+    'Accessories': 'Accessorio',
+    'Accessorio': 'Accessorio',
+}
+FEATURE_LABELS_IT = {
+    'Home': 'Casa',
+    'Away': 'Trasferta',
+    'Third': 'Terza',
+    'Fourth': 'Quarta',
+    'Goalkeeper': 'Portiere',
+    'GK': 'Portiere',
+}
+SLEEVE_LABELS_IT = {'L/S': 'Maniche Lunghe', 'S/S': 'Maniche Corte'}
+SLEEVE_LABELS_EN = {'L/S': 'Long Sleeve', 'S/S': 'Short Sleeve'}
+COLOR_LABELS_IT = {
+    'black': 'Nero',
+    'white': 'Bianco',
+    'red': 'Rosso',
+    'blue': 'Blu',
+    'yellow': 'Giallo',
+    'green': 'Verde',
+    'purple': 'Viola',
+    'orange': 'Arancione',
+    'grey': 'Grigio',
+    'gray': 'Grigio',
+    'gold': 'Oro',
+    'silver': 'Argento',
+    'navy': 'Blu Navy',
+    'burgundy': 'Bordeaux',
+}
+NATIONAL_TEAM_PAIRS = [
+    ('Italy', 'Italia'),
+    ('England', 'Inghilterra'),
+    ('France', 'Francia'),
+    ('Germany', 'Germania'),
+    ('Spain', 'Spagna'),
+    ('Portugal', 'Portogallo'),
+    ('Brazil', 'Brasile'),
+    ('Argentina', 'Argentina'),
+    ('Netherlands', 'Paesi Bassi'),
+    ('Belgium', 'Belgio'),
+    ('United States', 'Stati Uniti'),
+    ('United States of America', 'Stati Uniti'),
+    ('USA', 'Stati Uniti'),
+    ('U.S.A.', 'Stati Uniti'),
+    ('Mexico', 'Messico'),
+    ('Uruguay', 'Uruguay'),
+    ('Colombia', 'Colombia'),
+    ('Chile', 'Cile'),
+    ('Croatia', 'Croazia'),
+    ('Serbia', 'Serbia'),
+    ('Switzerland', 'Svizzera'),
+    ('Austria', 'Austria'),
+    ('Denmark', 'Danimarca'),
+    ('Sweden', 'Svezia'),
+    ('Norway', 'Norvegia'),
+    ('Poland', 'Polonia'),
+    ('Czech Republic', 'Repubblica Ceca'),
+    ('Turkey', 'Turchia'),
+    ('Greece', 'Grecia'),
+    ('Russia', 'Russia'),
+    ('Ukraine', 'Ucraina'),
+    ('Japan', 'Giappone'),
+    ('South Korea', 'Corea del Sud'),
+    ('China', 'Cina'),
+    ('Australia', 'Australia'),
+    ('Morocco', 'Marocco'),
+    ('Algeria', 'Algeria'),
+    ('Tunisia', 'Tunisia'),
+    ('Egypt', 'Egitto'),
+    ('Nigeria', 'Nigeria'),
+    ('Ghana', 'Ghana'),
+    ('Cameroon', 'Camerun'),
+    ("Cote d'Ivoire", "Costa d'Avorio"),
+    ('Ivory Coast', "Costa d'Avorio"),
+    ('Senegal', 'Senegal'),
+]
+
+
+def _team_key(name):
+    key = re.sub(r'\s+', ' ', name.strip().lower()).replace('.', '')
+    return re.sub(r'\s+(national team|nazionale)$', '', key).strip()
+
+
+NATIONAL_TEAM_MAP = {}
+TEAM_ALIASES = {}
+for en_name, it_name in NATIONAL_TEAM_PAIRS:
+    NATIONAL_TEAM_MAP[_team_key(en_name)] = it_name
+    NATIONAL_TEAM_MAP[_team_key(it_name)] = it_name
+    TEAM_ALIASES.setdefault(it_name, [it_name])
+    if en_name not in TEAM_ALIASES[it_name]:
+        TEAM_ALIASES[it_name].append(en_name)
+
+
+def _type_label(value, locale):
+    if not value:
+        return 'Maglia' if locale == 'it' else 'Shirt'
+    label = 'Training Top' if value == 'Training Shirt' else value
+    return TYPE_LABELS_IT.get(label, label) if locale == 'it' else label
+
+
+def _feature_label(value, locale):
+    if not value:
+        return ''
+    return FEATURE_LABELS_IT.get(value, value) if locale == 'it' else value
+
+
+def _sleeve_label(value, locale):
+    if not value:
+        return ''
+    return (SLEEVE_LABELS_IT if locale == 'it' else SLEEVE_LABELS_EN).get(value, value)
+
+
+def _color_label(value, locale):
+    if not value or locale != 'it':
+        return value or ''
+    return COLOR_LABELS_IT.get(str(value).strip().lower(), value)
+
+
+def _competition_label(row, locale):
+    campionato = row.get('campionato')
+    if not campionato:
+        return campionato
+    key = str(campionato).strip().lower()
+    is_national = row.get('nazionale') or key in ['nazionali', 'nazionale', 'national teams', 'national team']
+    if locale == 'en' and is_national:
+        return 'National Teams'
+    if locale == 'it' and key in ['national teams', 'national team']:
+        return 'Nazionali'
+    return campionato
+
+
+def build_search_document(row):
+    parts = [
+        str(row.get('product_code')) if row.get('product_code') is not None else None,
+        row.get('player_name'),
+        row.get('brand'),
+        row.get('squadra'),
+        row.get('campionato'),
+        row.get('colore'),
+        row.get('stagione'),
+        row.get('tipologia'),
+        row.get('type'),
+        row.get('maniche'),
+    ]
+    for locale in ('en', 'it'):
+        parts.extend([
+            _type_label(row.get('type'), locale),
+            _feature_label(row.get('tipologia'), locale),
+            _color_label(row.get('colore'), locale),
+            _sleeve_label(row.get('maniche'), locale),
+            _competition_label(row, locale),
+        ])
+    squadra = row.get('squadra')
+    if squadra:
+        parts.extend(TEAM_ALIASES.get(NATIONAL_TEAM_MAP.get(_team_key(squadra), squadra), []))
+    if row.get('player_issued'):
+        parts.append('Player Issue')
+    parts.extend([row.get('descrizione'), row.get('descrizione_ita')])
+
+    seen = set()
+    unique_parts = []
+    for part in parts:
+        if part and part not in seen:
+            seen.add(part)
+            unique_parts.append(str(part))
+    return '\n'.join(unique_parts)
+
+
+def upgrade():
+    bind = op.get_bind()
+    dialect = bind.dialect.name
+
+    op.create_table(
+        'shirt_search',
+        sa.Column('shirt_id', sa.Integer(), sa.ForeignKey('shirts.id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('document', sa.Text(), nullable=False),
+    )
+    if dialect == 'mysql':
+        op.create_index('ix_shirt_search_document', 'shirt_search', ['document'], mysql_prefix='FULLTEXT')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_FTS_DDL:
+            op.execute(sa.text(statement))
+
+    shirts = bind.execute(sa.text("SELECT * FROM shirts")).mappings().all()
+    if shirts:
+        search_table = sa.table('shirt_search', sa.column('shirt_id', sa.Integer), sa.column('document', sa.Text))
+        op.bulk_insert(
+            search_table,
+            [{'shirt_id': row.get('id'), 'document': build_search_document(row)} for row in shirts],
+        )
+
+
+def downgrade():
+    bind = op.get_bind()
+    if bind.dialect.name == 'sqlite':
+        for statement in SQLITE_FTS_DROP_DDL:
+            op.execute(sa.text(statement))
+    elif bind.dialect.name == 'mysql':
+        op.drop_index('ix_shirt_search_document', table_name='shirt_search')
+    op.drop_table('shirt_search')
@@ -0,0 +1,25 @@
+"""index shirt image file paths for shared object lookups
+
+Revision ID: 3b8f1d6e2a47
+Revises: 9c4e2b7a5f10
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8f1d6e2a47'
+down_revision = '9c4e2b7a5f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('shirt_images', schema=None) as batch_op:
+        batch_op.create_index('ix_shirt_images_file_path', ['file_path'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('shirt_images', schema=None) as batch_op:
+        batch_op.drop_index('ix_shirt_images_file_path')
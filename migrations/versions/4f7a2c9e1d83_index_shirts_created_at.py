@@ -0,0 +1,25 @@
+"""index shirts by created_at for the dashboard's newest-first sort
+
+Revision ID: 4f7a2c9e1d83
+Revises: f8b3d1e6a2c9
+Create Date: 2026-10-17 23:30:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '4f7a2c9e1d83'
+down_revision = 'f8b3d1e6a2c9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.create_index('ix_shirts_created_at', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.drop_index('ix_shirts_created_at')
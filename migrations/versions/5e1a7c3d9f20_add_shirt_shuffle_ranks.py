@@ -0,0 +1,37 @@
+"""add precomputed shuffle ranks
+
+Revision ID: 5e1a7c3d9f20
+Revises: 2d7c4e9a1b36
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1a7c3d9f20'
+down_revision = '2d7c4e9a1b36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows are filled lazily for each day's seed pool by app.shuffle.ensure_shuffle_pool.
+    op.create_table(
+        'shirt_shuffle_ranks',
+        sa.Column('seed', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('shirt_id', sa.Integer(), sa.ForeignKey('shirts.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('rank', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('seed', 'shirt_id'),
+    )
+    op.create_index(
+        'ix_shirt_shuffle_ranks_seed_rank',
+        'shirt_shuffle_ranks',
+        ['seed', 'rank', 'shirt_id'],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_shirt_shuffle_ranks_seed_rank', table_name='shirt_shuffle_ranks')
+    op.drop_table('shirt_shuffle_ranks')
@@ -0,0 +1,239 @@
+"""add stored localized slugs and display names to shirts
+
+Revision ID: 7d3f1a6b2c95
+Revises: 0b6e3d9a4c18
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+import re
+import unicodedata
+from types import SimpleNamespace
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d3f1a6b2c95'
+down_revision = '0b6e3d9a4c18'
+branch_labels = None
+depends_on = None
+
+
+NAME_COLUMNS = ('slug_en', 'slug_it', 'display_name_en', 'display_name_it')
+SOURCE_COLUMNS = (
+    'id', 'player_name', 'maniche', 'squadra', 'nazionale', 'brand', 'tipologia', 'type',
+    'campionato', 'colore', 'taglia', 'stagione', 'player_issued',
+)
+
+
+# Frozen copies of app.utils.display_name_localized / build_shirt_slug as of this revision, so
+# replaying the migration does not depend on how the application names shirts today. Saving a
+# shirt derives its names again with the current builders.
+TYPE_LABELS_IT = {
+    'Shirt': 'Maglia',
+    'Training Top': "Capo d'allenamento",
+    'Polo Shirt': 'Polo',
+    'T-Shirt': 'Maglietta',
+    'Sweatshirt': 'Felpa',
+    'Hoodie': 'Felpa con cappuccio',
+    'Coat': 'Giacca',
+    '1/4 Zip': '1/4 Zip',
+    'Track Jacket': 'Giacca da Tuta',
+    'Tracksuit': 'Tuta',
+    'Bottoms': 'Pantaloni',
+    'Shorts': 'Pantaloncini',
+    'Gilet': 'Smanicato',
+    'Vest': 'Canottiera',
+    'Accessory': 'Accessorio',
+    'Accessories': 'Accessorio',
+    'Accessorio': 'Accessorio',
+}
+FEATURE_LABELS_IT = {
+    'Home': 'Casa',
+    'Away': 'Trasferta',
+    'Third': 'Terza',
+    'Fourth': 'Quarta',
+    'Goalkeeper': 'Portiere',
+    'GK': 'Portiere',
+}
+SLEEVE_LABELS_IT = {'L/S': 'Maniche Lunghe', 'S/S': 'Maniche Corte'}
+SLEEVE_LABELS_EN = {'L/S': 'Long Sleeve', 'S/S': 'Short Sleeve'}
+COLOR_LABELS_IT = {
+    'black': 'Nero',
+    'white': 'Bianco',
+    'red': 'Rosso',
+    'blue': 'Blu',
+    'yellow': 'Giallo',
+    'green': 'Verde',
+    'purple': 'Viola',
+    'orange': 'Arancione',
+    'grey': 'Grigio',
+    'gray': 'Grigio',
+    'gold': 'Oro',
+    'silver': 'Argento',
+    'navy': 'Blu Navy',
+    'burgundy': 'Bordeaux',
+}
+NATIONAL_TEAM_PAIRS = [
+    ('Italy', 'Italia'),
+    ('England', 'Inghilterra'),
+    ('France', 'Francia'),
+    ('Germany', 'Germania'),
+    ('Spain', 'Spagna'),
+    ('Portugal', 'Portogallo'),
+    ('Brazil', 'Brasile'),
+    ('Argentina', 'Argentina'),
+    ('Netherlands', 'Paesi Bassi'),
+    ('Belgium', 'Belgio'),
+    ('United States', 'Stati Uniti'),
+    ('United States of America', 'Stati Uniti'),
+    ('USA', 'Stati Uniti'),
+    ('U.S.A.', 'Stati Uniti'),
+    ('Mexico', 'Messico'),
+    ('Uruguay', 'Uruguay'),
+    ('Colombia', 'Colombia'),
+    ('Chile', 'Cile'),
+    ('Croatia', 'Croazia'),
+    ('Serbia', 'Serbia'),
+    ('Switzerland', 'Svizzera'),
+    ('Austria', 'Austria'),
+    ('Denmark', 'Danimarca'),
+    ('Sweden', 'Svezia'),
+    ('Norway', 'Norvegia'),
+    ('Poland', 'Polonia'),
+    ('Czech Republic', 'Repubblica Ceca'),
+    ('Turkey', 'Turchia'),
+    ('Greece', 'Grecia'),
+    ('Russia', 'Russia'),
+    ('Ukraine', 'Ucraina'),
+    ('Japan', 'Giappone'),
+    ('South Korea', 'Corea del Sud'),
+    ('China', 'Cina'),
+    ('Australia', 'Australia'),
+    ('Morocco', 'Marocco'),
+    ('Algeria', 'Algeria'),
+    ('Tunisia', 'Tunisia'),
+    ('Egypt', 'Egitto'),
+    ('Nigeria', 'Nigeria'),
+    ('Ghana', 'Ghana'),
+    ('Cameroon', 'Camerun'),
+    ("Cote d'Ivoire", "Costa d'Avorio"),
+    ('Ivory Coast', "Costa d'Avorio"),
+    ('Senegal', 'Senegal'),
+]
+
+
+
+def _team_key(name):
+    key = re.sub(r'\s+', ' ', name.strip().lower()).replace('.', '')
+    return re.sub(r'\s+(national team|nazionale)$', '', key).strip()
+
+
+NATIONAL_TEAM_MAP = {}
+for en_name, it_name in NATIONAL_TEAM_PAIRS:
+    NATIONAL_TEAM_MAP[_team_key(en_name)] = it_name
+    NATIONAL_TEAM_MAP[_team_key(it_name)] = it_name
+
+
+def _slugify(value):
+    if not value:
+        return ''
+    ascii_text = unicodedata.normalize('NFKD', str(value)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-zA-Z0-9]+', '-', ascii_text.lower()).strip('-')
+
+
+def _type_label(value, locale):
+    if not value:
+        return 'Maglia' if locale == 'it' else 'Shirt'
+    label = 'Training Top' if value == 'Training Shirt' else value
+    return TYPE_LABELS_IT.get(label, label) if locale == 'it' else label
+
+
+def _feature_label(value, locale):
+    if not value:
+        return ''
+    return FEATURE_LABELS_IT.get(value, value) if locale == 'it' else value
+
+
+def _sleeve_label(value, locale):
+    if not value:
+        return ''
+    return (SLEEVE_LABELS_IT if locale == 'it' else SLEEVE_LABELS_EN).get(value, value)
+
+
+def _color_label(value, locale):
+    if not value or locale != 'it':
+        return value or ''
+    return COLOR_LABELS_IT.get(str(value).strip().lower(), value)
+
+
+def _team_name(shirt, locale):
+    if shirt.squadra and locale == 'it' and shirt.nazionale:
+        return NATIONAL_TEAM_MAP.get(_team_key(shirt.squadra), shirt.squadra)
+    return shirt.squadra
+
+
+def _competition_label(shirt, locale):
+    campionato = shirt.campionato
+    if not campionato:
+        return campionato
+    key = str(campionato).strip().lower()
+    is_national = shirt.nazionale or key in ['nazionali', 'nazionale', 'national teams', 'national team']
+    if locale == 'en' and is_national:
+        return 'National Teams'
+    if locale == 'it' and key in ['national teams', 'national team']:
+        return 'Nazionali'
+    return campionato
+
+
+def display_name_localized(shirt, locale):
+    team_name = _team_name(shirt, locale)
+    feature = _feature_label(shirt.tipologia, locale) if shirt.tipologia else None
+    if locale == 'it':
+        parts = [_type_label(shirt.type, locale), feature, shirt.player_name, shirt.brand, team_name]
+    else:
+        parts = [shirt.player_name, team_name, shirt.brand, feature, _type_label(shirt.type, locale)]
+    parts.append(shirt.stagione)
+    return ' '.join([p for p in parts if p])
+
+
+def build_shirt_slug(shirt, locale):
+    parts = [
+        shirt.player_name,
+        _sleeve_label(shirt.maniche, locale) if shirt.maniche else None,
+        _team_name(shirt, locale),
+        shirt.brand,
+        shirt.tipologia,
+        _type_label(shirt.type, locale),
+        _competition_label(shirt, locale),
+        _color_label(shirt.colore, locale) if shirt.colore else None,
+        shirt.taglia,
+        shirt.stagione,
+        'Player Issue' if shirt.player_issued else None,
+    ]
+    return _slugify(' '.join([p for p in parts if p])) or str(shirt.id or '')
+
+
+def upgrade():
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        for name in NAME_COLUMNS:
+            batch_op.add_column(sa.Column(name, sa.String(length=1024), nullable=True))
+
+    # The builders the request path used, run once per shirt instead of once per hit.
+    bind = op.get_bind()
+    shirts = sa.table('shirts', sa.column('id', sa.Integer), *[sa.column(name, sa.String) for name in NAME_COLUMNS])
+    rows = bind.execute(sa.text(f"SELECT {', '.join(SOURCE_COLUMNS)} FROM shirts")).mappings().all()
+    for row in rows:
+        shirt = SimpleNamespace(**row)
+        values = {}
+        for locale in ('en', 'it'):
+            values[f'slug_{locale}'] = build_shirt_slug(shirt, locale)
+            values[f'display_name_{locale}'] = display_name_localized(shirt, locale)
+        bind.execute(shirts.update().where(shirts.c.id == row['id']).values(**values))
+
+
+def downgrade():
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        for name in reversed(NAME_COLUMNS):
+            batch_op.drop_column(name)
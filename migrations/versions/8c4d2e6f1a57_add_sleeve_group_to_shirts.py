@@ -0,0 +1,57 @@
+"""add indexed sleeve_group to shirts
+
+Revision ID: 8c4d2e6f1a57
+Revises: 5e1a7c3d9f20
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4d2e6f1a57'
+down_revision = '5e1a7c3d9f20'
+branch_labels = None
+depends_on = None
+
+
+# Frozen copy of app.utils.normalize_sleeve_group as of this revision.
+LONG_SLEEVE_VALUES = {'l/s', 'ls', 'long sleeve', 'long sleeves', 'long-sleeve', 'long-sleeves', 'maniche lunghe'}
+SHORT_SLEEVE_VALUES = {'s/s', 'ss', 'short sleeve', 'short sleeves', 'short-sleeve', 'short-sleeves', 'maniche corte'}
+
+
+def normalize_sleeve_group(value):
+    if not value:
+        return None
+    key = str(value).strip().lower()
+    if key in LONG_SLEEVE_VALUES:
+        return 'long'
+    if key in SHORT_SLEEVE_VALUES:
+        return 'short'
+    if 'lunghe' in key or 'long' in key:
+        return 'long'
+    if 'corte' in key or 'short' in key:
+        return 'short'
+    return None
+
+
+def upgrade():
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('sleeve_group', sa.String(length=10), nullable=True))
+        batch_op.create_index('ix_shirts_sleeve_group', ['sleeve_group'], unique=False)
+
+    # Same normalization the catalog applied at query time, run once per distinct spelling.
+    bind = op.get_bind()
+    shirts = sa.table('shirts', sa.column('maniche', sa.String), sa.column('sleeve_group', sa.String))
+    values = bind.execute(sa.text("SELECT DISTINCT maniche FROM shirts WHERE maniche IS NOT NULL")).scalars().all()
+    for value in values:
+        group = normalize_sleeve_group(value)
+        if group:
+            bind.execute(shirts.update().where(shirts.c.maniche == value).values(sleeve_group=group))
+
+
+def downgrade():
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.drop_index('ix_shirts_sleeve_group')
+        batch_op.drop_column('sleeve_group')
@@ -0,0 +1,33 @@
+"""add background processing state to shirt images
+
+Revision ID: 9c4e2b7a5f10
+Revises: 7d3f1a6b2c95
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c4e2b7a5f10'
+down_revision = '7d3f1a6b2c95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing uploads were normalized inline by the request that stored them.
+    with op.batch_alter_table('shirt_images', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('processing_status', sa.String(length=20), nullable=False, server_default='ready'))
+        batch_op.add_column(sa.Column('processing_started_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('processing_error', sa.Text(), nullable=True))
+        batch_op.create_index('ix_shirt_images_processing_status', ['processing_status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('shirt_images', schema=None) as batch_op:
+        batch_op.drop_index('ix_shirt_images_processing_status')
+        batch_op.drop_column('processing_error')
+        batch_op.drop_column('processing_started_at')
+        batch_op.drop_column('processing_status')
@@ -0,0 +1,39 @@
+"""make shirts.created_at non-null so keyset pages reach legacy rows
+
+Revision ID: 9e6b4d2a7c15
+Revises: 4f7a2c9e1d83
+Create Date: 2026-10-17 23:45:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e6b4d2a7c15'
+down_revision = '4f7a2c9e1d83'
+branch_labels = None
+depends_on = None
+
+
+# Both backends sort NULL before every timestamp, so legacy rows keep the place they had in
+# newest/oldest listings; downgrade turns this value back into NULL.
+LEGACY_CREATED_AT = datetime(1970, 1, 1)
+
+
+def upgrade():
+    shirts = sa.table('shirts', sa.column('created_at', sa.DateTime))
+    op.execute(shirts.update().where(shirts.c.created_at.is_(None)).values(created_at=LEGACY_CREATED_AT))
+
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
+
+    shirts = sa.table('shirts', sa.column('created_at', sa.DateTime))
+    op.execute(shirts.update().where(shirts.c.created_at == LEGACY_CREATED_AT).values(created_at=None))
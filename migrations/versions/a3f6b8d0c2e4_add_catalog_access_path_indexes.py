@@ -0,0 +1,42 @@
+"""add composite indexes for catalog and dashboard access paths
+
+Revision ID: a3f6b8d0c2e4
+Revises: 8c4d2e6f1a57
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f6b8d0c2e4'
+down_revision = '8c4d2e6f1a57'
+branch_labels = None
+depends_on = None
+
+
+SHIRT_INDEXES = (
+    ('ix_shirts_status_created_at', ['status', 'created_at', 'id']),
+    ('ix_shirts_status_sold', ['status', 'sold']),
+    ('ix_shirts_brand_status', ['brand', 'status']),
+    ('ix_shirts_campionato_status', ['campionato', 'status']),
+    ('ix_shirts_colore_status', ['colore', 'status']),
+    ('ix_shirts_stagione_status', ['stagione', 'status']),
+    ('ix_shirts_type_status', ['type', 'status']),
+    ('ix_shirts_taglia_status', ['taglia', 'status']),
+)
+
+
+def upgrade():
+    for name, columns in SHIRT_INDEXES:
+        op.create_index(name, 'shirts', columns)
+    op.create_index('ix_shirt_images_shirt_id_is_cover', 'shirt_images', ['shirt_id', 'is_cover'])
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'mysql':
+        # MySQL drops its implicit foreign-key index once the composite one covers shirt_id.
+        op.create_index('ix_shirt_images_shirt_id', 'shirt_images', ['shirt_id'])
+    op.drop_index('ix_shirt_images_shirt_id_is_cover', table_name='shirt_images')
+    for name, _ in reversed(SHIRT_INDEXES):
+        op.drop_index(name, table_name='shirts')
@@ -0,0 +1,64 @@
+"""add materialized inventory summary totals
+
+Revision ID: c7e2a94f1d58
+Revises: 3b8f1d6e2a47
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2a94f1d58'
+down_revision = '3b8f1d6e2a47'
+branch_labels = None
+depends_on = None
+
+
+# Frozen copy of app.inventory_summary.SUMMARY_SCALE: totals are stored in cents.
+SUMMARY_SCALE = 10 ** 2
+
+
+def upgrade():
+    summary = op.create_table(
+        'inventory_summary',
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('shirt_count', sa.Integer(), nullable=False),
+        sa.Column('total_spent', sa.BigInteger(), nullable=False),
+        sa.Column('total_margin', sa.BigInteger(), nullable=False),
+        sa.Column('sold_total_spent', sa.BigInteger(), nullable=False),
+        sa.Column('sold_total_gain', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('status'),
+    )
+
+    shirts = sa.table(
+        'shirts',
+        sa.column('id', sa.Integer),
+        sa.column('status', sa.String),
+        sa.column('prezzo_pagato', sa.Float),
+        sa.column('internal_price', sa.Numeric(10, 2)),
+        sa.column('sold', sa.Boolean),
+    )
+    paid = sa.cast(sa.func.round(shirts.c.prezzo_pagato * SUMMARY_SCALE), sa.Integer)
+    selling = sa.cast(sa.func.round(shirts.c.internal_price * SUMMARY_SCALE), sa.Integer)
+    priced = sa.and_(shirts.c.prezzo_pagato.isnot(None), shirts.c.internal_price.isnot(None))
+    sold_priced = sa.and_(priced, shirts.c.sold.is_(True))
+    status = sa.func.coalesce(shirts.c.status, '')
+    op.execute(
+        summary.insert().from_select(
+            ['status', 'shirt_count', 'total_spent', 'total_margin', 'sold_total_spent', 'sold_total_gain'],
+            sa.select(
+                status,
+                sa.func.count(shirts.c.id),
+                sa.func.coalesce(sa.func.sum(paid), 0),
+                sa.func.coalesce(sa.func.sum(sa.case((priced, selling - paid), else_=0)), 0),
+                sa.func.coalesce(sa.func.sum(sa.case((sold_priced, paid), else_=0)), 0),
+                sa.func.coalesce(sa.func.sum(sa.case((sold_priced, selling - paid), else_=0)), 0),
+            ).group_by(status),
+        )
+    )
+
+
+def downgrade():
+    op.drop_table('inventory_summary')
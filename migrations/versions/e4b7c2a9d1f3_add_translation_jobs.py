@@ -0,0 +1,50 @@
+"""add translation job queue
+
+Revision ID: e4b7c2a9d1f3
+Revises: a3f6b8d0c2e4
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b7c2a9d1f3'
+down_revision = 'a3f6b8d0c2e4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'translation_jobs',
+        sa.Column('shirt_id', sa.Integer(), sa.ForeignKey('shirts.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('source_text', sa.Text(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('run_after', sa.DateTime(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('shirt_id'),
+    )
+    op.create_index('ix_translation_jobs_status_run_after', 'translation_jobs', ['status', 'run_after'])
+
+    # Queue every description that was still waiting for an on-demand translation.
+    now = datetime.utcnow()
+    op.get_bind().execute(
+        sa.text(
+            "INSERT INTO translation_jobs (shirt_id, source_text, status, attempts, run_after, created_at) "
+            "SELECT id, descrizione, 'pending', 0, :now, :now FROM shirts "
+            "WHERE descrizione IS NOT NULL AND descrizione <> '' "
+            "AND (descrizione_ita IS NULL OR descrizione_ita = '')"
+        ),
+        {'now': now},
+    )
+
+
+def downgrade():
+    op.drop_index('ix_translation_jobs_status_run_after', table_name='translation_jobs')
+    op.drop_table('translation_jobs')
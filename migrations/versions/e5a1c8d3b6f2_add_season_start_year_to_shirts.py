@@ -0,0 +1,54 @@
+"""add indexed season_start_year to shirts
+
+Revision ID: e5a1c8d3b6f2
+Revises: c7e2a94f1d58
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a1c8d3b6f2'
+down_revision = 'c7e2a94f1d58'
+branch_labels = None
+depends_on = None
+
+
+# Frozen copy of app.utils.season_start_year as of this revision.
+SEASON_START_YEAR_REGEX = re.compile(r'((?:19|20)\d{2})')
+
+
+def season_start_year(value):
+    if value is None:
+        return None
+    match = SEASON_START_YEAR_REGEX.search(str(value))
+    return int(match.group(1)) if match else None
+
+
+def upgrade():
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('season_start_year', sa.Integer(), nullable=True))
+        batch_op.create_index(
+            'ix_shirts_season_start_year_created_at',
+            ['season_start_year', 'created_at', 'id'],
+            unique=False,
+        )
+
+    # Same parsing the dashboard applied per row at request time, run once per distinct season.
+    bind = op.get_bind()
+    shirts = sa.table('shirts', sa.column('stagione', sa.String), sa.column('season_start_year', sa.Integer))
+    values = bind.execute(sa.text("SELECT DISTINCT stagione FROM shirts WHERE stagione IS NOT NULL")).scalars().all()
+    for value in values:
+        year = season_start_year(value)
+        if year is not None:
+            bind.execute(shirts.update().where(shirts.c.stagione == value).values(season_start_year=year))
+
+
+def downgrade():
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.drop_index('ix_shirts_season_start_year_created_at')
+        batch_op.drop_column('season_start_year')
@@ -0,0 +1,37 @@
+"""add denormalized cover_image_id to shirts
+
+Revision ID: f2a8d5c1b7e9
+Revises: e4b7c2a9d1f3
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2a8d5c1b7e9'
+down_revision = 'e4b7c2a9d1f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cover_image_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_shirts_cover_image_id', 'shirt_images', ['cover_image_id'], ['id'], ondelete='SET NULL'
+        )
+
+    # Same choice the Shirt.cover_image property made per read: is_cover first, else the oldest image.
+    op.execute(
+        "UPDATE shirts SET cover_image_id = ("
+        "SELECT shirt_images.id FROM shirt_images WHERE shirt_images.shirt_id = shirts.id "
+        "ORDER BY shirt_images.is_cover DESC, shirt_images.id ASC LIMIT 1)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_shirts_cover_image_id', type_='foreignkey')
+        batch_op.drop_column('cover_image_id')
@@ -0,0 +1,77 @@
+"""replace season_start_year with a non-null, indexed season_sort
+
+Revision ID: f8b3d1e6a2c9
+Revises: e5a1c8d3b6f2
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8b3d1e6a2c9'
+down_revision = 'e5a1c8d3b6f2'
+branch_labels = None
+depends_on = None
+
+
+# Frozen copies of app.utils.season_start_year / season_sort_value as of this revision.
+SEASON_START_YEAR_REGEX = re.compile(r'((?:19|20)\d{2})')
+UNKNOWN_SEASON_YEAR = 9999
+
+
+def _season_start_year(value):
+    match = SEASON_START_YEAR_REGEX.search(str(value)) if value is not None else None
+    return int(match.group(1)) if match else None
+
+
+def _season_sort_value(value):
+    text = str(value).strip() if value is not None else ''
+    year = _season_start_year(text) if text else None
+    return f'{UNKNOWN_SEASON_YEAR if year is None else year:04d} {text.lower()}'
+
+
+def _distinct_seasons(bind):
+    return bind.execute(sa.text("SELECT DISTINCT stagione FROM shirts")).scalars().all()
+
+
+def upgrade():
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('season_sort', sa.String(length=32), nullable=True))
+
+    # One UPDATE per distinct season, as for season_start_year.
+    bind = op.get_bind()
+    shirts = sa.table('shirts', sa.column('stagione', sa.String), sa.column('season_sort', sa.String))
+    for value in _distinct_seasons(bind):
+        condition = shirts.c.stagione.is_(None) if value is None else shirts.c.stagione == value
+        bind.execute(shirts.update().where(condition).values(season_sort=_season_sort_value(value)))
+
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.alter_column('season_sort', existing_type=sa.String(length=32), nullable=False)
+        batch_op.create_index('ix_shirts_season_sort_created_at', ['season_sort', 'created_at', 'id'], unique=False)
+        batch_op.drop_index('ix_shirts_season_start_year_created_at')
+        batch_op.drop_column('season_start_year')
+
+
+def downgrade():
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('season_start_year', sa.Integer(), nullable=True))
+        batch_op.create_index(
+            'ix_shirts_season_start_year_created_at',
+            ['season_start_year', 'created_at', 'id'],
+            unique=False,
+        )
+
+    bind = op.get_bind()
+    shirts = sa.table('shirts', sa.column('stagione', sa.String), sa.column('season_start_year', sa.Integer))
+    for value in _distinct_seasons(bind):
+        year = _season_start_year(value)
+        if year is not None:
+            bind.execute(shirts.update().where(shirts.c.stagione == value).values(season_start_year=year))
+
+    with op.batch_alter_table('shirts', schema=None) as batch_op:
+        batch_op.drop_index('ix_shirts_season_sort_created_at')
+        batch_op.drop_column('season_sort')
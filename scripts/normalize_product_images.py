@@ -1,58 +1,266 @@
 #!/usr/bin/env python3
 import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
 import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
-from app.image_utils import PRODUCT_IMAGE_SIZE, normalize_product_image
+from app.image_store import INCOMING_DIRNAME, OBJECTS_DIRNAME
+from app.image_utils import (
+    DERIVATIVE_FORMATS,
+    DERIVATIVE_WIDTHS,
+    DERIVED_DIRNAME,
+    PRODUCT_IMAGE_SIZE,
+    generate_derivatives,
+    normalize_product_image,
+)
 
 
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp"}
+# Maps each image's path relative to the upload directory to the state it was last processed in.
+# Lives in the cache folder rather than uploads/, which is served publicly.
+DEFAULT_MANIFEST_PATH = PROJECT_ROOT / os.getenv("CACHE_FOLDER", "cache") / "normalize-manifest.json"
+# Anything that changes what a processed file looks like; a different value invalidates the manifest.
+PIPELINE_KEY = f"{PRODUCT_IMAGE_SIZE[0]}x{PRODUCT_IMAGE_SIZE[1]}:{','.join(map(str, DERIVATIVE_WIDTHS))}:{','.join(DERIVATIVE_FORMATS)}"
+HASH_CHUNK_SIZE = 1024 * 1024
 
 
-def iter_images(upload_dir):
+def iter_images(upload_dir, include_objects=True):
     for path in upload_dir.rglob("*"):
+        parts = path.relative_to(upload_dir).parts
+        if DERIVED_DIRNAME in parts[:-1]:
+            continue
+        # Raw uploads belong to the image worker; objects are named after their content and never rewritten.
+        if parts[0] == INCOMING_DIRNAME or (parts[0] == OBJECTS_DIRNAME and not include_objects):
+            continue
         if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS:
             yield path
 
 
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_state(path, normalized):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": file_digest(path), "normalized": normalized}
+
+
+def load_manifest(manifest_path, upload_dir):
+    try:
+        with open(manifest_path, encoding="utf-8") as handle:
+            manifest = json.load(handle)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if manifest.get("pipeline") != PIPELINE_KEY or manifest.get("upload_dir") != str(upload_dir):
+        return {}
+    return manifest.get("files", {})
+
+
+def save_manifest(manifest_path, upload_dir, files):
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = manifest_path.with_name(f"{manifest_path.name}.{os.getpid()}.tmp")
+    with open(temp_path, "w", encoding="utf-8") as handle:
+        json.dump({"pipeline": PIPELINE_KEY, "upload_dir": str(upload_dir), "files": files}, handle, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+
+def is_unchanged(path, entry, derivatives_only=False):
+    """True when the manifest entry still describes the file; hashes only when size or mtime moved."""
+    if entry is None:
+        return False
+    if not derivatives_only and not entry.get("normalized"):
+        # Only its derivatives were backfilled; the original itself was never checked.
+        return False
+    stat = os.stat(path)
+    if stat.st_size != entry["size"]:
+        return False
+    if stat.st_mtime_ns == entry["mtime_ns"]:
+        return True
+    # Touched or copied back without changing content, e.g. by a restore from backup.
+    return file_digest(path) == entry["sha256"]
+
+
+def process_image(path, derivatives_only=False):
+    """Runs in a pool process; returns (path, written, bytes read, new manifest entry, error)."""
+    try:
+        size = os.path.getsize(path)
+        if derivatives_only:
+            written = generate_derivatives(path)
+        else:
+            written = int(normalize_product_image(path))
+        return path, written, size, file_state(path, normalized=not derivatives_only), None
+    except Exception as exc:
+        return path, 0, 0, None, f"{type(exc).__name__}: {exc}"
+
+
+def run(upload_dir, manifest_path=None, workers=None, derivatives_only=False, use_manifest=True, verbose=True):
+    """Normalize (or backfill derivatives for) every image under upload_dir; returns throughput stats."""
+    started = time.perf_counter()
+    manifest_path = manifest_path or DEFAULT_MANIFEST_PATH
+    manifest = load_manifest(manifest_path, upload_dir) if use_manifest else {}
+    files = {}
+    pending = []
+    total = 0
+    for image_path in iter_images(upload_dir, include_objects=derivatives_only):
+        total += 1
+        key = image_path.relative_to(upload_dir).as_posix()
+        entry = manifest.get(key)
+        if is_unchanged(image_path, entry, derivatives_only):
+            files[key] = dict(entry, mtime_ns=os.stat(image_path).st_mtime_ns)
+        else:
+            pending.append(str(image_path))
+
+    changed = 0
+    failed = 0
+    bytes_read = 0
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(pending) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(process_image, pending, [derivatives_only] * len(pending), chunksize=chunksize)
+        for path, written, size, entry, error in results:
+            key = Path(path).relative_to(upload_dir).as_posix()
+            if error:
+                failed += 1
+                print(f"failed {path}: {error}")
+                continue
+            files[key] = entry
+            bytes_read += size
+            if written:
+                changed += 1
+                if verbose:
+                    action = f"wrote {written} derivative(s) for" if derivatives_only else "normalized"
+                    print(f"{action} {path}")
+
+    save_manifest(manifest_path, upload_dir, files)
+
+    elapsed = time.perf_counter() - started
+    return {
+        "total": total,
+        "processed": len(pending) - failed,
+        "skipped": total - len(pending),
+        "changed": changed,
+        "failed": failed,
+        "workers": workers,
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(len(pending) / elapsed, 2) if elapsed else 0.0,
+        "mb_per_second": round(bytes_read / 1_000_000 / elapsed, 2) if elapsed else 0.0,
+    }
+
+
+def print_stats(stats, action):
+    print(
+        f"{action} {stats['changed']}/{stats['total']} image(s); skipped {stats['skipped']} unchanged; "
+        f"failed {stats['failed']}"
+    )
+    print(
+        f"processed {stats['processed']} in {stats['seconds']:.2f}s with {stats['workers']} worker(s): "
+        f"{stats['images_per_second']:.1f} images/s, {stats['mb_per_second']:.1f} MB/s"
+    )
+
+
+def build_corpus(directory, count, seed=0):
+    """Write count synthetic camera-sized photos (mostly JPEG, some PNG) into directory."""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    sizes = [(3000, 4000), (4000, 3000), (2400, 3600), (1200, 1600), (1000, 1500)]
+    for index in range(count):
+        size = sizes[index % len(sizes)]
+        image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        for _ in range(40):
+            x, y = rng.randrange(size[0]), rng.randrange(size[1])
+            draw.rectangle((x, y, x + rng.randrange(50, 600), y + rng.randrange(50, 600)),
+                           fill=tuple(rng.randrange(256) for _ in range(3)))
+        shirt_dir = directory / f"shirt-{index // 4}"
+        shirt_dir.mkdir(exist_ok=True)
+        extension = ".png" if index % 5 == 4 else ".jpg"
+        image.save(shirt_dir / f"{index % 4 + 1}{extension}", quality=90)
+
+
+def benchmark(count, workers=None):
+    """Time a cold pass and a manifest-only warm pass over a fresh synthetic corpus."""
+    work_dir = Path(tempfile.mkdtemp(prefix="normalize-benchmark-"))
+    corpus_dir = work_dir / "uploads"
+    manifest_path = work_dir / "manifest.json"
+    try:
+        corpus_dir.mkdir()
+        build_corpus(corpus_dir, count)
+        cold = run(corpus_dir, manifest_path, workers=workers, verbose=False)
+        warm = run(corpus_dir, manifest_path, workers=workers, verbose=False)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return {"images": count, "pipeline": PIPELINE_KEY, "cold": cold, "warm": warm}
+
+
 def main():
     parser = argparse.ArgumentParser(
         description=f"Normalize product photos to {PRODUCT_IMAGE_SIZE[0]}x{PRODUCT_IMAGE_SIZE[1]}."
     )
     parser.add_argument("upload_dir", nargs="?", default="uploads", help="Upload directory to scan.")
     parser.add_argument("--dry-run", action="store_true", help="List images without changing them.")
+    parser.add_argument(
+        "--derivatives-only",
+        action="store_true",
+        help="Backfill missing resized/WebP/AVIF copies without touching the originals.",
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Parallel processes (default: one per CPU).")
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        default=DEFAULT_MANIFEST_PATH,
+        help="Where to record processed files (default: %(default)s).",
+    )
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and check every image.")
+    parser.add_argument(
+        "--benchmark",
+        type=int,
+        metavar="N",
+        help="Process N synthetic photos in a temporary directory and print the timings as JSON.",
+    )
     args = parser.parse_args()
 
+    if args.benchmark:
+        print(json.dumps(benchmark(args.benchmark, workers=args.workers), indent=2))
+        return
+
     upload_dir = Path(args.upload_dir).resolve()
     if not upload_dir.exists():
         raise SystemExit(f"Upload directory not found: {upload_dir}")
 
-    total = 0
-    changed = 0
-    failed = 0
-    for image_path in iter_images(upload_dir):
-        total += 1
-        if args.dry_run:
-            print(image_path)
-            continue
-        try:
-            if normalize_product_image(image_path):
-                changed += 1
-                print(f"normalized {image_path}")
-        except Exception as exc:
-            failed += 1
-            print(f"failed {image_path}: {exc}")
-
     if args.dry_run:
+        total = 0
+        for image_path in iter_images(upload_dir):
+            total += 1
+            print(image_path)
         print(f"found {total} image(s) in {upload_dir}")
-    else:
-        print(f"normalized {changed}/{total} image(s); failed {failed}")
-        if failed:
-            raise SystemExit(1)
+        return
+
+    stats = run(
+        upload_dir,
+        args.manifest.resolve(),
+        workers=args.workers,
+        derivatives_only=args.derivatives_only,
+        use_manifest=not args.full,
+    )
+    print_stats(stats, "backfilled" if args.derivatives_only else "normalized")
+    if stats["failed"]:
+        raise SystemExit(1)
 
 
 if __name__ == "__main__":
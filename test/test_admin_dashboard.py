@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+
+SEASONS = ['2001/2002', 'Vintage', '1995-96', '1995/1996', '2010', '', '1988/89', 'Retro 1999', '2001/2002']
+
+
+class AdminDashboardTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, db
+
+        self.Shirt = Shirt
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['logged_in'] = True
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def add_shirts(self, seasons):
+        created_at = datetime(2024, 1, 1)
+        with self.app.app_context():
+            for product_code, season in enumerate(seasons, start=1):
+                self.db.session.add(self.Shirt(
+                    product_code=product_code,
+                    brand='Nike',
+                    squadra='Ac Milan',
+                    campionato='Serie A',
+                    taglia='L',
+                    colore='Red',
+                    stagione=season,
+                    type='Shirt',
+                    status='active',
+                    created_at=created_at - timedelta(days=product_code),
+                ))
+            self.db.session.commit()
+
+    def test_season_sort_follows_stagione(self):
+        self.add_shirts(['1995/1996', 'Vintage'])
+        with self.app.app_context():
+            first, second = self.Shirt.query.order_by(self.Shirt.product_code).all()
+            self.assertEqual((first.season_sort, second.season_sort), ('1995 1995/1996', '9999 vintage'))
+            second.stagione = '2003-04'
+            self.db.session.commit()
+            self.assertEqual(self.db.session.get(self.Shirt, second.id).season_sort, '2003 2003-04')
+
+    def test_timeline_sorts_in_sql_like_season_sort_key(self):
+        from app.blueprints.admin import dashboard_order
+        from app.utils import season_sort_key
+
+        self.add_shirts(SEASONS)
+        with self.app.app_context():
+            shirts = self.Shirt.query.all()
+            expected = sorted(shirts, key=lambda shirt: (season_sort_key(shirt.stagione), shirt.created_at))
+            for sort, reverse in (('chronological', False), ('reverse_chronological', True)):
+                ordered = self.Shirt.query.order_by(*dashboard_order(sort)).all()
+                self.assertEqual(
+                    [shirt.product_code for shirt in ordered],
+                    [shirt.product_code for shirt in (expected[::-1] if reverse else expected)],
+                )
+
+    def test_dashboard_renders_one_page_at_a_time(self):
+        from app.blueprints import admin
+
+        self.add_shirts(SEASONS)
+        original_page_size = admin.DASHBOARD_PAGE_SIZE
+        admin.DASHBOARD_PAGE_SIZE = 4
+        try:
+            first = self.client.get('/admin/dashboard?sort=newest&brand=Nike').get_data(as_text=True)
+            last = self.client.get('/admin/dashboard?sort=newest&brand=Nike&page=3').get_data(as_text=True)
+        finally:
+            admin.DASHBOARD_PAGE_SIZE = original_page_size
+
+        self.assertIn(f'Managing {len(SEASONS)} archived masterpieces', first)
+        self.assertIn('Page 1 / 3', first)
+        self.assertIn('/admin/dashboard?sort=newest&amp;brand=Nike&amp;page=2', first)
+        self.assertEqual(first.count('/admin/delete/'), 4)
+        self.assertEqual(last.count('/admin/delete/'), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
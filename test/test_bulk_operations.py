@@ -0,0 +1,191 @@
+import os
+import tempfile
+import unittest
+from decimal import Decimal
+
+from PIL import Image
+from sqlalchemy import event, func
+
+
+class BulkOperationsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, ShirtImage, db
+
+        self.Shirt = Shirt
+        self.ShirtImage = ShirtImage
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+            for product_code in range(1, 7):
+                self.db.session.add(Shirt(
+                    product_code=product_code,
+                    brand='Nike' if product_code % 2 else 'Adidas',
+                    squadra='Ac Milan',
+                    campionato='Serie A',
+                    taglia='L',
+                    colore='Red',
+                    stagione='1995/1996',
+                    type='Shirt',
+                    status='active',
+                    prezzo_pagato=10.1 * product_code,
+                    internal_price=Decimal('30.05'),
+                ))
+            self.db.session.commit()
+            self.shirt_ids = [shirt.id for shirt in Shirt.query.order_by(Shirt.id)]
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['logged_in'] = True
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def bulk(self, ids, *operations):
+        return self.client.post('/admin/bulk', json={'ids': ids, 'operations': list(operations)})
+
+    def assert_summary_matches_shirts(self, payload):
+        from app.inventory_summary import compute_inventory_summary, reconcile_inventory_summary
+
+        with self.app.app_context():
+            self.assertEqual(reconcile_inventory_summary(fix=False), {})
+            expected = compute_inventory_summary()
+        self.assertEqual(payload['summary_total_spent'], str(expected['total_spent']))
+        self.assertEqual(payload['summary_sold_total_gain'], str(expected['sold_total_gain']))
+
+    def test_marking_shirts_sold_is_one_update(self):
+        from app.catalog_cache import catalog_version
+
+        with self.app.app_context():
+            already_sold = self.db.session.get(self.Shirt, self.shirt_ids[0])
+            already_sold.sold = True
+            self.db.session.commit()
+            version = catalog_version()
+            stamps = dict(self.db.session.query(self.Shirt.id, self.Shirt.updated_at))
+
+            updates = []
+
+            def record(conn, cursor, statement, parameters, context, executemany):
+                if statement.startswith('UPDATE shirts'):
+                    updates.append(statement)
+
+            event.listen(self.db.engine, 'before_cursor_execute', record)
+            try:
+                response = self.bulk(self.shirt_ids[:4] + [9999], {'op': 'sold', 'value': True})
+            finally:
+                event.remove(self.db.engine, 'before_cursor_execute', record)
+
+        payload = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(payload['changed'], self.shirt_ids[1:4])
+        self.assertEqual(payload['missing'], [9999])
+        self.assertEqual(len(updates), 1)
+        self.assert_summary_matches_shirts(payload)
+
+        with self.app.app_context():
+            self.assertNotEqual(catalog_version(), version)
+            rows = {row.id: row for row in self.Shirt.query}
+            self.assertEqual({shirt_id for shirt_id, row in rows.items() if row.sold}, set(self.shirt_ids[:4]))
+            self.assertEqual(rows[self.shirt_ids[0]].updated_at, stamps[self.shirt_ids[0]])
+            self.assertGreater(rows[self.shirt_ids[1]].updated_at, stamps[self.shirt_ids[1]])
+            self.assertEqual(rows[self.shirt_ids[5]].updated_at, stamps[self.shirt_ids[5]])
+
+    def test_status_and_pricing_reach_the_summary_and_catalog(self):
+        from app.facet_index import get_facet_index
+
+        with self.app.app_context():
+            self.assertEqual(get_facet_index().count(get_facet_index().match({'brand': ['Nike']})), 3)
+
+        response = self.bulk(
+            self.shirt_ids[:2],
+            {'op': 'pricing', 'price_paid': '12.35', 'selling_price': ''},
+            {'op': 'status', 'value': 'draft'},
+        )
+        payload = response.get_json()
+        self.assertTrue(payload['ok'])
+        self.assert_summary_matches_shirts(payload)
+
+        with self.app.app_context():
+            first = self.db.session.get(self.Shirt, self.shirt_ids[0])
+            self.assertEqual((first.status, first.prezzo_pagato, first.internal_price), ('draft', 12.35, None))
+            index = get_facet_index()
+            self.assertEqual(index.count(index.match({'brand': ['Nike']})), 2)
+            self.assertEqual(index.count(index.match({})), 4)
+
+    def test_delete_removes_dependent_rows_and_releases_files_after_commit(self):
+        from app.image_store import store_object
+        from app.models import ShirtSearchDocument, ShirtShuffleRank, TranslationJob
+        from app.search import search_match_scores
+        from app.shuffle import ensure_shuffle_pool
+
+        source = os.path.join(self.upload_dir, 'incoming', 'a.jpg')
+        os.makedirs(os.path.dirname(source))
+        Image.new('RGB', (100, 150), (200, 30, 30)).save(source)
+        shared = store_object(source, self.upload_dir)
+        doomed, survivor = self.shirt_ids[0], self.shirt_ids[1]
+        with self.app.app_context():
+            for shirt_id in (doomed, survivor):
+                self.db.session.add(self.ShirtImage(shirt_id=shirt_id, file_path=shared, is_cover=True))
+            self.db.session.add(self.ShirtImage(shirt_id=self.shirt_ids[2], file_path='objects/ab/gone.jpg'))
+            self.db.session.add(TranslationJob(shirt_id=doomed, source_text='Home shirt'))
+            self.db.session.commit()
+            ensure_shuffle_pool()
+        gone = os.path.join(self.upload_dir, 'objects', 'ab', 'gone.jpg')
+        os.makedirs(os.path.dirname(gone), exist_ok=True)
+        Image.new('RGB', (100, 150)).save(gone)
+
+        response = self.bulk([doomed, self.shirt_ids[2]], {'op': 'delete'})
+        payload = response.get_json()
+        self.assertEqual(payload['deleted'], [doomed, self.shirt_ids[2]])
+        self.assert_summary_matches_shirts(payload)
+
+        with self.app.app_context():
+            deleted = [doomed, self.shirt_ids[2]]
+            self.assertEqual(self.Shirt.query.filter(self.Shirt.id.in_(deleted)).count(), 0)
+            for model in (self.ShirtImage, ShirtSearchDocument, ShirtShuffleRank, TranslationJob):
+                self.assertEqual(model.query.filter(model.shirt_id.in_(deleted)).count(), 0)
+            self.assertGreater(ShirtShuffleRank.query.count(), 0)
+            matches = search_match_scores('Milan')
+            found = self.db.session.query(func.count()).select_from(matches).scalar()
+            self.assertEqual(found, 4)
+
+        # The object still used by the surviving shirt stays; the unshared one is gone.
+        self.assertTrue(os.path.isfile(os.path.join(self.upload_dir, shared)))
+        self.assertFalse(os.path.exists(gone))
+
+    def test_invalid_requests_change_nothing(self):
+        bad_requests = [
+            {'ids': [], 'operations': [{'op': 'sold', 'value': True}]},
+            {'ids': ['1'], 'operations': [{'op': 'sold', 'value': True}]},
+            {'ids': self.shirt_ids, 'operations': [{'op': 'sold', 'value': 'yes'}]},
+            {'ids': self.shirt_ids, 'operations': [{'op': 'status', 'value': 'deleted'}]},
+            {'ids': self.shirt_ids, 'operations': [{'op': 'pricing', 'price_paid': 'ten'}]},
+            {'ids': self.shirt_ids, 'operations': [{'op': 'sold', 'value': True}, {'op': 'archive'}]},
+        ]
+        for body in bad_requests:
+            response = self.client.post('/admin/bulk', json=body)
+            self.assertEqual(response.status_code, 400, body)
+            self.assertFalse(response.get_json()['ok'])
+        with self.app.app_context():
+            self.assertEqual(self.Shirt.query.filter(self.Shirt.sold.is_(True)).count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
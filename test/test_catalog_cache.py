@@ -0,0 +1,118 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import event
+
+
+class CatalogFacetCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, db
+
+        self.Shirt = Shirt
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+            self.db.session.add_all([
+                self.make_product(1, 'Ac Milan', 'Serie A', 'Lotto'),
+                self.make_product(2, 'Inter Milan', 'Serie A', 'Nike'),
+                self.make_product(3, 'Juventus', 'Serie A', 'Kappa', status='draft'),
+            ])
+            self.db.session.commit()
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def make_product(self, product_code, squadra, campionato, brand, status='active'):
+        return self.Shirt(
+            product_code=product_code,
+            brand=brand,
+            squadra=squadra,
+            campionato=campionato,
+            taglia='L',
+            colore='Red',
+            stagione='1995/1996',
+            type='Shirt',
+            status=status,
+        )
+
+    def count_queries(self, path):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = self.db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            response = self.client.get(path)
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        self.assertEqual(response.status_code, 200)
+        return response, statements
+
+    def test_facets_are_built_once_and_exclude_drafts(self):
+        from app.catalog_cache import cache_stats, get_catalog_facets
+
+        with self.app.test_request_context():
+            facets = get_catalog_facets('en')
+            misses = cache_stats()['misses']
+            self.assertEqual(get_catalog_facets('it')['brands'], facets['brands'])
+            self.assertEqual(cache_stats()['misses'], misses)
+
+        self.assertEqual(facets['brands'], ['Lotto', 'Nike'])
+        self.assertEqual([team['value'] for team in facets['squadre']], ['Ac Milan', 'Inter Milan'])
+
+    def test_catalog_skips_facet_queries_when_warm(self):
+        self.client.get('/catalogue')
+        _, statements = self.count_queries('/catalogue')
+
+        self.assertFalse([s for s in statements if 'DISTINCT' in s.upper()])
+
+    def test_shirt_write_invalidates_facets(self):
+        from app.catalog_cache import get_catalog_facets, get_form_facets
+
+        with self.app.test_request_context():
+            self.assertNotIn('Umbro', get_catalog_facets('en')['brands'])
+            self.db.session.add(self.make_product(4, 'Ac Milan', 'Serie A', 'Umbro'))
+            self.db.session.commit()
+            self.assertIn('Umbro', get_catalog_facets('en')['brands'])
+            self.assertIn('Kappa', get_form_facets()[0])
+
+    def test_new_processes_keep_the_shared_version(self):
+        from app import create_app
+        from app.catalog_cache import catalog_version
+
+        with self.app.app_context():
+            version = catalog_version()
+        # Another worker boot or a CLI command on the same deploy.
+        other = create_app()
+        with other.app_context():
+            self.assertEqual(catalog_version(), version)
+            other.extensions['catalog_deploy_stamp'] = 'redeployed'
+            self.assertNotEqual(catalog_version(), version)
+
+
+if __name__ == '__main__':
+    unittest.main()
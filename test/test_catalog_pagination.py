@@ -0,0 +1,162 @@
+import os
+import re
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from html import unescape
+from urllib.parse import parse_qs, urlparse
+
+
+class CatalogKeysetPaginationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+
+        from app import create_app
+        from app.models import Shirt, db
+
+        self.Shirt = Shirt
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        start = datetime(2024, 1, 1)
+        with self.app.app_context():
+            self.db.create_all()
+            self.db.session.add_all([
+                Shirt(
+                    product_code=index + 1,
+                    brand='Nike',
+                    squadra=f'Team {index}',
+                    campionato='Serie A',
+                    taglia='L',
+                    colore='Red',
+                    stagione='1995/1996',
+                    type='Shirt',
+                    status='active',
+                    # Pairs of equal timestamps exercise the id tiebreak.
+                    created_at=start + timedelta(days=index // 2),
+                )
+                for index in range(30)
+            ])
+            self.db.session.commit()
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+
+    def fetch(self, query_string):
+        response = self.client.get('/catalogue', query_string=query_string)
+        self.assertEqual(response.status_code, 200)
+        html = unescape(response.get_data(as_text=True))
+        ids = [int(value) for value in re.findall(r'href="/shirt/(\d+)-', html)]
+        match = re.search(r'href="([^"]*after=[^"]*)" rel="next"', html)
+        after = parse_qs(urlparse(match.group(1)).query)['after'][0] if match else None
+        return ids, after, html
+
+    def walk_pages(self, query_string):
+        ids = []
+        for page in (1, 2):
+            page_ids, _, _ = self.fetch(dict(query_string, page=page))
+            ids.extend(page_ids)
+        return ids
+
+    def walk_cursor(self, query_string):
+        ids = []
+        after = 'start'
+        while after:
+            page_ids, after, _ = self.fetch(dict(query_string, after=after))
+            ids.extend(page_ids)
+        return ids
+
+    def test_cursor_walk_matches_offset_pages(self):
+        for query_string in ({'sort': 'newest'}, {'sort': 'oldest'}, {'sort': 'random', 'seed': 12345}):
+            with self.subTest(**query_string):
+                expected = self.walk_pages(query_string)
+                self.assertEqual(len(expected), 30)
+                self.assertEqual(self.walk_cursor(query_string), expected)
+
+    def walk_api(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            payload = response.get_json()
+            self.assertEqual(payload['total'], 30)
+            ids.extend(item['id'] for item in payload['items'])
+            url = payload['next']
+        return ids
+
+    def test_api_pages_match_catalog_pages(self):
+        for query_string in ({'sort': 'newest'}, {'sort': 'random', 'seed': 12345}):
+            with self.subTest(**query_string):
+                expected = self.walk_pages(query_string)
+                response = self.client.get('/api/v1/catalog', query_string=query_string)
+                item = response.get_json()['items'][0]
+                self.assertEqual(set(item), {'id', 'name', 'slug', 'url', 'cover_url', 'sold'})
+                self.assertEqual(item['url'], f"/shirt/{item['id']}-{item['slug']}")
+                self.assertEqual(self.walk_api(response.request.url), expected)
+
+    def test_load_more_continues_after_first_catalog_page(self):
+        first_ids, _, html = self.fetch({'sort': 'oldest'})
+        load_more = re.search(r'data-api-url="([^"]+)"', html).group(1)
+
+        self.assertEqual(first_ids + self.walk_api(load_more), self.walk_pages({'sort': 'oldest'}))
+
+    def test_cursor_for_another_sort_restarts_from_first_page(self):
+        _, after, _ = self.fetch({'sort': 'newest', 'after': 'start'})
+        first_oldest, _, _ = self.fetch({'sort': 'oldest'})
+
+        ids, _, _ = self.fetch({'sort': 'oldest', 'after': after})
+        self.assertEqual(ids, first_oldest)
+
+    def test_api_rejects_cursors_it_cannot_continue(self):
+        next_url = self.client.get('/api/v1/catalog', query_string={'sort': 'newest'}).get_json()['next']
+        after = parse_qs(urlparse(next_url).query)['after'][0]
+        self.assertEqual(self.client.get(next_url).status_code, 200)
+
+        for query_string in (
+            {'sort': 'newest', 'after': 'start'},
+            {'sort': 'newest', 'after': after[:-2] + ('AA' if after[-2:] != 'AA' else 'BB')},
+            {'sort': 'oldest', 'after': after},
+            {'sort': 'random', 'seed': 12345, 'after': after},
+        ):
+            with self.subTest(**query_string):
+                response = self.client.get('/api/v1/catalog', query_string=query_string)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.get_json())
+
+    def test_cursor_walk_reaches_legacy_rows(self):
+        from sqlalchemy import text
+        from sqlalchemy.exc import IntegrityError
+
+        with self.app.app_context():
+            # Legacy rows carry the backfilled timestamp; NULL, which no seek predicate passes, is refused.
+            self.db.session.execute(text("UPDATE shirts SET created_at = '1970-01-01 00:00:00' WHERE id IN (3, 17)"))
+            self.db.session.commit()
+            with self.assertRaises(IntegrityError):
+                self.db.session.execute(text('UPDATE shirts SET created_at = NULL WHERE id = 5'))
+            self.db.session.rollback()
+
+        for sort in ('newest', 'oldest'):
+            with self.subTest(sort=sort):
+                ids = self.walk_cursor({'sort': sort})
+                self.assertEqual(sorted(ids), list(range(1, 31)))
+                self.assertEqual(ids, self.walk_pages({'sort': sort}))
+
+    def test_total_is_reported_in_cursor_mode(self):
+        _, _, html = self.fetch({'sort': 'newest', 'after': 'start'})
+        self.assertIn('30 items discovered', ' '.join(html.split()))
+
+
+if __name__ == '__main__':
+    unittest.main()
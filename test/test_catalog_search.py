@@ -0,0 +1,99 @@
+import os
+import re
+import tempfile
+import unittest
+
+
+class CatalogSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+
+        from app import create_app
+        from app.models import Shirt, db
+
+        self.Shirt = Shirt
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+            products = [
+                self.make_product(1, 'Italy', 'National Teams', 'Puma', nazionale=True),
+                self.make_product(2, 'England', 'National Teams', 'Umbro', nazionale=True),
+                self.make_product(3, 'Ac Milan', 'Serie A', 'Lotto', descrizione='Classic home shirt worn by Baresi.'),
+            ]
+            self.db.session.add_all(products)
+            self.db.session.commit()
+            self.ids = [product.id for product in products]
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+
+    def make_product(self, product_code, squadra, campionato, brand, descrizione='', nazionale=False):
+        return self.Shirt(
+            product_code=product_code,
+            brand=brand,
+            squadra=squadra,
+            campionato=campionato,
+            taglia='L',
+            colore='Blue',
+            stagione='1990/1991',
+            type='Shirt',
+            descrizione=descrizione,
+            status='active',
+            nazionale=nazionale,
+        )
+
+    def search_ids(self, q):
+        response = self.client.get('/catalogue', query_string={'q': q})
+        self.assertEqual(response.status_code, 200)
+        return {int(value) for value in re.findall(r'href="/shirt/(\d+)-', response.get_data(as_text=True))}
+
+    def test_italian_labels_and_team_aliases_are_searchable(self):
+        italy_id, england_id, milan_id = self.ids
+
+        self.assertEqual(self.search_ids('Maglia Italia'), {italy_id})
+        self.assertEqual(self.search_ids('Inghilterra'), {england_id})
+        self.assertEqual(self.search_ids('baresi'), {milan_id})
+        self.assertEqual(self.search_ids('blu'), set(self.ids))
+
+    def test_index_follows_shirt_writes(self):
+        italy_id, _, milan_id = self.ids
+
+        with self.app.app_context():
+            shirt = self.db.session.get(self.Shirt, milan_id)
+            shirt.squadra = 'Sampdoria'
+            self.db.session.delete(self.db.session.get(self.Shirt, italy_id))
+            self.db.session.commit()
+
+        self.assertEqual(self.search_ids('Sampdoria'), {milan_id})
+        self.assertEqual(self.search_ids('Milan'), set())
+        self.assertEqual(self.search_ids('Italia'), set())
+
+    def test_admin_search_matches_product_code_and_text(self):
+        with self.client.session_transaction() as session:
+            session['logged_in'] = True
+
+        def dashboard_ids(q):
+            response = self.client.get('/admin/dashboard', query_string={'q': q})
+            self.assertEqual(response.status_code, 200)
+            return {int(value) for value in re.findall(r'/admin/edit/(\d+)"', response.get_data(as_text=True))}
+
+        self.assertEqual(dashboard_ids('Inghilterra'), {self.ids[1]})
+        self.assertEqual(dashboard_ids('3'), {self.ids[2]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import re
+import tempfile
+import unittest
+from datetime import date
+
+
+class CatalogShufflePoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+
+        from app import create_app
+        from app.models import Shirt, db
+
+        self.Shirt = Shirt
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+            self.db.session.add_all([self.make_product(index + 1) for index in range(12)])
+            self.db.session.commit()
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+
+    def make_product(self, product_code):
+        return self.Shirt(
+            product_code=product_code,
+            brand='Nike',
+            squadra=f'Team {product_code}',
+            campionato='Serie A',
+            taglia='L',
+            colore='Red',
+            stagione='1995/1996',
+            type='Shirt',
+            status='active',
+        )
+
+    def catalog_ids(self, **query_string):
+        response = self.client.get('/catalogue', query_string=query_string)
+        self.assertEqual(response.status_code, 200)
+        html = response.get_data(as_text=True)
+        seed = re.search(r'name="seed" value="(\d+)"', html)
+        return [int(value) for value in re.findall(r'href="/shirt/(\d+)-', html)], int(seed.group(1))
+
+    def test_visitors_without_seed_get_a_pooled_seed(self):
+        from app.shuffle import pool_seeds, shuffle_rank
+
+        ids, seed = self.catalog_ids()
+
+        self.assertIn(seed, pool_seeds(date.today()))
+        self.assertEqual(ids, sorted(ids, key=lambda shirt_id: (shuffle_rank(shirt_id, seed), shirt_id)))
+        self.assertEqual(self.catalog_ids(seed=seed)[0], ids)
+
+    def test_new_and_deleted_shirts_keep_stored_ranks_in_sync(self):
+        from app.models import ShirtShuffleRank
+
+        _, seed = self.catalog_ids()
+        with self.app.app_context():
+            self.db.session.add(self.make_product(99))
+            self.db.session.delete(self.db.session.get(self.Shirt, 1))
+            self.db.session.commit()
+            stored_ids = {
+                rank.shirt_id for rank in ShirtShuffleRank.query.filter_by(seed=seed)
+            }
+            shirt_ids = {shirt.id for shirt in self.Shirt.query}
+
+        self.assertEqual(stored_ids, shirt_ids)
+        self.assertEqual(set(self.catalog_ids(seed=seed)[0]), shirt_ids)
+
+    def test_pool_is_filled_outside_the_request_session(self):
+        from sqlalchemy import event
+
+        from app.models import ShirtShuffleRank
+        from app.shuffle import apply_shuffle_order, pool_seeds
+
+        commits = []
+
+        def record(session):
+            commits.append(session)
+
+        event.listen(self.db.session, 'before_commit', record)
+        try:
+            with self.app.test_request_context('/catalogue'):
+                # Whatever the request has pending must not be committed by the pool fill.
+                self.db.session.add(self.make_product(500))
+                query, _ = apply_shuffle_order(self.Shirt.query, pool_seeds(date.today())[0])
+                # The pending shirt is flushed into the request's own transaction only.
+                self.assertEqual(len(query.all()), 13)
+                self.db.session.rollback()
+        finally:
+            event.remove(self.db.session, 'before_commit', record)
+
+        self.assertEqual(commits, [])
+        with self.app.app_context():
+            self.assertEqual(self.Shirt.query.filter_by(product_code=500).count(), 0)
+            stored = {seed for (seed,) in self.db.session.query(ShirtShuffleRank.seed).distinct()}
+        self.assertTrue(stored.issuperset(pool_seeds(date.today())))
+
+    def test_cli_fills_the_pool_and_drops_old_seeds(self):
+        from datetime import timedelta
+
+        from app.models import ShirtShuffleRank
+        from app.shuffle import fill_shuffle_pool, pool_seeds
+
+        with self.app.app_context():
+            fill_shuffle_pool(date.today() - timedelta(days=3))
+        result = self.app.test_cli_runner().invoke(args=['shuffle-pool'])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+        with self.app.app_context():
+            stored = {seed for (seed,) in self.db.session.query(ShirtShuffleRank.seed).distinct()}
+            self.assertEqual(ShirtShuffleRank.query.count(), len(stored) * 12)
+        self.assertEqual(stored, set(pool_seeds(date.today())))
+
+    def test_unpooled_seed_still_orders_by_computed_rank(self):
+        from app.shuffle import shuffle_rank
+
+        ids, seed = self.catalog_ids(seed=424242)
+
+        self.assertEqual(seed, 424242)
+        self.assertEqual(ids, sorted(ids, key=lambda shirt_id: (shuffle_rank(shirt_id, seed), shirt_id)))
+
+
+if __name__ == '__main__':
+    unittest.main()
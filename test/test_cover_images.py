@@ -0,0 +1,115 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import event
+
+
+class CoverImagePointerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, ShirtImage, db
+
+        self.Shirt = Shirt
+        self.ShirtImage = ShirtImage
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['logged_in'] = True
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def add_shirt(self, product_code, cover_index=0, image_count=2):
+        shirt = self.Shirt(
+            product_code=product_code,
+            brand='Nike',
+            squadra=f'Team {product_code}',
+            campionato='Serie A',
+            taglia='L',
+            colore='Red',
+            stagione='1995/1996',
+            type='Shirt',
+            status='active',
+        )
+        shirt.images = [
+            self.ShirtImage(file_path=f'{product_code}/{index + 1}.jpg', is_cover=(index == cover_index))
+            for index in range(image_count)
+        ]
+        self.db.session.add(shirt)
+        self.db.session.commit()
+        return shirt
+
+    def test_pointer_follows_image_writes(self):
+        with self.app.app_context():
+            shirt = self.add_shirt(1, cover_index=1, image_count=3)
+            first, cover, third = sorted(shirt.images, key=lambda image: image.id)
+            self.assertEqual(shirt.cover_image.id, cover.id)
+
+            self.db.session.delete(cover)
+            self.db.session.commit()
+            # No flagged image left: fall back to the oldest one.
+            self.assertEqual(shirt.cover_image.id, first.id)
+
+            third.is_cover = True
+            self.db.session.commit()
+            self.assertEqual(shirt.cover_image_id, third.id)
+
+            self.db.session.delete(first)
+            self.db.session.delete(third)
+            self.db.session.commit()
+            self.assertIsNone(shirt.cover_image)
+
+    def count_dashboard_queries(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            engine = self.db.engine
+            event.listen(engine, 'before_cursor_execute', record)
+            try:
+                response = self.client.get('/admin/dashboard')
+            finally:
+                event.remove(engine, 'before_cursor_execute', record)
+        self.assertEqual(response.status_code, 200)
+        return len([statement for statement in statements if 'shirt_images' in statement])
+
+    def test_dashboard_cover_queries_do_not_grow_with_rows(self):
+        with self.app.app_context():
+            for product_code in range(1, 4):
+                self.add_shirt(product_code)
+        few = self.count_dashboard_queries()
+
+        with self.app.app_context():
+            for product_code in range(4, 13):
+                self.add_shirt(product_code)
+        many = self.count_dashboard_queries()
+
+        self.assertEqual(few, many)
+        self.assertLessEqual(many, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import event, func
+
+
+ROWS = [
+    ('Nike', 'Serie A', 'Red', '1995/1996', 'Shirt', 'Ac Milan', 'L', 'active', False),
+    ('Nike', 'Serie A', 'Red', '1995/1996', 'Shirt', 'Ac Milan', 'M', 'active', True),
+    ('Adidas', 'Serie A', 'Black', '2001/2002', 'None', 'Juventus', 'L', 'draft', False),
+    ('Adidas', 'Premier League', 'Blue', '2001/2002', '', 'Chelsea', 'XL', 'active', False),
+    ('Kappa', 'Serie B', 'Red', '1988/89', 'Jacket', 'Ac Milan', 'L', 'draft', True),
+]
+
+
+class DashboardFacetsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, db
+
+        self.Shirt = Shirt
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+            for product_code, row in enumerate(ROWS, start=1):
+                brand, league, color, season, shirt_type, team, size, status, sold = row
+                self.db.session.add(Shirt(
+                    product_code=product_code, brand=brand, campionato=league, colore=color,
+                    stagione=season, type=shirt_type, squadra=team, taglia=size, status=status, sold=sold,
+                ))
+            self.db.session.commit()
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['logged_in'] = True
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def reference_counts(self, query):
+        """One GROUP BY per counter, as the dashboard ran them before."""
+        from app.dashboard_facets import DASHBOARD_FACET_COLUMNS
+
+        counts = {}
+        for name, field in DASHBOARD_FACET_COLUMNS.items():
+            column = getattr(self.Shirt, field)
+            conditions = [column.isnot(None), column != '']
+            if name == 'type':
+                conditions.append(func.lower(column) != 'none')
+            counts[name] = dict(
+                query.with_entities(column, func.count(self.Shirt.id)).filter(*conditions).group_by(column).all()
+            )
+        return counts
+
+    def test_both_engines_match_per_column_group_bys(self):
+        from app.dashboard_facets import _grouped_counts, _union_all_counts
+
+        with self.app.app_context():
+            queries = [
+                self.Shirt.query,
+                self.Shirt.query.filter(self.Shirt.status == 'active'),
+                self.Shirt.query.filter(self.Shirt.status == 'draft', self.Shirt.sold.is_(True)),
+                self.Shirt.query.filter(self.Shirt.status == 'missing'),
+            ]
+            for query in queries:
+                expected = self.reference_counts(query)
+                self.assertEqual(_union_all_counts(query), expected)
+                self.assertEqual(_grouped_counts(query), expected)
+
+            self.assertEqual(expected['brand'], {})
+            self.assertEqual(_union_all_counts(self.Shirt.query)['type'], {'Shirt': 2, 'Jacket': 1})
+
+    def test_counts_are_cached_per_filter_until_the_next_write(self):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if 'GROUP BY' in statement:
+                statements.append(statement)
+
+        before = self.client.get('/admin/cache_stats').get_json()['dashboard_facets']
+        with self.app.app_context():
+            engine = self.db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            self.assertEqual(self.client.get('/admin/dashboard?status_filter=active').status_code, 200)
+            self.assertEqual(len(statements), 1)
+            self.assertIn('UNION ALL', statements[0])
+
+            self.client.get('/admin/dashboard?status_filter=active&brand=Nike')
+            self.assertEqual(len(statements), 1)
+            self.client.get('/admin/dashboard?status_filter=draft')
+            self.assertEqual(len(statements), 2)
+
+            with self.app.app_context():
+                self.db.session.get(self.Shirt, 1).brand = 'Umbro'
+                self.db.session.commit()
+            page = self.client.get('/admin/dashboard?status_filter=active').get_data(as_text=True)
+            self.assertEqual(len(statements), 3)
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+        self.assertIn('Umbro (1)', page)
+
+        after = self.client.get('/admin/cache_stats').get_json()['dashboard_facets']
+        self.assertEqual((after['hits'] - before['hits'], after['misses'] - before['misses']), (1, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+import os
+import tempfile
+import unittest
+
+
+class FacetIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, db
+
+        self.Shirt = Shirt
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+            self.db.session.add_all([
+                self.make_product(1, 'Ac Milan', 'Lotto', 'L'),
+                self.make_product(2, 'Ac Milan', 'Adidas', 'M'),
+                self.make_product(3, 'Inter Milan', 'Nike', 'L'),
+                self.make_product(4, 'Juventus', 'Kappa', 'L', status='draft'),
+            ])
+            self.db.session.commit()
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def make_product(self, product_code, squadra, brand, taglia, status='active'):
+        return self.Shirt(
+            product_code=product_code,
+            brand=brand,
+            squadra=squadra,
+            campionato='Serie A',
+            taglia=taglia,
+            colore='Red',
+            stagione='1995/1996',
+            type='Shirt',
+            maniche='Long Sleeve',
+            status=status,
+        )
+
+    def test_counts_are_conditioned_on_other_selected_fields(self):
+        from app.facet_index import get_facet_index
+
+        with self.app.test_request_context():
+            index = get_facet_index()
+            selection = {'squadra': ['Ac Milan'], 'taglia': ['L']}
+            counts = index.facet_counts(selection)
+
+            self.assertEqual(index.count(index.match(selection)), 1)
+            self.assertEqual(counts['taglia'], {'L': 1, 'M': 1})
+            self.assertEqual(counts['squadra'], {'Ac Milan': 1, 'Inter Milan': 1})
+            self.assertEqual(counts['brand'], {'Lotto': 1})
+            self.assertNotIn('Juventus', index.facet_counts({})['squadra'])
+
+    def test_sleeve_groups_expand_to_stored_values(self):
+        response = self.client.get('/catalogue', query_string={'maniche': 'long'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_data(as_text=True).count('href="/shirt/'), 3)
+
+    def test_sleeve_groups_match_free_form_spellings(self):
+        with self.app.app_context():
+            self.db.session.get(self.Shirt, 1).maniche = 'L/S player'
+            self.db.session.get(self.Shirt, 2).maniche = 'Short sleeves (match worn)'
+            self.db.session.commit()
+
+        for maniche, expected in (('long', 2), ('L/S', 2), ('short', 1), ('Maniche corte', 1)):
+            with self.subTest(maniche=maniche):
+                response = self.client.get('/catalogue', query_string={'maniche': maniche})
+                self.assertEqual(response.get_data(as_text=True).count('href="/shirt/'), expected)
+
+    def test_sleeve_group_follows_maniche_writes(self):
+        with self.app.app_context():
+            shirt = self.db.session.get(self.Shirt, 1)
+            self.assertEqual(shirt.sleeve_group, 'long')
+            shirt.maniche = 'Maniche corte'
+            self.db.session.commit()
+
+        response = self.client.get('/catalogue', query_string={'maniche': 'S/S'})
+        self.assertEqual(response.get_data(as_text=True).count('href="/shirt/'), 1)
+
+    def test_commit_patches_the_shared_snapshot(self):
+        from app.catalog_cache import catalog_version
+        from app.facet_index import _read_snapshot, get_facet_index
+
+        with self.app.test_request_context():
+            get_facet_index()
+            shirt = self.db.session.get(self.Shirt, 4)
+            shirt.status = 'active'
+            self.db.session.delete(self.db.session.get(self.Shirt, 3))
+            self.db.session.commit()
+
+            snapshot = _read_snapshot()
+            self.assertEqual(snapshot.version, catalog_version())
+            self.assertEqual(sorted(snapshot.shirt_ids(snapshot.live)), [1, 2, 4])
+            self.assertEqual(snapshot.facet_counts({})['brand'], {'Lotto': 1, 'Adidas': 1, 'Kappa': 1})
+            self.assertIs(get_facet_index(), get_facet_index())
+
+    def test_interleaved_commits_keep_both_changes(self):
+        import threading
+        from unittest import mock
+
+        from app import catalog_cache, facet_index
+        from app.catalog_cache import catalog_changed
+
+        with self.app.app_context():
+            facet_index.get_facet_index()
+
+        # Both commits land together, and each waits for the other after reading the version it
+        # replaces and again before patching the snapshot, so that nothing but the version swap
+        # itself keeps them apart. A serialised swap just lets the wait time out.
+        committing = threading.Barrier(2, timeout=5)
+        reading = threading.Barrier(2, timeout=1)
+        patching = threading.Barrier(2, timeout=1)
+        committed = threading.local()
+        stored_version = catalog_cache._stored_version
+        active_rows = facet_index._active_rows
+
+        def rendezvous_version():
+            version = stored_version()
+            if getattr(committed, 'waiting', False):
+                committed.waiting = False
+                try:
+                    reading.wait()
+                except threading.BrokenBarrierError:
+                    pass
+            return version
+
+        def rendezvous_rows(connection, shirt_ids=None):
+            if shirt_ids is not None:
+                try:
+                    patching.wait()
+                except threading.BrokenBarrierError:
+                    pass
+            return active_rows(connection, shirt_ids)
+
+        swaps = []
+
+        def record(app, previous_version, version, **extra):
+            swaps.append((previous_version, version))
+
+        errors = []
+
+        def commit(shirt_id, brand):
+            try:
+                with self.app.app_context():
+                    self.db.session.get(self.Shirt, shirt_id).brand = brand
+                    committing.wait()
+                    committed.waiting = True
+                    self.db.session.commit()
+                    self.db.session.remove()
+            except Exception as error:
+                errors.append(error)
+
+        catalog_changed.connect(record, weak=False)
+        try:
+            with mock.patch.object(catalog_cache, '_stored_version', rendezvous_version), \
+                    mock.patch.object(facet_index, '_active_rows', rendezvous_rows):
+                threads = [
+                    threading.Thread(target=commit, args=(1, 'Umbro')),
+                    threading.Thread(target=commit, args=(3, 'Puma')),
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+        finally:
+            catalog_changed.disconnect(record)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(swaps), 2)
+        first, second = swaps if swaps[1][0] == swaps[0][1] else swaps[::-1]
+        self.assertEqual(second[0], first[1])
+
+        with self.app.app_context():
+            index = facet_index.get_facet_index()
+            self.assertEqual(index.version, second[1])
+            self.assertEqual(index.facet_counts({})['brand'], {'Umbro': 1, 'Adidas': 1, 'Puma': 1})
+
+    def test_snapshot_round_trips(self):
+        from app.facet_index import FacetIndex, get_facet_index
+
+        with self.app.test_request_context():
+            index = get_facet_index()
+            restored = FacetIndex.from_buffer(index.dumps())
+
+        self.assertEqual(restored.version, index.version)
+        self.assertEqual(restored.live, index.live)
+        self.assertEqual(restored.facet_counts({'brand': ['Nike']}), index.facet_counts({'brand': ['Nike']}))
+
+
+if __name__ == '__main__':
+    unittest.main()
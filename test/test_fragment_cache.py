@@ -0,0 +1,90 @@
+import os
+import tempfile
+import unittest
+import uuid
+
+
+class ShirtCardFragmentCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, db
+
+        self.run_id = uuid.uuid4().hex[:8]
+
+        self.Shirt = Shirt
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+            self.db.session.add_all([
+                Shirt(
+                    product_code=index + 1,
+                    brand='Nike',
+                    # Cards are shared by every app in the process; unique teams keep tests apart.
+                    squadra=f'Team {index} {self.run_id}',
+                    campionato='Serie A',
+                    taglia='L',
+                    colore='Red',
+                    stagione='1995/1996',
+                    type='Shirt',
+                    status='active',
+                )
+                for index in range(3)
+            ])
+            self.db.session.commit()
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def stats_after(self, path):
+        from app.fragment_cache import fragment_cache_stats
+
+        before = fragment_cache_stats()
+        html = self.client.get(path).get_data(as_text=True)
+        after = fragment_cache_stats()
+        return html, after['hits'] - before['hits'], after['misses'] - before['misses']
+
+    def test_cards_are_reused_across_pages_and_rerendered_after_edits(self):
+        _, hits, misses = self.stats_after('/catalogue?sort=newest')
+        self.assertEqual((hits, misses), (0, 3))
+
+        html, hits, misses = self.stats_after('/catalogue?sort=oldest')
+        self.assertEqual((hits, misses), (3, 0))
+        self.assertEqual(html.count('href="/shirt/'), 3)
+
+        with self.app.app_context():
+            self.db.session.get(self.Shirt, 2).sold = True
+            self.db.session.commit()
+
+        html, hits, misses = self.stats_after('/catalogue?sort=newest')
+        self.assertEqual((hits, misses), (2, 1))
+        self.assertIn('SOLD', html)
+
+    def test_cards_are_kept_per_locale(self):
+        self.stats_after('/catalogue?sort=newest&lang=en')
+        html, hits, misses = self.stats_after('/catalogue?sort=oldest&lang=it')
+
+        self.assertEqual((hits, misses), (0, 3))
+        self.assertIn('Maglia', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
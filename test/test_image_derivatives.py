@@ -0,0 +1,122 @@
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+
+class ImageDerivativesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, ShirtImage, db
+
+        self.Shirt = Shirt
+        self.ShirtImage = ShirtImage
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        self.image_path = os.path.join(self.app.config['UPLOAD_FOLDER'], 'milan', '1.jpg')
+        os.makedirs(os.path.dirname(self.image_path))
+        Image.new('RGB', (1200, 1600), (200, 30, 30)).save(self.image_path)
+
+        with self.app.app_context():
+            self.db.create_all()
+            shirt = Shirt(
+                product_code=1,
+                brand='Nike',
+                squadra='Ac Milan',
+                campionato='Serie A',
+                taglia='L',
+                colore='Red',
+                stagione='1995/1996',
+                type='Shirt',
+                status='active',
+            )
+            shirt.images = [ShirtImage(file_path='milan/1.jpg', is_cover=True)]
+            self.db.session.add(shirt)
+            self.db.session.commit()
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def test_normalizing_writes_the_derivative_ladder(self):
+        from app.image_utils import (
+            DERIVATIVE_FORMATS,
+            DERIVATIVE_WIDTHS,
+            derivative_path,
+            generate_derivatives,
+            normalize_product_image,
+        )
+
+        self.assertTrue(normalize_product_image(self.image_path))
+        for width in DERIVATIVE_WIDTHS:
+            for image_format in DERIVATIVE_FORMATS:
+                with Image.open(derivative_path(self.image_path, width, image_format)) as derivative:
+                    self.assertEqual(derivative.size, (width, width * 3 // 2))
+        # Already complete, so a backfill pass has nothing to do.
+        self.assertEqual(generate_derivatives(self.image_path), 0)
+
+    def test_large_jpegs_are_draft_decoded_in_display_orientation(self):
+        from app.image_utils import normalize_product_image
+
+        path = os.path.join(os.path.dirname(self.image_path), '2.jpg')
+        # Stored landscape with an EXIF rotation, so it displays as a 4000x6000 portrait.
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        Image.new('RGB', (6000, 4000), (30, 200, 30)).save(path, exif=exif)
+
+        with Image.open(path) as image:
+            image.draft(None, (1500, 1000))
+            self.assertEqual(image.size, (1500, 1000))
+
+        self.assertTrue(normalize_product_image(path))
+        with Image.open(path) as normalized:
+            self.assertEqual(normalized.size, (1000, 1500))
+        # Already normalized: recognised from the header alone.
+        self.assertFalse(normalize_product_image(path))
+
+    def test_resized_requests_are_negotiated_on_accept(self):
+        from app.image_utils import normalize_product_image
+
+        missing = self.client.get('/uploads/milan/1.jpg?w=300&v=1')
+        self.assertEqual(missing.mimetype, 'image/jpeg')
+        self.assertFalse(missing.cache_control.immutable)
+
+        normalize_product_image(self.image_path)
+        webp = self.client.get('/uploads/milan/1.jpg?w=300&v=1', headers={'Accept': 'image/webp,image/*'})
+        self.assertEqual(webp.mimetype, 'image/webp')
+        self.assertIn('Accept', webp.vary)
+        self.assertTrue(webp.cache_control.immutable)
+        with Image.open(os.path.join(os.path.dirname(self.image_path), 'derived', '1.jpg-320.webp')) as small:
+            self.assertEqual(small.width, 320)
+
+        jpeg = self.client.get('/uploads/milan/1.jpg?w=300', headers={'Accept': 'image/jpeg'})
+        self.assertEqual(jpeg.mimetype, 'image/jpeg')
+        self.assertLess(len(jpeg.get_data()), os.path.getsize(self.image_path))
+
+    def test_catalog_cards_offer_a_srcset(self):
+        html = self.client.get('/catalogue?sort=newest').get_data(as_text=True)
+        self.assertIn('srcset="/uploads/milan/1.jpg?v=', html)
+        self.assertIn('&amp;w=320 320w', html)
+        self.assertIn('sizes="(min-width: 1280px) 33vw, 50vw"', html)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+import io
+import os
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from PIL import Image
+
+
+class ImageQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import ShirtImage, db
+
+        self.ShirtImage = ShirtImage
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['logged_in'] = True
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    @staticmethod
+    def upload(name):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1200, 1600), (30, 30, 200)).save(buffer, 'JPEG')
+        buffer.seek(0)
+        return buffer, name
+
+    def create_shirt_with_upload(self):
+        response = self.client.post(
+            '/admin/new',
+            data={
+                'brand': 'Nike',
+                'squadra': 'Italy',
+                'campionato': 'National Teams',
+                'taglia': 'L',
+                'colore': 'Blue',
+                'stagione': '2025-26',
+                'type': 'Shirt',
+                'status': 'active',
+                'images': [self.upload('front.jpg'), self.upload('back.jpg')],
+            },
+            content_type='multipart/form-data',
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_upload_is_queued_and_processed_by_the_worker(self):
+        from app.image_queue import run_pending_images
+        from app.image_utils import DERIVATIVE_WIDTHS, derivative_path
+        from app.uploads import image_url
+
+        self.create_shirt_with_upload()
+        with self.app.app_context(), self.app.test_request_context():
+            images = self.ShirtImage.query.order_by(self.ShirtImage.id).all()
+            self.assertEqual([image.processing_status for image in images], ['pending', 'pending'])
+            self.assertTrue(all(image.file_path.startswith('incoming/') for image in images))
+            shirt_id = images[0].shirt_id
+            incoming_url = image_url(images[0])
+            incoming_path = os.path.join(self.upload_dir, images[0].file_path)
+
+        # The untouched original is served meanwhile, but never cached for good.
+        pending = self.client.get(incoming_url)
+        self.assertEqual(pending.status_code, 200)
+        self.assertFalse(pending.cache_control.immutable)
+
+        status = self.client.get(f'/admin/image_status/{shirt_id}').get_json()
+        self.assertEqual({image['status'] for image in status['images']}, {'pending'})
+
+        with self.app.app_context():
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                self.assertEqual(run_pending_images(executor=executor), 2)
+            self.assertEqual(run_pending_images(), 0)
+
+        with self.app.app_context(), self.app.test_request_context():
+            images = self.ShirtImage.query.order_by(self.ShirtImage.id).all()
+            self.assertEqual([image.processing_status for image in images], ['ready', 'ready'])
+            # Both uploads were the same photo, so they share one stored object.
+            self.assertEqual(images[0].file_path, images[1].file_path)
+            self.assertTrue(images[0].file_path.startswith('objects/'))
+            ready_url = image_url(images[0])
+            path = os.path.join(self.upload_dir, images[0].file_path)
+        self.assertFalse(os.path.exists(incoming_path))
+        self.assertTrue(self.client.get(ready_url).cache_control.immutable)
+        with Image.open(path) as normalized:
+            self.assertEqual(normalized.size, (1000, 1500))
+        self.assertTrue(os.path.exists(derivative_path(path, DERIVATIVE_WIDTHS[0], 'jpeg')))
+
+        status = self.client.get(f'/admin/image_status/{shirt_id}').get_json()
+        self.assertEqual({image['status'] for image in status['images']}, {'ready'})
+
+    def test_worker_dying_before_commit_is_retried_into_the_same_object(self):
+        from datetime import datetime
+
+        from app.image_queue import IMAGE_PROCESSING_LEASE, _claim_images, process_image_file, run_pending_images
+        from app.image_utils import DERIVED_DIRNAME
+
+        self.create_shirt_with_upload()
+        with self.app.app_context():
+            claimed = _claim_images(datetime.utcnow() - IMAGE_PROCESSING_LEASE * 2, 1)
+            incoming = os.path.join(self.upload_dir, claimed[0].file_path)
+            # The pool process finishes, then the worker dies before committing the result.
+            first_object, error = process_image_file(incoming, self.upload_dir)
+            self.assertIsNone(error)
+            self.assertTrue(os.path.isfile(incoming))
+            self.db.session.rollback()
+
+            self.assertEqual(run_pending_images(), 2)
+            images = self.ShirtImage.query.order_by(self.ShirtImage.id).all()
+            self.assertEqual({image.processing_status for image in images}, {'ready'})
+            self.assertEqual({image.file_path for image in images}, {first_object})
+
+        self.assertFalse(os.path.exists(incoming))
+        self.assertEqual(os.listdir(os.path.join(self.upload_dir, 'incoming')), [])
+        object_dir = os.path.dirname(os.path.join(self.upload_dir, first_object))
+        stored = [name for name in os.listdir(object_dir) if name != DERIVED_DIRNAME]
+        self.assertEqual(stored, [os.path.basename(first_object)])
+
+    def test_object_released_before_the_commit_is_stored_again(self):
+        from app import image_queue
+        from app.image_queue import run_pending_images
+        from app.image_store import release_image_file
+        from app.image_utils import DERIVATIVE_WIDTHS, derivative_path
+
+        self.create_shirt_with_upload()
+        with self.app.app_context():
+            run_pending_images()
+            first_shirt_id, shared = self.db.session.query(self.ShirtImage.shirt_id, self.ShirtImage.file_path).first()
+
+        # A second shirt with the same photo is processed into the object the first one uses.
+        self.create_shirt_with_upload()
+        process_image_file = image_queue.process_image_file
+        processed = []
+        released = []
+
+        def process_then_release(path, upload_folder):
+            result = process_image_file(path, upload_folder)
+            processed.append(path)
+            if len(processed) == 2:
+                # Meanwhile the first shirt's images are deleted; nothing committed refers to the object yet.
+                with self.app.app_context():
+                    self.ShirtImage.query.filter_by(shirt_id=first_shirt_id).delete()
+                    self.db.session.commit()
+                    released.append(release_image_file(shared))
+            return result
+
+        with self.app.app_context():
+            with mock.patch.object(image_queue, 'process_image_file', process_then_release):
+                self.assertEqual(run_pending_images(), 2)
+            paths = {image.file_path for image in self.ShirtImage.query}
+
+        self.assertEqual(released, [True])
+        self.assertEqual(paths, {shared})
+        path = os.path.join(self.upload_dir, shared)
+        self.assertTrue(os.path.isfile(path))
+        self.assertTrue(os.path.exists(derivative_path(path, DERIVATIVE_WIDTHS[0], 'jpeg')))
+        self.assertEqual(os.listdir(os.path.join(self.upload_dir, 'incoming')), [])
+
+    def test_unreadable_upload_is_marked_failed(self):
+        from app.image_queue import run_pending_images
+
+        self.create_shirt_with_upload()
+        with self.app.app_context():
+            broken = self.ShirtImage.query.order_by(self.ShirtImage.id).first()
+            with open(os.path.join(self.upload_dir, broken.file_path), 'wb') as handle:
+                handle.write(b'not an image')
+            run_pending_images()
+            statuses = dict(self.db.session.query(self.ShirtImage.id, self.ShirtImage.processing_status))
+            self.assertEqual(statuses.pop(broken.id), 'failed')
+            self.assertEqual(set(statuses.values()), {'ready'})
+            self.assertTrue(self.db.session.get(self.ShirtImage, broken.id).processing_error)
+
+
+if __name__ == '__main__':
+    unittest.main()
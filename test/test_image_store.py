@@ -0,0 +1,158 @@
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+
+class ImageStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, ShirtImage, db
+
+        self.Shirt = Shirt
+        self.ShirtImage = ShirtImage
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['logged_in'] = True
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def write_photo(self, relative_path, colour=(200, 30, 30)):
+        path = os.path.join(self.upload_dir, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Image.new('RGB', (1000, 1500), colour).save(path)
+        return path
+
+    def add_shirt(self, product_code, file_path):
+        shirt = self.Shirt(
+            product_code=product_code,
+            brand='Nike',
+            squadra='Ac Milan',
+            campionato='Serie A',
+            taglia='L',
+            colore='Red',
+            stagione='1995/1996',
+            type='Shirt',
+            status='active',
+        )
+        shirt.images = [self.ShirtImage(file_path=file_path, is_cover=True)]
+        self.db.session.add(shirt)
+        self.db.session.commit()
+        return shirt.id
+
+    def store(self, relative_path, **kwargs):
+        from app.image_store import store_object
+
+        return store_object(self.write_photo(relative_path, **kwargs), self.upload_dir)
+
+    def test_identical_files_share_one_object(self):
+        first = self.store('incoming/a.jpeg')
+        second = self.store('incoming/b.jpg')
+        different = self.store('incoming/c.jpg', colour=(30, 30, 200))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, different)
+        self.assertRegex(first, r'^objects/([0-9a-f]{2})/\1[0-9a-f]{62}\.jpg$')
+        self.assertEqual(os.listdir(os.path.join(self.upload_dir, 'incoming')), [])
+
+    def test_objects_are_cached_forever_and_survive_edits(self):
+        object_path = self.store('incoming/a.jpg')
+        with self.app.app_context():
+            shirt_id = self.add_shirt(1, object_path)
+            with self.app.test_request_context():
+                from app.uploads import image_url
+
+                url = image_url(self.db.session.get(self.ShirtImage, shirt_id))
+        self.assertNotIn('v=', url)
+        response = self.client.get(url)
+        self.assertTrue(response.cache_control.immutable)
+        self.assertEqual(response.cache_control.max_age, 365 * 86400)
+
+        response = self.client.post(f'/admin/edit/{shirt_id}', data={
+            'brand': 'Adidas',
+            'squadra': 'Juventus',
+            'campionato': 'Serie B',
+            'taglia': 'M',
+            'colore': 'Black',
+            'stagione': '1996/1997',
+            'type': 'Shirt',
+            'status': 'active',
+        })
+        self.assertEqual(response.status_code, 302)
+        with self.app.app_context():
+            self.assertEqual(self.db.session.get(self.Shirt, shirt_id).squadra, 'Juventus')
+            self.assertEqual(self.ShirtImage.query.one().file_path, object_path)
+        self.assertTrue(os.path.isfile(os.path.join(self.upload_dir, object_path)))
+
+    def test_shared_objects_are_deleted_with_their_last_image(self):
+        from app.image_utils import derivative_path, generate_derivatives
+
+        object_path = self.store('incoming/a.jpg')
+        absolute_path = os.path.join(self.upload_dir, object_path)
+        generate_derivatives(absolute_path)
+        with self.app.app_context():
+            first = self.add_shirt(1, object_path)
+            second = self.add_shirt(2, object_path)
+
+        self.assertEqual(self.client.post(f'/admin/delete/{first}').status_code, 302)
+        self.assertTrue(os.path.isfile(absolute_path))
+
+        self.assertEqual(self.client.post(f'/admin/delete/{second}').status_code, 302)
+        self.assertFalse(os.path.exists(absolute_path))
+        self.assertFalse(derivative_path(absolute_path, 320, 'jpeg').exists())
+
+    def test_migration_moves_the_legacy_tree(self):
+        from app.image_store import migrate_legacy_images
+        from app.image_utils import derivative_path, generate_derivatives
+
+        legacy_path = self.write_photo('Serie_A/Nike/Ac_Milan/1_L/1.jpg')
+        generate_derivatives(legacy_path)
+        legacy_derivative = derivative_path(legacy_path, 320, 'jpeg')
+        derivative_inode = os.stat(legacy_derivative).st_ino
+        self.write_photo('Serie_A/Nike/Ac_Milan/2_L/1.jpg')
+        with self.app.app_context():
+            first = self.add_shirt(1, 'Serie_A/Nike/Ac_Milan/1_L/1.jpg')
+            self.add_shirt(2, 'Serie_A/Nike/Ac_Milan/2_L/1.jpg')
+            self.add_shirt(3, 'Serie_A/Nike/Ac_Milan/3_L/1.jpg')
+
+            self.assertEqual(migrate_legacy_images(batch_size=2), (2, 1))
+            paths = [image.file_path for image in self.ShirtImage.query.order_by(self.ShirtImage.id)]
+            # Same photo in two shirts: one object. The row without a file is left for a human.
+            self.assertEqual(paths[0], paths[1])
+            self.assertTrue(paths[0].startswith('objects/'))
+            self.assertEqual(paths[2], 'Serie_A/Nike/Ac_Milan/3_L/1.jpg')
+            self.assertEqual(self.db.session.get(self.Shirt, first).cover_image.file_path, paths[0])
+
+            # Running it again finds nothing left to move.
+            self.assertEqual(migrate_legacy_images(), (0, 1))
+
+        self.assertFalse(os.path.exists(os.path.join(self.upload_dir, 'Serie_A')))
+        object_file = os.path.join(self.upload_dir, paths[0])
+        self.assertTrue(os.path.isfile(object_file))
+        self.assertEqual(os.stat(derivative_path(object_file, 320, 'jpeg')).st_ino, derivative_inode)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,210 @@
+import os
+import random
+import struct
+import tempfile
+import unittest
+from decimal import ROUND_HALF_UP, Decimal
+
+from sqlalchemy import event
+
+
+def single_precision(value):
+    """What MySQL hands back for a price stored in a FLOAT column."""
+    return struct.unpack('f', struct.pack('f', value))[0]
+
+
+def reference_summary(rows):
+    """The per-row Decimal arithmetic the dashboard used before it moved into SQL, to the cent."""
+    total_spent = total_margin = sold_total_spent = sold_total_gain = Decimal('0')
+    cents = Decimal('0.01')
+    for paid, selling, sold in rows:
+        price_paid = Decimal(str(paid)).quantize(cents, ROUND_HALF_UP) if paid is not None else Decimal('0')
+        total_spent += price_paid
+        if selling is not None and paid is not None:
+            total_margin += Decimal(str(selling)) - price_paid
+            if sold:
+                sold_total_spent += price_paid
+                sold_total_gain += Decimal(str(selling)) - price_paid
+    margin_percentage = total_margin / total_spent * 100 if total_spent > 0 else Decimal('0')
+    sold_gain_percentage = sold_total_gain / sold_total_spent * 100 if sold_total_spent > 0 else Decimal('0')
+    return {
+        'total_spent': total_spent.quantize(cents),
+        'total_margin': total_margin.quantize(cents),
+        'margin_percentage': margin_percentage.quantize(cents),
+        'sold_total_gain': sold_total_gain.quantize(cents),
+        'sold_gain_percentage': sold_gain_percentage.quantize(cents),
+    }
+
+
+class InventorySummaryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, db
+
+        self.Shirt = Shirt
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['logged_in'] = True
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def add_shirts(self, rows):
+        for product_code, (paid, selling, sold) in enumerate(rows, start=1):
+            self.db.session.add(self.Shirt(
+                product_code=product_code,
+                brand='Nike',
+                squadra=f'Team {product_code}',
+                campionato='Serie A',
+                taglia='L',
+                colore='Red',
+                stagione='1995/1996',
+                type='Shirt',
+                status='active',
+                prezzo_pagato=paid,
+                internal_price=Decimal(selling) if selling is not None else None,
+                sold=sold,
+            ))
+        self.db.session.commit()
+
+    def test_matches_per_row_decimal_arithmetic(self):
+        from app.inventory_summary import compute_inventory_summary, get_inventory_summary
+
+        rng = random.Random(7)
+        rows = [(0.1, '0.30', True), (0.2, '0.10', True), (12.345, None, True), (None, '50.00', True)]
+        for _ in range(300):
+            paid = rng.choice([None, round(rng.uniform(1, 200), rng.choice([0, 1, 2]))])
+            selling = rng.choice([None, f'{rng.uniform(1, 300):.2f}'])
+            rows.append((paid, selling, rng.random() < 0.4))
+
+        with self.app.app_context():
+            self.assertEqual(compute_inventory_summary()['total_spent'], Decimal('0.00'))
+            self.add_shirts(rows)
+            self.assertEqual(compute_inventory_summary(), reference_summary(rows))
+            self.assertEqual(get_inventory_summary(), reference_summary(rows))
+
+    def test_single_precision_prices_sum_to_the_entered_cents(self):
+        from app.inventory_summary import compute_inventory_summary, get_inventory_summary
+
+        entered = [(49.99, '59.99', True), (1234.56, '1500.00', True), (120.35, '150.00', False)] * 100
+        rows = [(single_precision(paid), selling, sold) for paid, selling, sold in entered]
+        self.assertNotEqual(rows[1][0], 1234.56)
+
+        with self.app.app_context():
+            self.add_shirts(rows)
+            expected = reference_summary(entered)
+            self.assertEqual(expected['total_spent'], Decimal('140490.00'))
+            self.assertEqual(compute_inventory_summary(), expected)
+            self.assertEqual(get_inventory_summary(), expected)
+
+    def test_summary_is_a_single_query(self):
+        from app.inventory_summary import get_inventory_summary
+
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.app.app_context():
+            self.add_shirts([(10.0, '15.00', True), (20.0, None, False)])
+            self.db.session.expire_all()
+            event.listen(self.db.engine, 'before_cursor_execute', record)
+            try:
+                summary = get_inventory_summary()
+            finally:
+                event.remove(self.db.engine, 'before_cursor_execute', record)
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(summary['total_spent'], Decimal('30.00'))
+        self.assertEqual(summary['sold_gain_percentage'], Decimal('50.00'))
+
+    def test_totals_follow_inserts_updates_and_deletes(self):
+        from app.inventory_summary import compute_inventory_summary, get_inventory_summary, reconcile_inventory_summary
+
+        rng = random.Random(11)
+        with self.app.app_context():
+            self.add_shirts([(rng.choice([None, 19.99, 5.5]), rng.choice([None, '30.00']), False) for _ in range(30)])
+            shirt_ids = [shirt.id for shirt in self.Shirt.query.all()]
+            for step in range(120):
+                # Commits expire everything, so most writes below go to attributes never loaded.
+                shirt = self.db.session.get(self.Shirt, rng.choice(shirt_ids))
+                if shirt is None:
+                    continue
+                action = rng.randrange(5)
+                if action == 0:
+                    shirt.prezzo_pagato = rng.choice([None, 12.345, 40.0])
+                elif action == 1:
+                    shirt.internal_price = rng.choice([None, Decimal('18.50'), Decimal('99.99')])
+                elif action == 2:
+                    shirt.sold = not shirt.sold
+                elif action == 3:
+                    shirt.status = rng.choice(['active', 'draft'])
+                else:
+                    shirt.descrizione = f'edit {step}'
+                if step % 17 == 0:
+                    self.db.session.delete(shirt)
+                self.db.session.commit()
+
+            self.assertEqual(get_inventory_summary(), compute_inventory_summary())
+            self.assertEqual(get_inventory_summary('draft'), compute_inventory_summary('draft'))
+            self.assertEqual(reconcile_inventory_summary(), {})
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        from sqlalchemy import text
+
+        from app.inventory_summary import get_inventory_summary, reconcile_inventory_summary
+
+        with self.app.app_context():
+            self.add_shirts([(10.0, '15.00', True), (20.0, None, False)])
+            # Writes that bypass the ORM are invisible to the flush hooks.
+            self.db.session.execute(text('UPDATE shirts SET prezzo_pagato = 12.5 WHERE id = 1'))
+            self.db.session.commit()
+            self.assertEqual(get_inventory_summary()['total_spent'], Decimal('30.00'))
+
+            drift = reconcile_inventory_summary(fix=False)
+            self.assertEqual(set(drift), {'active'})
+            stored, actual = drift['active']
+            self.assertEqual(actual[1] - stored[1], 250)
+            self.assertEqual(get_inventory_summary()['total_spent'], Decimal('30.00'))
+
+            self.assertEqual(set(reconcile_inventory_summary()), {'active'})
+            self.assertEqual(get_inventory_summary()['total_spent'], Decimal('32.50'))
+            self.assertEqual(reconcile_inventory_summary(), {})
+
+        result = self.app.test_cli_runner().invoke(args=['inventory-reconcile', '--dry-run'])
+        self.assertIn('matches', result.output)
+
+    def test_pricing_update_returns_the_refreshed_summary(self):
+        with self.app.app_context():
+            self.add_shirts([(10.0, None, True), (5.5, '8.00', False)])
+        response = self.client.post('/admin/update_pricing/1', data={'price_paid': '10', 'selling_price': '12.50'})
+        data = response.get_json()
+        self.assertTrue(data['ok'])
+        self.assertEqual(data['summary_total_spent'], '15.50')
+        self.assertEqual(data['summary_total_margin'], '5.00')
+        self.assertEqual(data['summary_sold_total_gain'], '2.50')
+        self.assertEqual(data['summary_sold_gain_percentage'], '25.00')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from PIL import Image
+
+
+SCRIPT_PATH = Path(__file__).resolve().parents[1] / 'scripts' / 'normalize_product_images.py'
+
+
+def load_script():
+    spec = importlib.util.spec_from_file_location('normalize_product_images', SCRIPT_PATH)
+    module = importlib.util.module_from_spec(spec)
+    # Registered so the pool can pickle the worker function by module name.
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+class NormalizeProductImagesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.script = load_script()
+        self.work_dir = Path(tempfile.mkdtemp())
+        self.upload_dir = self.work_dir / 'uploads'
+        self.manifest_path = self.work_dir / 'manifest.json'
+        (self.upload_dir / 'milan').mkdir(parents=True)
+        for index in range(3):
+            Image.new('RGB', (2000, 3000), (40 * index, 30, 30)).save(self.upload_dir / 'milan' / f'{index + 1}.jpg')
+
+    def tearDown(self):
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def run_script(self, **kwargs):
+        return self.script.run(self.upload_dir, self.manifest_path, workers=2, verbose=False, **kwargs)
+
+    def test_unchanged_files_are_skipped_on_the_next_pass(self):
+        first = self.run_script()
+        self.assertEqual((first['changed'], first['skipped'], first['failed']), (3, 0, 0))
+        with Image.open(self.upload_dir / 'milan' / '1.jpg') as image:
+            self.assertEqual(image.size, (1000, 1500))
+        self.assertFalse(list(self.upload_dir.glob('*.json')))
+
+        second = self.run_script()
+        self.assertEqual((second['processed'], second['skipped']), (0, 3))
+
+        # A touch without a content change is recognised by its hash.
+        touched = self.upload_dir / 'milan' / '2.jpg'
+        os.utime(touched, ns=(1, 1))
+        self.assertEqual(self.run_script()['skipped'], 3)
+
+        replaced = self.upload_dir / 'milan' / '3.jpg'
+        Image.new('RGB', (1200, 1600), (0, 0, 200)).save(replaced)
+        third = self.run_script()
+        self.assertEqual((third['processed'], third['changed'], third['skipped']), (1, 1, 2))
+
+        self.assertEqual(self.run_script(use_manifest=False)['processed'], 3)
+
+    def test_derivative_backfill_does_not_mark_originals_normalized(self):
+        backfill = self.run_script(derivatives_only=True)
+        self.assertEqual(backfill['processed'], 3)
+        with Image.open(self.upload_dir / 'milan' / '1.jpg') as image:
+            self.assertEqual(image.size, (2000, 3000))
+
+        self.assertEqual(self.run_script(derivatives_only=True)['skipped'], 3)
+        self.assertEqual(self.run_script()['changed'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,193 @@
+import os
+import tempfile
+import unittest
+
+
+class PageCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, db
+
+        self.Shirt = Shirt
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+            self.db.session.add_all([
+                self.make_product(1, 'Ac Milan', 'Lotto'),
+                self.make_product(2, 'Inter Milan', 'Nike'),
+            ])
+            self.db.session.commit()
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def make_product(self, product_code, squadra, brand):
+        return self.Shirt(
+            product_code=product_code,
+            brand=brand,
+            squadra=squadra,
+            campionato='Serie A',
+            taglia='L',
+            colore='Red',
+            stagione='1995/1996',
+            type='Shirt',
+            descrizione='Original match shirt.',
+            status='active',
+        )
+
+    def test_repeat_requests_hit_and_revalidate(self):
+        first = self.client.get('/catalogue?sort=newest')
+        second = self.client.get('/catalogue?sort=newest')
+
+        self.assertEqual(first.headers['X-Page-Cache'], 'MISS')
+        self.assertEqual(second.headers['X-Page-Cache'], 'HIT')
+        self.assertEqual(second.get_data(), first.get_data())
+        self.assertIsNotNone(first.headers.get('Last-Modified'))
+
+        etag = first.headers['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        not_modified = self.client.get('/catalogue?sort=newest', headers={'If-None-Match': etag})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.get_data(), b'')
+
+    def test_equivalent_catalog_urls_share_an_entry(self):
+        first = self.client.get('/catalogue?brand=Nike&sort=newest&page=1&colore=')
+        second = self.client.get('/catalogue?sort=newest&brand=Nike')
+        shuffled = self.client.get('/catalogue?seed=12345&brand=Nike')
+        spelled_out = self.client.get('/catalogue?brand=Nike&sort=random&seed=12345')
+
+        self.assertEqual(first.headers['X-Page-Cache'], 'MISS')
+        self.assertEqual(second.headers['X-Page-Cache'], 'HIT')
+        self.assertEqual(shuffled.headers['X-Page-Cache'], 'MISS')
+        self.assertEqual(spelled_out.headers['X-Page-Cache'], 'HIT')
+
+    def test_canonical_url_matches_the_requested_lang(self):
+        canonical = 'rel="canonical"\n        href="https://kitaly-official.com/catalogue{}"'
+
+        named = self.client.get('/catalogue?sort=newest&lang=it')
+        # Same locale, now from the session, but a URL without lang must not get the lang canonical.
+        plain = self.client.get('/catalogue?sort=newest')
+        unknown = self.client.get('/catalogue?sort=newest&lang=xx')
+
+        self.assertIn(canonical.format('?lang=it'), named.get_data(as_text=True))
+        self.assertEqual(plain.headers['X-Page-Cache'], 'MISS')
+        self.assertIn(canonical.format(''), plain.get_data(as_text=True))
+        self.assertEqual(unknown.headers['X-Page-Cache'], 'HIT')
+        self.assertEqual(self.client.get('/catalogue?lang=it&sort=newest').headers['X-Page-Cache'], 'HIT')
+
+    def test_unknown_args_bypass_the_cache(self):
+        detail = self.client.get('/shirt/1', follow_redirects=True).request.path
+        pages_dir = os.path.join(self.cache_dir, 'pages')
+        stored = set(os.listdir(pages_dir))
+
+        tracked = self.client.get('/catalogue?sort=newest&utm_source=mail')
+        again = self.client.get('/catalogue?sort=newest&utm_source=mail')
+        junk = self.client.get(f'{detail}?x=1')
+
+        self.assertEqual((tracked.headers['X-Page-Cache'], again.headers['X-Page-Cache']), ('BYPASS', 'BYPASS'))
+        self.assertEqual(junk.headers['X-Page-Cache'], 'BYPASS')
+        self.assertEqual(set(os.listdir(pages_dir)), stored)
+        self.assertEqual(self.client.get(f'{detail}?lang=en').headers['X-Page-Cache'], 'MISS')
+
+    def test_flashed_messages_are_never_cached(self):
+        with self.client.session_transaction() as session:
+            session['_flashes'] = [('success', 'Shirt deleted successfully')]
+        flashed = self.client.get('/catalogue?sort=newest')
+        self.assertEqual(flashed.headers['X-Page-Cache'], 'BYPASS')
+        self.assertIn('Shirt deleted successfully', flashed.get_data(as_text=True))
+
+        first = self.client.get('/catalogue?sort=newest')
+        other_visitor = self.app.test_client().get('/catalogue?sort=newest')
+        self.assertEqual((first.headers['X-Page-Cache'], other_visitor.headers['X-Page-Cache']), ('MISS', 'HIT'))
+        self.assertNotIn('Shirt deleted successfully', other_visitor.get_data(as_text=True))
+
+    def test_writes_prune_the_pages_directory_to_its_caps(self):
+        from unittest import mock
+
+        from app import page_cache
+
+        pages_dir = os.path.join(self.cache_dir, 'pages')
+        with mock.patch.object(page_cache, 'PAGE_CACHE_MAX_ENTRIES', 10), \
+                mock.patch.dict(page_cache._disk, entries=None, bytes=0):
+            for page in range(25):
+                self.assertEqual(self.client.get(f'/catalogue?sort=newest&brand=b{page}').status_code, 200)
+                self.assertLessEqual(len(os.listdir(pages_dir)), 10)
+            page_cache._memory.clear()
+            newest = self.client.get('/catalogue?sort=newest&brand=b24')
+            oldest = self.client.get('/catalogue?sort=newest&brand=b0')
+
+        self.assertEqual(newest.headers['X-Page-Cache'], 'HIT')
+        self.assertEqual(oldest.headers['X-Page-Cache'], 'MISS')
+
+    def test_shirt_write_invalidates_pages(self):
+        self.client.get('/shirt/1')
+        detail = self.client.get('/shirt/1', follow_redirects=True)
+        self.assertEqual(detail.headers['X-Page-Cache'], 'MISS')
+        self.assertEqual(self.client.get(detail.request.path).headers['X-Page-Cache'], 'HIT')
+
+        with self.app.app_context():
+            self.db.session.get(self.Shirt, 1).descrizione = 'Worn in the 1996 derby.'
+            self.db.session.commit()
+
+        refreshed = self.client.get(detail.request.path)
+        self.assertEqual(refreshed.headers['X-Page-Cache'], 'MISS')
+        self.assertIn('Worn in the 1996 derby.', refreshed.get_data(as_text=True))
+
+    def test_detail_page_follows_its_own_shirt_only(self):
+        detail = self.client.get('/shirt/1', follow_redirects=True)
+        path = detail.request.path
+
+        with self.app.app_context():
+            updated_at = self.db.session.get(self.Shirt, 1).updated_at
+            self.db.session.get(self.Shirt, 2).sold = True
+            self.db.session.commit()
+
+        unaffected = self.client.get(path)
+        self.assertEqual(unaffected.headers['X-Page-Cache'], 'HIT')
+        self.assertEqual(unaffected.last_modified.replace(tzinfo=None), updated_at.replace(microsecond=0))
+        not_modified = self.client.get(path, headers={'If-Modified-Since': unaffected.headers['Last-Modified']})
+        self.assertEqual(not_modified.status_code, 304)
+
+        with self.app.app_context():
+            self.db.session.get(self.Shirt, 1).sold = True
+            self.db.session.commit()
+        self.assertEqual(self.client.get(path).headers['X-Page-Cache'], 'MISS')
+
+    def test_stale_page_is_served_when_database_is_unavailable(self):
+        from app.catalog_cache import bump_catalog_version
+
+        cached = self.client.get('/catalogue?sort=newest')
+        with self.app.app_context():
+            bump_catalog_version()
+            self.db.session.remove()
+            self.db.engine.dispose()
+        # An empty database file stands in for an unreachable server: every query fails.
+        os.unlink(self.database_file.name)
+
+        response = self.client.get('/catalogue?sort=newest')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Page-Cache'], 'STALE')
+        self.assertEqual(response.get_data(), cached.get_data())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import text
+
+
+class QueryPlanTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+
+        from app import create_app
+        from app.models import Shirt, db
+
+        self.Shirt = Shirt
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+            self.db.session.add_all([
+                Shirt(
+                    product_code=index + 1,
+                    brand='Nike',
+                    squadra=f'Team {index}',
+                    campionato='Serie A',
+                    taglia='L',
+                    colore='Red',
+                    stagione='1995/1996',
+                    type='Shirt',
+                    status='active',
+                )
+                for index in range(5)
+            ])
+            self.db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+
+    def test_representative_queries_use_indexes(self):
+        from app.query_plans import check_query_plans
+
+        with self.app.app_context():
+            self.assertEqual(check_query_plans(), {})
+
+    def test_default_pages_are_covered_with_every_filter(self):
+        from app.query_plans import representative_queries
+
+        with self.app.app_context():
+            names = set(representative_queries())
+
+        self.assertLessEqual({'catalog default', 'catalog default filtered'}, names)
+        for sort in ('default', 'chronological', 'reverse chronological', 'newest'):
+            for suffix in ('', ' status', ' sold', ' brand', ' campionato', ' colore', ' stagione', ' type', ' taglia'):
+                self.assertIn(f'dashboard {sort}{suffix}', names)
+
+    def test_newest_dashboard_page_walks_its_index(self):
+        from app.query_plans import check_query_plans
+
+        with self.app.app_context():
+            self.db.session.execute(text('DROP INDEX ix_shirts_created_at'))
+            failures = check_query_plans()
+
+        self.assertEqual(set(failures), {'dashboard newest', 'dashboard newest sold'})
+
+    def test_missing_index_is_reported_as_full_scan(self):
+        from app.query_plans import check_query_plans
+
+        with self.app.app_context():
+            self.db.session.execute(text('DROP INDEX ix_shirt_images_shirt_id_is_cover'))
+            failures = check_query_plans()
+
+        self.assertEqual(set(failures), {'catalog images', 'cover image refresh'})
+        self.assertTrue(all(line.startswith('SCAN shirt_images') for line in failures['cover image refresh']))
+
+    def test_dashboard_timeline_walks_its_index(self):
+        from app.query_plans import check_query_plans
+
+        with self.app.app_context():
+            self.db.session.execute(text('DROP INDEX ix_shirts_season_sort_created_at'))
+            failures = check_query_plans()
+
+        # Only the pages no filter narrows down fall back to reading the whole table.
+        timeline = ('dashboard default', 'dashboard chronological', 'dashboard reverse chronological')
+        self.assertEqual(set(failures), {name + suffix for name in timeline for suffix in ('', ' sold')})
+        self.assertEqual(failures['dashboard chronological'], ['SCAN shirts'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import unittest
+
+from sqlalchemy import update
+
+
+class StoredShirtNamesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, db
+
+        self.Shirt = Shirt
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+            self.db.session.add(Shirt(
+                product_code=1,
+                brand='Nike',
+                squadra='Italy',
+                campionato='Nazionali',
+                taglia='L',
+                colore='Blue',
+                stagione='2006',
+                type='Shirt',
+                nazionale=True,
+                descrizione='World cup shirt.',
+                status='active',
+            ))
+            self.db.session.commit()
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def test_names_are_stored_and_follow_edits(self):
+        with self.app.app_context():
+            shirt = self.db.session.get(self.Shirt, 1)
+            self.assertEqual(shirt.slug_en, 'italy-nike-shirt-national-teams-blue-l-2006')
+            self.assertEqual(shirt.slug_it, 'italia-nike-maglia-nazionali-blu-l-2006')
+            self.assertEqual(shirt.display_name_en, 'Italy Nike Shirt 2006')
+            self.assertEqual(shirt.display_name_it, 'Maglia Nike Italia 2006')
+
+            shirt.stagione = '2006/2007'
+            self.db.session.commit()
+            self.assertEqual(shirt.display_name_en, 'Italy Nike Shirt 2006/2007')
+            self.assertTrue(shirt.slug_it.endswith('-2006-2007'))
+
+    def test_pages_read_the_stored_slug_and_cli_rebuilds_it(self):
+        with self.app.app_context():
+            self.db.session.execute(update(self.Shirt).values(slug_en='stored-slug', display_name_en='Stored Name'))
+            self.db.session.commit()
+
+        redirect = self.client.get('/shirt/1?lang=en')
+        self.assertTrue(redirect.headers['Location'].startswith('/shirt/1-stored-slug'))
+        self.assertIn('/shirt/1-stored-slug', self.client.get('/sitemap.xml').get_data(as_text=True))
+        self.assertIn('Stored Name', self.client.get('/shirt/1-stored-slug?lang=en').get_data(as_text=True))
+
+        result = self.app.test_cli_runner().invoke(args=['rebuild-shirt-names'])
+        self.assertIn('refreshed names for 1 shirt(s)', result.output)
+        with self.app.app_context():
+            self.assertEqual(self.db.session.get(self.Shirt, 1).slug_en, 'italy-nike-shirt-national-teams-blue-l-2006')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+
+class SitemapTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, db
+
+        self.Shirt = Shirt
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+            self.db.session.add_all([
+                self.make_product(1, 'Ac Milan', 'active'),
+                self.make_product(2, 'Inter Milan', 'active'),
+                self.make_product(3, 'Juventus', 'active'),
+                self.make_product(4, 'Draft Club', 'draft'),
+            ])
+            self.db.session.commit()
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def make_product(self, product_code, squadra, status):
+        return self.Shirt(
+            product_code=product_code,
+            brand='Nike',
+            squadra=squadra,
+            campionato='Serie A',
+            taglia='L',
+            colore='Red',
+            stagione='1995/1996',
+            type='Shirt',
+            status=status,
+        )
+
+    def test_single_file_lists_active_shirts_and_is_served_from_disk(self):
+        from app import sitemap
+
+        first = self.client.get('/sitemap.xml', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(first.headers['Content-Encoding'], 'gzip')
+        xml = gzip.decompress(first.get_data()).decode('utf-8')
+        self.assertEqual(xml.count('<url>'), 2 + 3 * 2)
+        self.assertIn('/shirt/3-juventus-nike-shirt-serie-a-red-l-1995-1996?lang=en', xml)
+        self.assertNotIn('draft-club', xml)
+
+        with mock.patch.object(sitemap, 'sitemap_entries', side_effect=AssertionError('regenerated')):
+            plain = self.client.get('/sitemap.xml')
+        self.assertEqual(plain.get_data(as_text=True), xml)
+
+        with self.app.app_context():
+            self.db.session.add(self.make_product(5, 'Roma', 'active'))
+            self.db.session.commit()
+        self.assertIn('/shirt/5-roma', self.client.get('/sitemap.xml').get_data(as_text=True))
+
+    def test_large_catalogs_are_split_behind_an_index(self):
+        from app import sitemap
+
+        with mock.patch.object(sitemap, 'SITEMAP_MAX_URLS', 3):
+            index = self.client.get('/sitemap.xml').get_data(as_text=True)
+            self.assertIn('<sitemapindex', index)
+            self.assertEqual(index.count('<sitemap>'), 3)
+
+            shards = [self.client.get(f'/sitemap-{shard}.xml') for shard in (1, 2, 3)]
+            self.assertEqual([shard.get_data(as_text=True).count('<url>') for shard in shards], [3, 3, 2])
+            self.assertEqual(self.client.get('/sitemap-4.xml').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
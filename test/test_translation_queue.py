@@ -0,0 +1,196 @@
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+
+class TranslationQueueTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, TranslationJob, db
+
+        self.Shirt = Shirt
+        self.TranslationJob = TranslationJob
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+            self.db.session.add(Shirt(
+                product_code=1,
+                brand='Lotto',
+                squadra='Ac Milan',
+                campionato='Serie A',
+                taglia='L',
+                colore='Red',
+                stagione='1995/1996',
+                type='Shirt',
+                descrizione='Original match shirt.',
+                status='active',
+            ))
+            self.db.session.commit()
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def job(self):
+        return self.db.session.get(self.TranslationJob, 1)
+
+    def test_saving_a_description_queues_a_job(self):
+        with self.app.app_context():
+            self.assertEqual(self.job().source_text, 'Original match shirt.')
+
+            shirt = self.db.session.get(self.Shirt, 1)
+            shirt.descrizione = 'Rare match shirt.'
+            self.db.session.commit()
+            self.db.session.expire_all()
+            self.assertEqual(self.job().source_text, 'Rare match shirt.')
+
+            self.db.session.delete(shirt)
+            self.db.session.commit()
+            self.assertIsNone(self.job())
+
+    def test_italian_page_serves_english_without_calling_openrouter(self):
+        from sqlalchemy import event
+
+        writes = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if not statement.lstrip().upper().startswith('SELECT'):
+                writes.append(statement)
+
+        with self.app.app_context():
+            self.db.session.delete(self.job())
+            self.db.session.commit()
+            engine = self.db.engine
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            with mock.patch('app.openrouter.translate_to_italian') as translate:
+                response = self.client.get('/shirt/1?lang=it', follow_redirects=True)
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Original match shirt.', response.get_data(as_text=True))
+        translate.assert_not_called()
+        # The page is a read; queueing is left to saves and the worker.
+        self.assertEqual(writes, [])
+        with self.app.app_context():
+            self.assertIsNone(self.job())
+
+    def test_worker_queues_shirts_saved_before_the_queue(self):
+        from sqlalchemy import text
+
+        with self.app.app_context():
+            # Rows from before the queue existed have no job, and neither do blank descriptions.
+            self.db.session.execute(text('DELETE FROM translation_jobs'))
+            self.db.session.add(self.Shirt(
+                product_code=2,
+                brand='Nike',
+                squadra='Inter',
+                campionato='Serie A',
+                taglia='M',
+                colore='Blue',
+                stagione='1996/1997',
+                type='Shirt',
+                descrizione='',
+                status='active',
+            ))
+            self.db.session.commit()
+
+        with mock.patch('app.openrouter.translate_to_italian', return_value='Maglia originale.'):
+            result = self.app.test_cli_runner().invoke(args=['translation-worker', '--once'])
+        self.assertIn('queued 1 shirt(s)', result.output)
+        self.assertIn('processed 1 translation job(s)', result.output)
+
+        with self.app.app_context():
+            self.assertEqual(self.db.session.get(self.Shirt, 1).descrizione_ita, 'Maglia originale.')
+            self.assertEqual(self.TranslationJob.query.count(), 0)
+
+    def test_worker_applies_translation_and_page_shows_it(self):
+        from app.translation_queue import run_pending_translations
+
+        with self.app.app_context():
+            with mock.patch('app.openrouter.translate_to_italian', return_value='Maglia originale.'):
+                self.assertEqual(run_pending_translations(), 1)
+            self.assertEqual(self.db.session.get(self.Shirt, 1).descrizione_ita, 'Maglia originale.')
+            self.assertIsNone(self.job())
+
+        response = self.client.get('/shirt/1?lang=it', follow_redirects=True)
+        self.assertIn('Maglia originale.', response.get_data(as_text=True))
+
+    def test_failed_translation_backs_off_then_gives_up(self):
+        from app import translation_queue
+
+        with self.app.app_context(), \
+                mock.patch('app.openrouter.translate_to_italian', return_value=None):
+            self.assertEqual(translation_queue.run_pending_translations(), 1)
+            job = self.job()
+            self.assertEqual((job.status, job.attempts), ('pending', 1))
+            self.assertGreater(job.run_after, datetime.utcnow())
+            # Not due yet, so a second pass leaves it alone.
+            self.assertEqual(translation_queue.run_pending_translations(), 0)
+
+            job.attempts = translation_queue.TRANSLATION_MAX_ATTEMPTS - 1
+            job.run_after = datetime.utcnow()
+            self.db.session.commit()
+            translation_queue.run_pending_translations()
+            self.assertEqual(self.job().status, 'failed')
+            self.assertIsNone(self.db.session.get(self.Shirt, 1).descrizione_ita)
+
+    def test_failed_jobs_are_retried_after_the_cooldown_or_on_request(self):
+        from datetime import timedelta
+
+        from app import translation_queue
+
+        with self.app.app_context():
+            job = self.job()
+            job.status, job.attempts = 'failed', translation_queue.TRANSLATION_MAX_ATTEMPTS
+            job.run_after = datetime.utcnow() + timedelta(hours=1)
+            self.db.session.commit()
+
+            with mock.patch('app.openrouter.translate_to_italian', return_value='Maglia originale.') as translate:
+                # Still cooling down after the outage.
+                self.assertEqual(translation_queue.run_pending_translations(), 0)
+                translate.assert_not_called()
+
+                self.job().run_after = datetime.utcnow() - timedelta(seconds=1)
+                self.db.session.commit()
+                self.assertEqual(translation_queue.run_pending_translations(), 1)
+            self.assertEqual(self.db.session.get(self.Shirt, 1).descrizione_ita, 'Maglia originale.')
+
+            shirt = self.db.session.get(self.Shirt, 1)
+            shirt.descrizione, shirt.descrizione_ita = 'Rare match shirt.', None
+            self.db.session.commit()
+            job = self.job()
+            job.status, job.run_after = 'failed', datetime.utcnow() + timedelta(hours=1)
+            self.db.session.commit()
+
+        with mock.patch('app.openrouter.translate_to_italian', return_value='Maglia rara.'):
+            result = self.app.test_cli_runner().invoke(args=['translation-worker', '--once', '--retry-failed'])
+        self.assertIn('retrying 1 failed translation job(s)', result.output)
+        with self.app.app_context():
+            self.assertEqual(self.db.session.get(self.Shirt, 1).descrizione_ita, 'Maglia rara.')
+            self.assertIsNone(self.job())
+
+
+if __name__ == '__main__':
+    unittest.main()
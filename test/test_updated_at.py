@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+
+
+class UpdatedAtTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        from app import create_app
+        from app.models import Shirt, ShirtImage, db
+
+        self.Shirt = Shirt
+        self.ShirtImage = ShirtImage
+        self.db = db
+        self.app = create_app()
+        self.app.config.update(TESTING=True)
+
+        with self.app.app_context():
+            self.db.create_all()
+            shirt = Shirt(
+                product_code=1,
+                brand='Nike',
+                squadra='Ac Milan',
+                campionato='Serie A',
+                taglia='L',
+                colore='Red',
+                stagione='1995/1996',
+                type='Shirt',
+                status='active',
+            )
+            shirt.images = [ShirtImage(file_path='1/1.jpg', is_cover=True)]
+            self.db.session.add(shirt)
+            self.db.session.commit()
+
+        os.makedirs(os.path.join(self.app.config['UPLOAD_FOLDER'], '1'), exist_ok=True)
+        with open(os.path.join(self.app.config['UPLOAD_FOLDER'], '1', '1.jpg'), 'wb') as handle:
+            handle.write(b'jpeg')
+
+        self.client = self.app.test_client()
+        with self.client.session_transaction() as session:
+            session['logged_in'] = True
+
+    def tearDown(self):
+        with self.app.app_context():
+            self.db.session.remove()
+            self.db.drop_all()
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+
+    def updated_at(self):
+        with self.app.app_context():
+            return self.db.session.get(self.Shirt, 1).updated_at
+
+    def test_shirt_and_image_writes_move_updated_at(self):
+        created = self.updated_at()
+
+        self.assertEqual(self.client.post('/admin/toggle_sold/1').status_code, 200)
+        after_toggle = self.updated_at()
+        self.assertGreater(after_toggle, created)
+
+        with self.app.app_context():
+            self.db.session.add(self.ShirtImage(shirt_id=1, file_path='1/2.jpg'))
+            self.db.session.commit()
+        after_upload = self.updated_at()
+        self.assertGreater(after_upload, after_toggle)
+
+        with self.app.app_context():
+            image = self.ShirtImage.query.filter_by(file_path='1/2.jpg').one()
+            image_id = image.id
+        self.client.post(f'/admin/delete_image/{image_id}')
+        self.assertGreater(self.updated_at(), after_upload)
+
+    def test_versioned_image_urls_are_cached_for_good(self):
+        from app.uploads import image_url
+
+        with self.app.test_request_context():
+            image = self.ShirtImage.query.first()
+            url = image_url(image)
+        self.assertIn('?v=', url)
+
+        versioned = self.client.get(url)
+        self.assertEqual(versioned.status_code, 200)
+        self.assertTrue(versioned.cache_control.immutable)
+        self.assertEqual(versioned.cache_control.max_age, 365 * 86400)
+
+        plain = self.client.get('/uploads/1/1.jpg')
+        self.assertFalse(plain.cache_control.immutable)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+from PIL import Image
+
+
+class UploadDeliveryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.database_file = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        self.database_file.close()
+        self.upload_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+
+        os.environ['DATABASE_URL'] = f'sqlite:///{self.database_file.name}'
+        os.environ['SECRET_KEY'] = 'test-secret'
+        os.environ['UPLOAD_FOLDER'] = self.upload_dir
+        os.environ['CACHE_FOLDER'] = self.cache_dir
+
+        self.image_path = os.path.join(self.upload_dir, 'objects', 'ab', 'abc.jpg')
+        os.makedirs(os.path.dirname(self.image_path))
+        Image.new('RGB', (100, 150), (200, 30, 30)).save(self.image_path)
+        self.url = '/uploads/objects/ab/abc.jpg'
+
+    def tearDown(self):
+        os.unlink(self.database_file.name)
+        os.environ.pop('CACHE_FOLDER', None)
+        os.environ.pop('UPLOADS_DELIVERY', None)
+
+    def make_client(self, delivery):
+        from app import create_app
+
+        os.environ['UPLOADS_DELIVERY'] = delivery
+        app = create_app()
+        app.config.update(TESTING=True)
+        return app.test_client()
+
+    def test_flask_delivery_streams_with_validators_and_ranges(self):
+        client = self.make_client('flask')
+        response = client.get(self.url)
+        with open(self.image_path, 'rb') as handle:
+            self.assertEqual(response.get_data(), handle.read())
+        self.assertTrue(response.headers['ETag'])
+        self.assertTrue(response.headers['Last-Modified'])
+        self.assertTrue(response.cache_control.immutable)
+        self.assertFalse(response.cache_control.no_cache)
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+
+        partial = client.get(self.url, headers={'Range': 'bytes=0-9'})
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(len(partial.get_data()), 10)
+
+        revalidated = client.get(self.url, headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_x_accel_hands_the_transfer_to_nginx(self):
+        client = self.make_client('x-accel')
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['X-Accel-Redirect'], '/protected-uploads/objects/ab/abc.jpg')
+        self.assertNotIn('X-Sendfile', response.headers)
+        self.assertEqual(response.get_data(), b'')
+        self.assertEqual(response.mimetype, 'image/jpeg')
+        self.assertTrue(response.cache_control.immutable)
+        self.assertEqual(response.headers['Accept-Ranges'], 'bytes')
+
+        revalidated = client.get(self.url, headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertNotIn('X-Accel-Redirect', revalidated.headers)
+
+        self.assertEqual(client.get('/uploads/../secret.txt').status_code, 404)
+        self.assertEqual(client.get('/uploads/objects/ab/missing.jpg').status_code, 404)
+
+    def test_x_sendfile_passes_the_absolute_path(self):
+        response = self.make_client('x-sendfile').get(self.url)
+        self.assertEqual(response.headers['X-Sendfile'], self.image_path)
+        self.assertEqual(response.get_data(), b'')
+
+    def test_unknown_delivery_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.make_client('sendfile')
+
+
+if __name__ == '__main__':
+    unittest.main()